@@ -0,0 +1,334 @@
+from typing import NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy
+import scipy.special
+
+import inv_erf
+from elo_game import ELOGameSimulator
+from compiled_season import CompiledSeason
+
+
+class ModelParameters(NamedTuple):
+    """Parameters of the game model.  The defaults reproduce `ELOGameSimulator`
+    and `inv_erf.get_spread`.
+
+    Attributes:
+        k: Scaling of ELO point exchange, see `ELOGameSimulator.K`
+        home_advantage: ELO points added to the home team at non-neutral sites
+        tie_rate: Probability that a game reaching overtime ends in a tie
+
+    """
+    k: float = ELOGameSimulator.K
+    home_advantage: float = ELOGameSimulator.HOME_ADVANTAGE
+    tie_rate: float = inv_erf.TIE_RATE
+
+
+class Draws(NamedTuple):
+    """Uniform random numbers driving the unplayed games of a batch of seasons.
+    Each array has shape `(seasons, unplayed games)`.
+
+    Attributes:
+        spread: Quantile of the Gaussian point spread
+        tie: Compared against the tie rate when the spread rounds to zero
+        overtime: Selects the winner and margin of a decisive overtime
+
+    """
+    spread: numpy.ndarray
+    tie: numpy.ndarray
+    overtime: numpy.ndarray
+
+
+def random_draws(rng: numpy.random.Generator, seasons: int, games: int) -> Draws:
+    """Independent uniform draws for `seasons` seasons of `games` unplayed games"""
+    return Draws(*rng.random((3, seasons, games)))
+
+
+_OVERTIME_MARGINS = numpy.array(inv_erf.OVERTIME_MARGINS)
+
+
+def sample_spreads(mu: numpy.ndarray, sigma: numpy.ndarray, draws: Draws, tie_rate) -> numpy.ndarray:
+    """Home team margins of games with Gaussian spread parameters `mu` and `sigma`,
+    following `inv_erf.get_spread`: a spread rounding to zero goes to overtime, which
+    ends in a tie with probability `tie_rate` and otherwise with a random winner and
+    historical margin.  All arguments broadcast together.
+
+    """
+    quantile = numpy.clip(draws.spread, 1e-300, 1.0)
+    spread = numpy.rint(mu + sigma * scipy.special.ndtri(quantile)).astype(numpy.int64)
+    overtime = spread == 0
+    if overtime.any():
+        decided = overtime & (draws.tie >= tie_rate)
+        ot = draws.overtime
+        index = (2.0 * ot % 1.0 * len(_OVERTIME_MARGINS)).astype(numpy.intp)
+        ot_spread = numpy.where(ot < 0.5, 1, -1) * _OVERTIME_MARGINS[index]
+        spread = numpy.where(decided, ot_spread, spread)
+    return spread
+
+
+def outcome_probabilities(mu: numpy.ndarray, sigma: numpy.ndarray, tie_rate) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Exact home and away win probabilities of `sample_spreads`.  The rounded spread is
+    positive above 1/2 and zero within 1/2 of zero, in which case overtime is decided
+    with probability `1 - tie_rate`, evenly between the teams.
+
+    """
+    p_overtime = scipy.special.ndtr((0.5 - mu) / sigma) - scipy.special.ndtr((-0.5 - mu) / sigma)
+    p_overtime = p_overtime * (1.0 - tie_rate) / 2.0
+    return (scipy.special.ndtr((mu - 0.5) / sigma) + p_overtime,
+            scipy.special.ndtr((-mu - 0.5) / sigma) + p_overtime)
+
+
+def elo_exchange(k, p_winner, log_margin, elo_diff):
+    """ELO won by the winner of a game before rounding, as in `ELOGameSimulator.UpdateTeams`:
+    `k` times the winner's chance of losing and `log_margin`, the log of the margin plus
+    one, damped by `elo_diff`, the winner's rating minus the loser's.  Plain arithmetic,
+    so it works on scalars, on arrays and in compiled kernels.
+
+    """
+    return k * (1.0 - p_winner) * log_margin / (1.0 + elo_diff / 2200.0)
+
+
+def play_games(elo, wins, losses, ties, home, away, spread: numpy.ndarray, p_home: numpy.ndarray, k) -> numpy.ndarray:
+    """Applies games ending with home team margins `spread` to the ratings and records, in
+    place.  `home` and `away` index the arrays, e.g. a team id for arrays indexed by team
+    first, or a tuple of index arrays; `p_home` is the home team's win probability.
+
+    Returns:
+        The ELO exchanged in every game
+
+    """
+    diff = numpy.subtract(elo[home], elo[away], dtype=numpy.int64)
+    home_win = spread > 0
+    away_win = spread < 0
+    p_winner = numpy.where(home_win, p_home, 1.0 - p_home)
+    elo_diff = numpy.where(home_win, diff, -diff)
+    points = numpy.rint(elo_exchange(k, p_winner, numpy.log(numpy.abs(spread) + 1.0), elo_diff)).astype(numpy.int64)
+    delta = numpy.where(home_win, points, -points)
+    elo[home] += delta
+    elo[away] -= delta
+    wins[home] += home_win
+    wins[away] += away_win
+    losses[home] += away_win
+    losses[away] += home_win
+    tie = spread == 0
+    ties[home] += tie
+    ties[away] += tie
+    return points
+
+
+class _LazyDraws:
+    """Draws generated one game at a time, so memory does not grow with the schedule"""
+
+    def __init__(self, rng: numpy.random.Generator, seasons: int):
+        self.rng = rng
+        self.seasons = seasons
+
+    def Game(self, u: int) -> Draws:
+        return Draws(*self.rng.random((3, self.seasons)))
+
+
+class _StoredDraws:
+    """Pre-computed draws for a whole batch"""
+
+    def __init__(self, draws: Draws):
+        self.draws = draws
+
+    def Game(self, u: int) -> Draws:
+        return Draws(*(d[:, u] for d in self.draws))
+
+
+class BatchResult:
+    """Final standings of a batch of simulated seasons for one or more parameter sets.
+    Arrays are indexed by `[parameter set, season, team]`.
+
+    Attributes:
+        teams (List[str]): Team names, indexed by team id
+        elo (numpy.ndarray): Final ELO
+        wins (numpy.ndarray): Final wins
+        losses (numpy.ndarray): Final losses
+        ties (numpy.ndarray): Final ties
+        spreads (numpy.ndarray): If requested, the home team margin of every game,
+                                 indexed by `[parameter set, season, game]`
+        expected_wins (numpy.ndarray): If requested, the sum over each team's games of its
+                                       win probability given the ELO before the game
+
+    """
+
+    def __init__(self, teams, elo, wins, losses, ties, spreads=None, expected_wins=None):
+        self.teams = teams
+        self.elo = elo
+        self.wins = wins
+        self.losses = losses
+        self.ties = ties
+        self.spreads = spreads
+        self.expected_wins = expected_wins
+
+    @property
+    def seasons(self) -> int:
+        return self.wins.shape[1]
+
+    def Undefeated(self) -> numpy.ndarray:
+        """Boolean array flagging teams which finished without a loss or tie"""
+        return (self.losses == 0) & (self.ties == 0)
+
+    def ControlVariate(self) -> numpy.ndarray:
+        """Wins minus their expected value given the ratings before each game.  Its
+        expectation is exactly zero and it is strongly correlated with every outcome
+        driven by wins, which makes it a control variate, see `sampling`.
+
+        """
+        if self.expected_wins is None:
+            raise ValueError("Simulate with expected_wins=True to use control variates")
+        return self.wins - self.expected_wins
+
+
+class BatchSimulator:
+    """Simulates many seasons at once with the game model of `ELOGameSimulator`.
+    Games are processed in schedule order while every season, and every parameter
+    set, is updated together as an array.  All parameter sets share the same random
+    draws, so differences between them are free of independent sampling noise.
+
+    Random numbers are consumed differently than in `SeasonSimulator`, so results
+    agree in distribution but not season by season.
+
+    Args:
+        compiled: Season to simulate
+        parameters (optional): One or more sets of model parameters
+
+    """
+
+    def __init__(self, compiled: CompiledSeason,
+                 parameters: Union[ModelParameters, Sequence[ModelParameters]]=ModelParameters()):
+        self.compiled = compiled
+        if isinstance(parameters, ModelParameters):
+            parameters = [parameters]
+        self.parameters = list(parameters)
+        columns = numpy.array(self.parameters, dtype=float).T[:, :, numpy.newaxis]
+        self._k, self._home_advantage, self._tie_rate = columns
+
+    def _ObserveWeeks(self, observers: Sequence, week: int, games: int, elo: numpy.ndarray) -> int:
+        """Notifies observers of every week completed within the first `games` games and
+        returns the first week not yet completed.
+
+        """
+        while week < self.compiled.n_weeks and self.compiled.week_start[week + 1] <= games:
+            for observer in observers:
+                observer.ObserveBatch(week, elo[:, 0, :].T)
+            week += 1
+        return week
+
+    def Simulate(self, seasons: int, rng: Optional[numpy.random.Generator]=None,
+                 draws: Optional[Draws]=None, record_spreads: bool=False,
+                 observers: Sequence=(), expected_wins: bool=False,
+                 start_elo: Optional[numpy.ndarray]=None, dtype=numpy.int64) -> BatchResult:
+        """Simulates `seasons` seasons for every parameter set.
+
+        Args:
+            seasons: Number of seasons
+            rng (optional): Generator used when `draws` is not given
+            draws (optional): Pre-computed draws, see `Draws`; by default they are
+                              generated game by game from `rng`
+            record_spreads (optional): Keep the margin of every game in the result
+            observers (optional): Objects whose `ObserveBatch(week, elo)` is called after
+                                  every week with the ELO of the first parameter set,
+                                  indexed by `[season, team]`
+            expected_wins (optional): Accumulate every team's expected wins, see
+                                      `BatchResult.ControlVariate`
+            start_elo (optional): Starting ELO indexed by `[season, team]`, or by
+                                  `[parameter set, season, team]`; by default drawn
+                                  with `CompiledSeason.SampleELO` when the standings
+                                  have rating uncertainty, before any game
+            dtype (optional): Integer dtype of the ELO and records, e.g. `int16` to halve
+                              the memory of `int32`; arithmetic is still done in 64 bits
+
+        Returns:
+            Final standings of every season
+
+        Raises:
+            OverflowError: If the ELO or records could exceed `dtype`, checked at the
+                           game which could overflow; the arrays are discarded
+
+        """
+        compiled = self.compiled
+        rng = rng or numpy.random.default_rng()
+        if start_elo is None and compiled.uncertainty:
+            start_elo = compiled.SampleELO(seasons, rng)
+        if draws is None:
+            draws = _LazyDraws(rng, seasons)
+        else:
+            draws = _StoredDraws(draws)
+        shape = (compiled.n_teams, len(self.parameters), seasons)
+        # Starting ELO indexed by [team, parameter set, season], broadcasting as needed
+        if start_elo is None:
+            start = compiled.elo[:, numpy.newaxis, numpy.newaxis]
+        elif numpy.ndim(start_elo) == 3:
+            start = numpy.asarray(start_elo).transpose(2, 0, 1)
+        else:
+            start = numpy.asarray(start_elo).T[:, numpy.newaxis, :]
+        info = numpy.iinfo(dtype)
+        bound = None
+        if info.bits < 64:
+            # Largest possible |ELO| of every team, grown by the largest exchange of each game
+            bound = numpy.abs(start).reshape(compiled.n_teams, -1).max(axis=1, initial=0)
+            games = numpy.bincount(compiled.home, minlength=compiled.n_teams)
+            games += numpy.bincount(compiled.away, minlength=compiled.n_teams)
+            records = numpy.maximum(numpy.maximum(compiled.wins, compiled.losses), compiled.ties) + games
+            if bound.max(initial=0) > info.max or records.max(initial=0) > info.max:
+                raise OverflowError(f"Starting ELO or records don't fit in {numpy.dtype(dtype)}")
+        # Team-major layout so that each game reads and writes contiguous rows
+        elo = numpy.empty(shape, dtype=dtype)
+        elo[...] = start
+        wins = numpy.empty(shape, dtype=dtype)
+        wins[...] = compiled.wins[:, numpy.newaxis, numpy.newaxis]
+        losses = numpy.empty(shape, dtype=dtype)
+        losses[...] = compiled.losses[:, numpy.newaxis, numpy.newaxis]
+        ties = numpy.empty(shape, dtype=dtype)
+        ties[...] = compiled.ties[:, numpy.newaxis, numpy.newaxis]
+        spreads = None
+        if record_spreads:
+            spreads = numpy.empty((compiled.n_games, len(self.parameters), seasons), dtype=numpy.int64)
+        expected = None
+        if expected_wins:
+            expected = numpy.zeros(shape)
+            expected[...] = compiled.wins[:, numpy.newaxis, numpy.newaxis]
+        u = 0
+        week = 0
+        for g in range(compiled.n_games):
+            week = self._ObserveWeeks(observers, week, g, elo)
+            h, a = compiled.home[g], compiled.away[g]
+            diff = numpy.subtract(elo[h], elo[a], dtype=numpy.int64)
+            margin = diff
+            if not compiled.neutral[g]:
+                margin = margin + self._home_advantage
+            p_home = 1.0 / (1.0 + 10.0**(-margin / 400.0))
+            if compiled.played[g]:
+                spread = numpy.full(margin.shape, compiled.home_score[g] - compiled.away_score[g])
+                if expected is not None:
+                    expected[h] += spread > 0
+                    expected[a] += spread < 0
+            else:
+                mu = margin / 25.0
+                sigma = inv_erf.get_sigma_array(mu, p_home)
+                game_draws = draws.Game(u)
+                spread = sample_spreads(mu, sigma, game_draws, self._tie_rate)
+                if expected is not None:
+                    p_home_win, p_away_win = outcome_probabilities(mu, sigma, self._tie_rate)
+                    expected[h] += p_home_win
+                    expected[a] += p_away_win
+                u += 1
+            points = play_games(elo, wins, losses, ties, h, a, spread, p_home, self._k)
+            if bound is not None:
+                step = int(numpy.abs(points).max(initial=0))
+                bound[h] += step
+                bound[a] += step
+                if max(bound[h], bound[a]) > info.max:
+                    raise OverflowError(f"ELO could exceed {numpy.dtype(dtype)} in game {g}")
+            if spreads is not None:
+                spreads[g] = spread
+        self._ObserveWeeks(observers, week, compiled.n_games, elo)
+        if spreads is not None:
+            spreads = spreads.transpose(1, 2, 0)
+        if expected is not None:
+            expected = expected.transpose(1, 2, 0)
+        return BatchResult(compiled.teams, *(x.transpose(1, 2, 0) for x in (elo, wins, losses, ties)),
+                           spreads=spreads, expected_wins=expected)
+
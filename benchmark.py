@@ -0,0 +1,69 @@
+import time
+import argparse
+import tracemalloc
+
+import numpy
+
+from season import Season
+from standings import Standings
+from simulator import Simulator
+from compiled_season import CompiledSeason
+from batch_simulator import BatchSimulator
+from season_kernel import KernelSimulator, JIT_AVAILABLE
+from data.make_synthetic import synthetic_season
+
+
+def measure(function):
+    """Runs `function` twice, returning the run time in seconds of an untraced run and
+    the peak memory in bytes allocated during a traced run.
+
+    """
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def benchmark_scaling(sizes, seasons, reference_games=20000):
+    """Prints throughput and peak memory of the simulators for synthetic leagues of
+    the given `(teams, weeks)` sizes.  The reference simulator only runs while a
+    season has at most `reference_games` games.  The kernel simulates one season per
+    call, as adaptive runs do, and runs fewer seasons when it is not compiled.
+
+    """
+    print(f'Season kernel: {"compiled with Numba" if JIT_AVAILABLE else "plain Python, Numba not installed"}')
+    print(f'{"teams":>6} {"weeks":>6} {"engine":>9} {"seasons":>8} {"seconds":>8} '
+          f'{"seasons/s":>10} {"games/s":>10} {"peak MB":>8}')
+    for teams, weeks in sizes:
+        schedule, elo = synthetic_season(teams, weeks, seed=teams)
+        season = Season(schedule)
+        standings = Standings.FromData(elo)
+        games = sum(len(week) for week in season)
+        compiled = CompiledSeason(season, standings)
+        rng = numpy.random.default_rng(0)
+        kernel = KernelSimulator(compiled)
+        n_kernel = seasons if JIT_AVAILABLE else max(1, seasons // 10)
+        engines = [('batch', seasons, lambda: BatchSimulator(compiled).Simulate(seasons, rng)),
+                   ('kernel', n_kernel, lambda: [kernel.Simulate(1, rng) for _ in range(n_kernel)])]
+        if games <= reference_games:
+            n = max(1, seasons // 100)
+            engines.append(('reference', n, lambda: Simulator(season, standings, n).Simulate()))
+        for name, n, run in engines:
+            elapsed, peak = measure(run)
+            print(f'{teams:6d} {weeks:6d} {name:>9} {n:8d} {elapsed:8.2f} '
+                  f'{n / elapsed:10.1f} {n * games / elapsed:10.3g} {peak / 1024**2:8.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark simulation throughput and memory by league size')
+    parser.add_argument('--teams', type=int, nargs='+', default=[32, 128, 512, 2048])
+    parser.add_argument('--weeks', type=int, nargs='+', default=[17, 34, 68, 136])
+    parser.add_argument('--seasons', type=int, default=1000)
+    args = parser.parse_args()
+    if len(args.teams) != len(args.weeks):
+        parser.error('--teams and --weeks need the same number of values')
+    benchmark_scaling(list(zip(args.teams, args.weeks)), args.seasons)
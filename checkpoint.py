@@ -0,0 +1,79 @@
+import os
+import pickle
+import random
+import tempfile
+from typing import Any, BinaryIO, Callable, Dict
+
+import numpy
+
+
+def get_random_state() -> Dict[str, Any]:
+    """Captures the position of every random number generator used during simulation.
+    `inv_erf.get_spread` draws from the standard library `random` module and, through
+    `scipy.stats`, from the global `numpy.random` state, so both must be stored.
+
+    Returns:
+        Dictionary which can be passed to `set_random_state`
+
+    """
+    return {'random': random.getstate(), 'numpy': numpy.random.get_state()}
+
+
+def set_random_state(state: Dict[str, Any]):
+    """Restores generator positions previously captured by `get_random_state`.
+
+    Args:
+        state: Dictionary produced by `get_random_state`
+
+    """
+    random.setstate(state['random'])
+    numpy.random.set_state(state['numpy'])
+
+
+def atomic_write(path: str, write: Callable[[BinaryIO], None]):
+    """Writes a file atomically.  `write` is called with a temporary file in the same
+    directory, which is then renamed over `path`, so a job killed mid-write leaves any
+    previous file intact.
+
+    Args:
+        path: Destination of the file
+        write: Writes the contents to the binary file it is given
+
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def save_checkpoint(path: str, state: Dict[str, Any]):
+    """Writes `state` to `path` atomically, see `atomic_write`.
+
+    Args:
+        path: Destination of the checkpoint
+        state: Picklable checkpoint contents
+
+    """
+    atomic_write(path, lambda f: pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    """Reads a checkpoint written by `save_checkpoint`.
+
+    Args:
+        path: Location of the checkpoint
+
+    Returns:
+        The stored checkpoint contents
+
+    """
+    with open(path, 'rb') as f:
+        return pickle.load(f)
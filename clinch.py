@@ -0,0 +1,170 @@
+import os
+import argparse
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy
+import scipy.sparse
+import scipy.sparse.csgraph
+
+from season import Season
+from standings import Standings
+
+
+class ClinchAnalyzer:
+    """Deterministic answers to questions about the rest of a season which no longer
+    depend on chance, from the played games of `season`, the records in `standings`
+    and the games still to be played.
+
+    Standings are compared by points, two per win and one per tie, which orders teams
+    like win percentage when every team plays the same number of games.
+
+    Args:
+        season: Schedule, including already played games
+        standings: Records before the first game of `season`
+
+    Attributes:
+        teams (List[str]): Team names in sorted order
+        wins (Dict[str, int]): Current wins of every team
+        losses (Dict[str, int]): Current losses of every team
+        ties (Dict[str, int]): Current ties of every team
+        remaining (List[Tuple[str, str]]): Home and away team of every unplayed game
+
+    """
+
+    def __init__(self, season: Season, standings: Standings):
+        self.teams = sorted(standings.keys())
+        self.wins = {team: standings[team].wins for team in self.teams}
+        self.losses = {team: standings[team].losses for team in self.teams}
+        self.ties = {team: standings[team].ties for team in self.teams}
+        self.remaining = []
+        for week in season:
+            for game in week:
+                home, away = (team.strip('*') for team in game[:2])
+                if len(game) < 4:
+                    self.remaining.append((home, away))
+                elif game[2] > game[3]:
+                    self.wins[home] += 1
+                    self.losses[away] += 1
+                elif game[2] < game[3]:
+                    self.wins[away] += 1
+                    self.losses[home] += 1
+                else:
+                    self.ties[home] += 1
+                    self.ties[away] += 1
+        self.games_left = {team: 0 for team in self.teams}
+        for home, away in self.remaining:
+            self.games_left[home] += 1
+            self.games_left[away] += 1
+
+    @classmethod
+    def FromJSONDirectory(cls, directory: str) -> 'ClinchAnalyzer':
+        return cls(Season.FromJSONDirectory(directory), Standings.FromJSONDirectory(directory))
+
+    def Points(self, team: str) -> int:
+        return 2 * self.wins[team] + self.ties[team]
+
+    def MaxPoints(self, team: str) -> int:
+        return self.Points(team) + 2 * self.games_left[team]
+
+    def WinRange(self, team: str) -> Tuple[int, int]:
+        """Fewest and most wins `team` can finish with"""
+        return self.wins[team], self.wins[team] + self.games_left[team]
+
+    def CanGoUndefeated(self, team: str) -> bool:
+        return self.losses[team] == 0 and self.ties[team] == 0
+
+    def IsUndefeated(self, team: str) -> bool:
+        """Whether `team` has finished the season undefeated"""
+        return self.CanGoUndefeated(team) and self.games_left[team] == 0
+
+    def UndefeatedContenders(self) -> List[str]:
+        """Teams which can still finish undefeated"""
+        return [team for team in self.teams if self.CanGoUndefeated(team)]
+
+    def CanFinishAhead(self, team: str, group: Optional[Sequence[str]]=None, strict: bool=False) -> bool:
+        """Whether some result of the remaining games leaves `team` with at least as many
+        points as every other team of `group` (the whole league by default), or with more
+        points when `strict`.
+
+        `team` winning all of its games is best for it, and teams of `group` losing to
+        teams outside of it is best for `team`, so only the games among the rest of
+        `group` matter.  Those games hand out two points each, which can be arranged
+        without any team passing `team` exactly when a maximum flow from the games to the
+        teams, limited by the points each team may still gain, carries every point.
+
+        """
+        others = [other for other in (group or self.teams) if other != team]
+        bound = self.MaxPoints(team) - (1 if strict else 0)
+        capacity = {other: bound - self.Points(other) for other in others}
+        if any(c < 0 for c in capacity.values()):
+            return False
+        games = [(home, away) for home, away in self.remaining
+                 if home in capacity and away in capacity]
+        if not games:
+            return True
+        # Nodes: source, games, teams, sink
+        node = {other: 1 + len(games) + i for i, other in enumerate(others)}
+        sink = 1 + len(games) + len(others)
+        rows, columns, values = [], [], []
+        for g, (home, away) in enumerate(games):
+            rows += [0, 1 + g, 1 + g]
+            columns += [1 + g, node[home], node[away]]
+            values += [2, 2, 2]
+        for other in others:
+            rows.append(node[other])
+            columns.append(sink)
+            values.append(capacity[other])
+        graph = scipy.sparse.csr_matrix((numpy.array(values, dtype=numpy.int32), (rows, columns)),
+                                        shape=(sink + 1, sink + 1))
+        flow = scipy.sparse.csgraph.maximum_flow(graph, 0, sink).flow_value
+        return flow == 2 * len(games)
+
+    def HasClinched(self, team: str, group: Optional[Sequence[str]]=None, strict: bool=True) -> bool:
+        """Whether every result of the remaining games leaves `team` with more points than
+        every other team of `group`, or at least as many when not `strict`.
+
+        Another team can only catch `team` if it can when it wins all of its games and
+        `team` loses all of its games, which agree on their games against each other, so
+        each team can be checked on its own.
+
+        """
+        others = [other for other in (group or self.teams) if other != team]
+        worst = self.Points(team)
+        for other in others:
+            best = self.MaxPoints(other)
+            if best > worst or (strict and best == worst):
+                return False
+        return True
+
+    def Status(self, group: Optional[Sequence[str]]=None) -> Dict[str, str]:
+        """For every team of `group`, whether it has `clinched` or been `eliminated` from
+        finishing with the most points of `group`, or whether it is still `open`.
+
+        """
+        status = {}
+        for team in (group or self.teams):
+            if self.HasClinched(team, group):
+                status[team] = 'clinched'
+            elif not self.CanFinishAhead(team, group):
+                status[team] = 'eliminated'
+            else:
+                status[team] = 'open'
+        return status
+
+    def SettledUndefeated(self) -> Dict[str, float]:
+        """Exact probability of finishing undefeated for every team where it is certain"""
+        return {team: 1.0 if self.IsUndefeated(team) else 0.0 for team in self.teams
+                if not self.CanGoUndefeated(team) or self.IsUndefeated(team)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Report clinched and eliminated teams')
+    parser.add_argument('group', nargs='*', help='Teams competing, by default the whole league')
+    parser.add_argument('--directory', default=os.path.join('data', '2016'))
+    args = parser.parse_args()
+    analyzer = ClinchAnalyzer.FromJSONDirectory(args.directory)
+    contenders = analyzer.UndefeatedContenders()
+    print(f'Teams able to finish undefeated: {", ".join(contenders) if contenders else "none"}')
+    for team, status in analyzer.Status(args.group or None).items():
+        low, high = analyzer.WinRange(team)
+        print(f'{team:<4} {status:<10} {low:>2}-{high:>2} wins')
@@ -0,0 +1,107 @@
+import copy
+
+import numpy
+
+from season import Season
+from standings import Standings, sample_elo
+
+
+class CompiledSeason:
+    """Integer-indexed representation of a `Season` and its starting `Standings`, used
+    by the array based simulators.  Teams are numbered in sorted name order and games
+    are stored in schedule order as flat arrays.
+
+    Args:
+        season: Schedule, possibly including already played games
+        standings: Starting ELO and record of every team
+
+    Attributes:
+        teams (List[str]): Team names, indexed by team id
+        index (Dict[str, int]): Team id for each team name
+        home (numpy.ndarray): Home team id of each game
+        away (numpy.ndarray): Away team id of each game
+        neutral (numpy.ndarray): Whether each game is played at a neutral site
+        played (numpy.ndarray): Whether each game has already been played
+        home_score (numpy.ndarray): Home team score of played games, 0 otherwise
+        away_score (numpy.ndarray): Away team score of played games, 0 otherwise
+        week (numpy.ndarray): Week index of each game
+        week_start (numpy.ndarray): Index of the first game of each week, followed by the number of games
+        elo (numpy.ndarray): Starting ELO of each team
+        wins (numpy.ndarray): Starting wins of each team
+        losses (numpy.ndarray): Starting losses of each team
+        ties (numpy.ndarray): Starting ties of each team
+        uncertainty (Dict[str, Dict[str, Any]]): Rating uncertainty, see `Standings.FromData`
+
+    """
+
+    def __init__(self, season: Season, standings: Standings):
+        self.teams = sorted(team.strip("*") for team in standings.keys())
+        self.index = {team: i for i, team in enumerate(self.teams)}
+        games = [game for week in season for game in week]
+        self.home = numpy.array([self.index[g[0].strip("*")] for g in games], dtype=numpy.intp)
+        self.away = numpy.array([self.index[g[1].strip("*")] for g in games], dtype=numpy.intp)
+        self.neutral = numpy.array([g[0].startswith("*") for g in games], dtype=bool)
+        self.played = numpy.array([len(g) == 4 for g in games], dtype=bool)
+        self.home_score = numpy.array([g[2] if len(g) == 4 else 0 for g in games], dtype=numpy.int64)
+        self.away_score = numpy.array([g[3] if len(g) == 4 else 0 for g in games], dtype=numpy.int64)
+        self.week = numpy.repeat(numpy.arange(len(season)), [len(week) for week in season])
+        self.week_start = numpy.concatenate([[0], numpy.cumsum([len(week) for week in season])])
+        self.elo = numpy.array([standings[t].elo for t in self.teams], dtype=numpy.int64)
+        self.wins = numpy.array([standings[t].wins for t in self.teams], dtype=numpy.int64)
+        self.losses = numpy.array([standings[t].losses for t in self.teams], dtype=numpy.int64)
+        self.ties = numpy.array([standings[t].ties for t in self.teams], dtype=numpy.int64)
+        self.uncertainty = dict(standings.uncertainty)
+
+    @classmethod
+    def FromJSONDirectory(cls, directory: str) -> 'CompiledSeason':
+        return cls(Season.FromJSONDirectory(directory), Standings.FromJSONDirectory(directory))
+
+    @property
+    def n_teams(self) -> int:
+        return len(self.teams)
+
+    @property
+    def n_games(self) -> int:
+        return len(self.home)
+
+    @property
+    def n_weeks(self) -> int:
+        return len(self.week_start) - 1
+
+    def SampleELO(self, seasons: int, rng=numpy.random) -> numpy.ndarray:
+        """Starting ELO of every season, indexed by `[season, team]`, see `sample_elo`"""
+        return sample_elo(self.elo, self.teams, self.uncertainty, seasons, rng)
+
+    @property
+    def unplayed(self) -> numpy.ndarray:
+        """Indices of the games which still need to be simulated"""
+        return numpy.flatnonzero(~self.played)
+
+    def WithResults(self, results) -> 'CompiledSeason':
+        """Creates a copy in which some unplayed games are given a result, for what-if questions.
+
+        Args:
+            results: Iterable of `[home, away, home_score, away_score]`; each matches the
+                     first unplayed game between those teams with that home team
+
+        Returns:
+            A new `CompiledSeason` sharing nothing mutable with this one
+
+        Raises:
+            ValueError: If a result doesn't match an unplayed game
+
+        """
+        compiled = copy.copy(self)
+        compiled.played = self.played.copy()
+        compiled.home_score = self.home_score.copy()
+        compiled.away_score = self.away_score.copy()
+        for home_team, away_team, home_score, away_score in results:
+            home, away = self.index.get(home_team.strip("*")), self.index.get(away_team.strip("*"))
+            candidates = numpy.flatnonzero((compiled.home == home) & (compiled.away == away) & ~compiled.played)
+            if home is None or away is None or len(candidates) == 0:
+                raise ValueError(f"No unplayed game {away_team} @ {home_team}")
+            g = candidates[0]
+            compiled.played[g] = True
+            compiled.home_score[g] = home_score
+            compiled.away_score[g] = away_score
+        return compiled
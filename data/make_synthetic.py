@@ -0,0 +1,95 @@
+import os
+import json
+import random
+import string
+import argparse
+import itertools
+from typing import Dict, List, Optional, Tuple
+
+
+def team_names(teams: int) -> List[str]:
+    """Generates `teams` distinct three letter uppercase names, AAA, AAB, ...
+
+    Raises:
+        ValueError: If more names are requested than three letters allow
+
+    """
+    if teams > 26**3:
+        raise ValueError(f"At most {26**3} teams are supported, requested {teams}")
+    names = itertools.product(string.ascii_uppercase, repeat=3)
+    return [''.join(name) for name in itertools.islice(names, teams)]
+
+
+def round_robin(teams: List[str], weeks: int) -> List[List[List[str]]]:
+    """Schedules `weeks` weeks in which every team plays once, using the circle method.
+    Consecutive cycles through all opponents swap the home and away teams.
+
+    Args:
+        teams: Team names, must be an even number of teams
+        weeks: Number of weeks
+
+    Returns:
+        List of weeks, each a list of `[home, away]` games
+
+    """
+    if len(teams) % 2:
+        raise ValueError(f"Need an even number of teams, found {len(teams)}")
+    n = len(teams)
+    schedule = []
+    for week in range(weeks):
+        r = week % (n - 1)
+        order = [teams[0]] + teams[1:][r:] + teams[1:][:r]
+        games = []
+        for i in range(n // 2):
+            home, away = order[i], order[n - 1 - i]
+            if (i + week) % 2:
+                home, away = away, home
+            games.append([home, away])
+        schedule.append(games)
+    return schedule
+
+
+def synthetic_season(teams: int, weeks: int, seed: Optional[int]=None,
+                     mean: int=1500, spread: int=100) -> Tuple[Dict, Dict[str, int]]:
+    """Creates the contents of `schedule.json` and `elo_start.json` for a synthetic league.
+
+    Args:
+        teams: Number of teams, must be even
+        weeks: Number of weeks; every team plays every week
+        seed (optional): Seed for the starting ELO values
+        mean (optional): Mean starting ELO
+        spread (optional): Standard deviation of starting ELO
+
+    Returns:
+        Schedule data and starting ELO of every team
+
+    """
+    names = team_names(teams)
+    schedule = round_robin(names, weeks)
+    rng = random.Random(seed)
+    elo = {name: int(round(rng.gauss(mean, spread))) for name in names}
+    return {'expected': [len(week) for week in schedule],
+            'weeks': weeks,
+            'teams': teams,
+            'games': weeks,
+            'schedule': schedule}, elo
+
+
+def create_synthetic(directory: str, teams: int, weeks: int, seed: Optional[int]=None):
+    """Writes `schedule.json` and `elo_start.json` for a synthetic league into `directory`"""
+    schedule, elo = synthetic_season(teams, weeks, seed)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'schedule.json'), 'w') as output:
+        json.dump(schedule, output)
+    with open(os.path.join(directory, 'elo_start.json'), 'w') as output:
+        json.dump(elo, output, indent=1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write a synthetic league for stress tests')
+    parser.add_argument('directory')
+    parser.add_argument('--teams', type=int, default=1024)
+    parser.add_argument('--weeks', type=int, default=100)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    create_synthetic(args.directory, args.teams, args.weeks, args.seed)
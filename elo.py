@@ -11,18 +11,23 @@ class Record:
         wins: Starting number of wins, default 0
         losses: Starting number of losses, default 0
         ties: Starting number of ties, default 0
+        season_games: Number of games in a full season, default 16; `None` when not yet
+                      known, in which case only the signs are checked until it is set
+                      with `SetSeasonGames`
 
     Attributes:
-        wins: Wins thus far, should be in [0,16]
-        losses: Losses thus far, should be in [0,16]
-        ties: Ties thus far, should be in [0,16]
+        wins: Wins thus far, should be in [0,season_games]
+        losses: Losses thus far, should be in [0,season_games]
+        ties: Ties thus far, should be in [0,season_games]
+        season_games: Number of games in a full season
 
     """
 
-    def __init__(self, wins: int=0, losses: int=0, ties: int=0):
+    def __init__(self, wins: int=0, losses: int=0, ties: int=0, season_games: Optional[int]=16):
         self.wins = wins
         self.losses = losses
         self.ties = ties
+        self.season_games = season_games
         self.Verify()
 
     def __lt__(self, other: 'Record') -> bool:
@@ -39,7 +44,8 @@ class Record:
         return f'{self.wins}-{self.losses}-{self.ties}'
 
     def __repr__(self):
-        return f'Record(wins={self.wins}, losses={self.losses}, ties={self.ties})'
+        return (f'Record(wins={self.wins}, losses={self.losses}, ties={self.ties}, '
+                f'season_games={self.season_games})')
 
     @property
     def games(self) -> int:
@@ -64,17 +70,29 @@ class Record:
         """Checks if the current record is valid.
 
         Raises:
-            ValueError: if wins, losses, ties, or their sum is less than 0 or greater than 16
+            ValueError: if wins, losses, ties, or their sum is less than 0 or greater than `season_games`
 
         """
-        if self.wins not in range(17):
-            raise ValueError(f"Wins is not between 0 and 16, found {self.wins}")
-        if self.losses not in range(17):
-            raise ValueError(f"Losses is not between 0 and 16, found {self.losses}")
-        if self.ties not in range(17):
-            raise ValueError(f"Ties is not between 0 and 16, found {self.ties}")
-        if self.wins + self.losses + self.ties not in range(17):
-            raise ValueError(f"Total games is not between 0 and 16, found {self.wins + self.losses + self.ties}")
+        if self.season_games is None:
+            for name in ('wins', 'losses', 'ties'):
+                if getattr(self, name) < 0:
+                    raise ValueError(f"{name.capitalize()} must not be negative, found {getattr(self, name)}")
+            return
+        games = range(self.season_games + 1)
+        if self.wins not in games:
+            raise ValueError(f"Wins is not between 0 and {self.season_games}, found {self.wins}")
+        if self.losses not in games:
+            raise ValueError(f"Losses is not between 0 and {self.season_games}, found {self.losses}")
+        if self.ties not in games:
+            raise ValueError(f"Ties is not between 0 and {self.season_games}, found {self.ties}")
+        if self.wins + self.losses + self.ties not in games:
+            raise ValueError(f"Total games is not between 0 and {self.season_games}, "
+                             f"found {self.wins + self.losses + self.ties}")
+
+    def SetSeasonGames(self, season_games: int):
+        """Sets the number of games in a full season and checks the record against it"""
+        self.season_games = season_games
+        self.Verify()
 
     def WinPercent(self) -> float:
         """Determines the win percentage for the current standings"""
@@ -93,8 +111,13 @@ class Record:
         self.ties += 1
 
     def IsUndefeated(self) -> bool:
-        """Indicates whether the record corresponds to an undefeated (16-0-0) season"""
-        return self.wins == 16 and self.losses == self.ties == 0
+        """Indicates whether the record corresponds to an undefeated season, e.g. 16-0-0.
+        Without a known season length, any record without losses or ties is undefeated.
+
+        """
+        if self.season_games is None:
+            return self.losses == self.ties == 0
+        return self.wins == self.season_games and self.losses == self.ties == 0
 
 
 @total_ordering
@@ -125,7 +148,8 @@ class ELO:
                  record: Optional[Record]=None):
         self.name = name.strip("*")
         self.elo = starting_elo
-        self.record = record or Record(wins, losses, ties)
+        # The season length is only known from the schedule, see `Standings.SetSeasonGames`
+        self.record = record or Record(wins, losses, ties, season_games=None)
 
     @property
     def wins(self) -> int:
@@ -6,7 +6,6 @@ import elo
 import inv_erf
 ELO = elo.ELO
 
-logging.basicConfig(level=logging.DEBUG)
 
 class ELOGameSimulator:
     """Simulates a game between two teams represented by `ELO` objects.
@@ -17,6 +16,7 @@ class ELOGameSimulator:
 
     Attributes:
         K (float): Class attribute controlling the scaling of ELO point exchange
+        HOME_ADVANTAGE (int): Class attribute giving the ELO bonus of the home team
         home: Home team
         away: Away team
         winner (ELO): After simulation, contains either the home or away team
@@ -25,6 +25,7 @@ class ELOGameSimulator:
 
     """
     K = 20.0
+    HOME_ADVANTAGE = 65
 
     def __init__(self, home: ELO, away: ELO, **kwargs):
         self.home = home
@@ -44,7 +45,7 @@ class ELOGameSimulator:
 
         """
         logging.debug("Game %s @ %s", self.away, self.home)
-        margin = 65 + self.home.elo - self.away.elo
+        margin = self.HOME_ADVANTAGE + self.home.elo - self.away.elo
         logging.debug("ELO Margin = %d", margin)
         return margin
 
@@ -92,7 +93,7 @@ class ELOGameSimulator:
         spread = inv_erf.get_spread(pt_margin, prob)
         self.winner = self.home if spread >= 0.0 else self.away
         self.tie = spread == 0.0
-        self.spread = abs(self.spread)
+        self.spread = abs(spread)
         logging.debug("Spread = %d", self.spread)
         logging.debug("Winner = %s", self.winner.name)
         logging.debug("Tie = %s", self.tie)
@@ -115,8 +116,8 @@ class ELOGameSimulator:
         if self.winner is None:
             self.Simulate()
         if self.tie:
-            self.winner.UpdateTie()
-            self.loser.UpdateTie()
+            self.winner.UpdateTies()
+            self.loser.UpdateTies()
             return
         # General case of non-ties
         if self.winner is self.home:
@@ -167,7 +168,7 @@ class ELOKnownGame(ELOGameSimulator):
 
     See `ELOGameSimulator` for more details.  The initializer will set the `winner` attribute
     based on the team scores, and determine the point spread but will not update the teams
-    until `UpdateTeams` is called.
+    until `UpdateTeams` is called.  Equal scores are recorded as a tie.
 
     Args:
         home: Home team
@@ -181,6 +182,7 @@ class ELOKnownGame(ELOGameSimulator):
         super().__init__(home, away, home_score=home_score, away_score=away_score)
         self.winner = self.home if home_score > away_score else self.away
         self.spread = abs(home_score - away_score)
+        self.tie = home_score == away_score
 
 
 class ELONeutralKnownGame(ELONeutralGameSimulator, ELOKnownGame):
@@ -195,30 +197,34 @@ class ELONeutralKnownGame(ELONeutralGameSimulator, ELOKnownGame):
         super().__init__(home, away, home_score=home_score, away_score=away_score)
 
 
-def GetGame(home: ELO, away: ELO, home_score: Optional[int]=None, away_score: Optional[int]=None) -> ELOGameSimulator:
+def GetGame(home: ELO, away: ELO, home_score: Optional[int]=None, away_score: Optional[int]=None,
+            neutral: bool=False) -> ELOGameSimulator:
     """Determines the appropriate class to use to represent this game, creates
     an instance of that type and returns it.  This serves as the public API of
     the module and should be the interface used to produce these objects.
 
     Note that a neutral site is signaled by pre-pending the home team's name
-    with an asterisk.
+    with an asterisk, or by `neutral` when the teams come from `Standings`, whose
+    names have already been stripped.
 
     Args:
         home: Home team
         away: Away team
         home_score: If the game is already played, the home team's score
         away_score: If the game is already played, the away team's score
+        neutral (optional): Whether the game is played at a neutral site
 
     Returns:
         Simulator of the game, possibly of a type derived from `ELOGameSimulator`
 
     """
+    neutral = neutral or home.name.startswith("*")
     if home_score is not None and away_score is not None:
-        if home.name.startswith("*"):
+        if neutral:
             home.name = home.name.strip("*")
             return ELONeutralKnownGame(home, away, home_score, away_score)
         return ELOKnownGame(home, away, home_score, away_score)
-    if home.name.startswith("*"):
+    if neutral:
         home.name = home.name.strip("*")
         return ELONeutralGameSimulator(home, away)
     return ELOGameSimulator(home, away)
@@ -0,0 +1,229 @@
+import os
+import copy
+import random
+import argparse
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy
+import scipy.stats
+
+from season import Season
+from standings import Standings
+from season_simulator import SeasonSimulator
+from compiled_season import CompiledSeason
+from batch_simulator import BatchSimulator
+from season_kernel import KernelSimulator
+
+
+class Outcomes(NamedTuple):
+    """Per-season outcomes used to compare simulation backends.
+
+    Attributes:
+        teams: Team names in sorted order
+        spreads: Home team margin of every game, indexed by `[season, game]`
+        wins: Final wins, indexed by `[season, team]`
+        losses: Final losses, indexed by `[season, team]`
+        ties: Final ties, indexed by `[season, team]`
+
+    """
+    teams: List[str]
+    spreads: numpy.ndarray
+    wins: numpy.ndarray
+    losses: numpy.ndarray
+    ties: numpy.ndarray
+
+
+class _RecordingSeasonSimulator(SeasonSimulator):
+    """`SeasonSimulator` which keeps the home team margin of every game"""
+
+    def __init__(self, season: Season, standings: Standings, games: Optional[Dict[str, int]]=None):
+        super().__init__(season, standings, games=games)
+        self.spreads = []
+
+    def SimulateGame(self, game):
+        simulator = super().SimulateGame(game)
+        if simulator.tie:
+            self.spreads.append(0)
+        else:
+            self.spreads.append(simulator.spread if simulator.winner is simulator.home else -simulator.spread)
+        return simulator
+
+
+def reference_backend(season: Season, standings: Standings, seasons: int, seed: Optional[int]) -> Outcomes:
+    """Simulates with `SeasonSimulator` and `inv_erf.get_spread`"""
+    random.seed(seed)
+    numpy.random.seed(seed)
+    teams = sorted(standings.keys())
+    ratings = standings.SampleELO(seasons)
+    games = season.GamesPerTeam()
+    standings = copy.deepcopy(standings)
+    standings.SetSeasonGames(games)
+    spreads, records = [], []
+    for i in range(seasons):
+        simulation = _RecordingSeasonSimulator(season, standings, games)
+        for team, rating in zip(teams, ratings[i]):
+            simulation.standings[team].elo = int(rating)
+        simulation.SimulateSeason()
+        spreads.append(simulation.spreads)
+        records.append([[simulation.standings[t].wins, simulation.standings[t].losses,
+                         simulation.standings[t].ties] for t in teams])
+    records = numpy.array(records).reshape(seasons, len(teams), 3)
+    return Outcomes(teams, numpy.array(spreads).reshape(seasons, -1), *records.transpose(2, 0, 1))
+
+
+def batch_backend(season: Season, standings: Standings, seasons: int, seed: Optional[int]) -> Outcomes:
+    """Simulates with the vectorized `BatchSimulator`"""
+    result = BatchSimulator(CompiledSeason(season, standings)).Simulate(
+        seasons, numpy.random.default_rng(seed), record_spreads=True)
+    return Outcomes(result.teams, result.spreads[0], result.wins[0], result.losses[0], result.ties[0])
+
+
+def kernel_backend(season: Season, standings: Standings, seasons: int, seed: Optional[int]) -> Outcomes:
+    """Simulates with the season-at-a-time `KernelSimulator`"""
+    result = KernelSimulator(CompiledSeason(season, standings)).Simulate(
+        seasons, numpy.random.default_rng(seed), record_spreads=True)
+    return Outcomes(result.teams, result.spreads[0], result.wins[0], result.losses[0], result.ties[0])
+
+
+Backend = Callable[[Season, Standings, int, Optional[int]], Outcomes]
+BACKENDS: Dict[str, Backend] = {'reference': reference_backend, 'batch': batch_backend, 'kernel': kernel_backend}
+
+
+def merge_sparse(table: numpy.ndarray, min_expected: float=5.0) -> numpy.ndarray:
+    """Merges adjacent columns of a two-row contingency table, dropping empty ones, until
+    every expected count is at least `min_expected` so that the chi-squared
+    approximation holds.
+
+    """
+    table = table[:, table.sum(axis=0) > 0]
+    fraction = table.sum(axis=1) / table.sum()
+    columns, current = [], numpy.zeros(2)
+    for column in table.T:
+        current = current + column
+        if (current.sum() * fraction).min() >= min_expected:
+            columns.append(current)
+            current = numpy.zeros(2)
+    if current.sum():
+        if columns:
+            columns[-1] = columns[-1] + current
+        else:
+            columns.append(current)
+    return numpy.array(columns).T
+
+
+def chi2_pvalue(table: numpy.ndarray) -> float:
+    """P-value of the chi-squared test of homogeneity for a two-row table of counts,
+    using Fisher's exact test for 2x2 tables with small expected counts.
+
+    """
+    table = merge_sparse(numpy.asarray(table, dtype=float))
+    if table.shape[1] < 2:
+        return 1.0
+    if table.shape[1] == 2 and (numpy.outer(table.sum(axis=1), table.sum(axis=0)) / table.sum()).min() < 5:
+        return scipy.stats.fisher_exact(table.astype(int))[1]
+    return scipy.stats.chi2_contingency(table)[1]
+
+
+class EquivalenceReport:
+    """Two-sample tests comparing a candidate backend against the reference.  All
+    p-values are Holm-Bonferroni adjusted, so the probability that any test fails when
+    both backends sample the same distribution is at most `alpha`.
+
+    Attributes:
+        tests (List[Tuple[str, float]]): Name and unadjusted p-value of every test
+        adjusted (List[float]): Holm-Bonferroni adjusted p-values, in the order of `tests`
+        alpha (float): Family-wise false alarm rate
+
+    """
+
+    def __init__(self, tests: List[Tuple[str, float]], alpha: float):
+        self.tests = tests
+        self.alpha = alpha
+        p = numpy.array([pvalue for _, pvalue in tests])
+        order = numpy.argsort(p)
+        adjusted = numpy.maximum.accumulate(p[order] * (len(p) - numpy.arange(len(p))))
+        self.adjusted = numpy.empty(len(p))
+        self.adjusted[order] = numpy.minimum(adjusted, 1.0)
+
+    @property
+    def failures(self) -> List[Tuple[str, float]]:
+        return [(name, q) for (name, _), q in zip(self.tests, self.adjusted) if q < self.alpha]
+
+    @property
+    def passed(self) -> bool:
+        return not self.failures
+
+    def Print(self):
+        print(f'{len(self.tests)} tests, family-wise alpha {self.alpha}: '
+              f'{"PASS" if self.passed else "FAIL"}')
+        for name, q in self.failures:
+            print(f'    {name}: adjusted p = {q:.3g}')
+
+
+def compare(reference: Outcomes, candidate: Outcomes, played: numpy.ndarray, alpha: float=0.01,
+            spread_range: int=40) -> EquivalenceReport:
+    """Runs the two-sample tests between `reference` and `candidate` outcomes.
+
+    Args:
+        reference: Outcomes of the reference backend
+        candidate: Outcomes of the candidate backend
+        played: Boolean array flagging games which were already played
+        alpha (optional): Family-wise false alarm rate
+        spread_range (optional): Spreads are clipped to `[-spread_range, spread_range]`
+
+    Returns:
+        Report of every test
+
+    """
+    tests = []
+    for g in numpy.flatnonzero(~played):
+        counts = [[(o.spreads[:, g] > 0).sum(), (o.spreads[:, g] < 0).sum(), (o.spreads[:, g] == 0).sum()]
+                  for o in (reference, candidate)]
+        counts = numpy.array(counts)
+        tests.append((f'game {g} home wins', chi2_pvalue(numpy.c_[counts[:, 0], counts[:, 1:].sum(axis=1)])))
+        tests.append((f'game {g} ties', chi2_pvalue(numpy.c_[counts[:, 2], counts[:, :2].sum(axis=1)])))
+    if (~played).any():
+        bins = numpy.arange(-spread_range, spread_range + 2)
+        histograms = [numpy.histogram(numpy.clip(o.spreads[:, ~played], -spread_range, spread_range), bins)[0]
+                      for o in (reference, candidate)]
+        tests.append(('spread histogram', chi2_pvalue(numpy.array(histograms))))
+    for t, team in enumerate(reference.teams):
+        n_games = int(reference.wins[0, t] + reference.losses[0, t] + reference.ties[0, t])
+        histograms = [numpy.bincount(o.wins[:, t], minlength=n_games + 1) for o in (reference, candidate)]
+        tests.append((f'{team} wins', chi2_pvalue(numpy.array(histograms))))
+        undefeated = [[((o.losses[:, t] == 0) & (o.ties[:, t] == 0)).sum()] for o in (reference, candidate)]
+        undefeated = numpy.c_[undefeated, [len(o.wins) for o in (reference, candidate)]]
+        undefeated[:, 1] -= undefeated[:, 0]
+        tests.append((f'{team} undefeated', chi2_pvalue(undefeated)))
+    count = [numpy.bincount(((o.losses == 0) & (o.ties == 0)).sum(axis=1), minlength=len(o.teams) + 1)
+             for o in (reference, candidate)]
+    tests.append(('number undefeated', chi2_pvalue(numpy.array(count))))
+    return EquivalenceReport(tests, alpha)
+
+
+def run_equivalence(directory: str, candidate: str='batch', seasons: int=2000, alpha: float=0.01,
+                    seed: Optional[int]=None) -> EquivalenceReport:
+    """Simulates the season in `directory` with the reference and `candidate` backends and
+    compares the outcomes.  The two backends use independent random numbers.
+
+    """
+    season = Season.FromJSONDirectory(directory)
+    standings = Standings.FromJSONDirectory(directory)
+    seeds = numpy.random.SeedSequence(seed).generate_state(2)
+    reference = BACKENDS['reference'](season, standings, seasons, int(seeds[0]))
+    outcomes = BACKENDS[candidate](season, standings, seasons, int(seeds[1]))
+    played = CompiledSeason(season, standings).played
+    return compare(reference, outcomes, played, alpha)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Test a simulation backend against the reference')
+    parser.add_argument('--candidate', default='batch', choices=sorted(set(BACKENDS) - {'reference'}))
+    parser.add_argument('--seasons', type=int, default=2000)
+    parser.add_argument('--alpha', type=float, default=0.01)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('directories', nargs='*', default=[os.path.join('data', '2015'), os.path.join('data', '2016')])
+    args = parser.parse_args()
+    for directory in args.directories:
+        print(directory)
+        run_equivalence(directory, args.candidate, args.seasons, args.alpha, args.seed).Print()
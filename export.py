@@ -0,0 +1,170 @@
+import os
+import json
+import argparse
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy
+
+from checkpoint import atomic_write
+from standings import Standings
+from compiled_season import CompiledSeason
+from batch_simulator import BatchSimulator, BatchResult
+
+
+class StandingsWriter:
+    """Streams the final standings of simulated seasons to a directory of `.npy` chunks.
+
+    Each call to `Write` stores one chunk per field, an array indexed by
+    `[season, team]`, and then rewrites `manifest.json` listing the complete chunks, so
+    memory use is bounded by one chunk and an interrupted run leaves a readable
+    directory.  Chunks are written atomically.
+
+    The writer is also an observer for `Simulator`: seasons are buffered from their
+    final week and written every `chunk_size` seasons, and by `Close`.
+
+    Args:
+        directory: Output directory, created if needed
+        teams: Team names, in the column order of the arrays
+        dtypes (optional): Dtype of every field; values which don't fit raise `ValueError`
+        chunk_size (optional): Seasons per chunk when used as an observer
+        weeks (optional): Number of weeks, needed when used as an observer
+
+    """
+    MANIFEST = 'manifest.json'
+    FORMAT = 1
+    DTYPES = {'elo': 'int16', 'wins': 'int16', 'losses': 'int16', 'ties': 'int16'}
+
+    def __init__(self, directory: str, teams: Sequence[str], dtypes: Dict[str, str]=DTYPES,
+                 chunk_size: int=10000, weeks: Optional[int]=None):
+        self.directory = directory
+        self.teams = list(teams)
+        self.dtypes = dict(dtypes)
+        self.chunk_size = chunk_size
+        self.weeks = weeks
+        self.chunks = []
+        self.buffer = []
+        os.makedirs(directory, exist_ok=True)
+
+    def WriteArrays(self, **arrays: numpy.ndarray):
+        """Writes one chunk holding every field, each indexed by `[season, team]`"""
+        if set(arrays) != set(self.dtypes):
+            raise ValueError(f"Expected fields {sorted(self.dtypes)}, found {sorted(arrays)}")
+        seasons = {len(array) for array in arrays.values()}
+        if len(seasons) != 1:
+            raise ValueError(f"Fields have different numbers of seasons: {sorted(seasons)}")
+        files = {}
+        for field, array in arrays.items():
+            dtype = numpy.dtype(self.dtypes[field])
+            info = numpy.iinfo(dtype) if dtype.kind in 'iu' else None
+            if info is not None and array.size and (array.min() < info.min or array.max() > info.max):
+                raise ValueError(f"Values of {field} don't fit in {dtype}")
+            if array.ndim != 2 or array.shape[1] != len(self.teams):
+                raise ValueError(f"{field} must be indexed by [season, team], found shape {array.shape}")
+            files[field] = f'chunk{len(self.chunks):06d}_{field}.npy'
+            data = numpy.ascontiguousarray(array, dtype=dtype)
+            atomic_write(os.path.join(self.directory, files[field]), lambda f: numpy.save(f, data))
+        self.chunks.append({'seasons': seasons.pop(), 'files': files})
+        self._WriteManifest()
+
+    def Write(self, result: BatchResult, parameter_set: int=0):
+        """Writes the seasons of one parameter set of a `BatchResult` as a chunk"""
+        self.WriteArrays(**{field: getattr(result, field)[parameter_set] for field in self.dtypes})
+
+    # Accumulator interface of `scheduler.Scheduler`
+    Add = Write
+
+    def ObserveWeek(self, week: int, standings: Standings):
+        """Buffers the standings of a `Simulator` season after its final week
+
+        Raises:
+            ValueError: If the writer was created without `weeks`
+
+        """
+        if self.weeks is None:
+            raise ValueError("StandingsWriter needs the number of weeks to be used as an observer")
+        if week != self.weeks - 1:
+            return
+        self.buffer.append([[getattr(standings[team], field) for team in self.teams] for field in self.dtypes])
+        if len(self.buffer) >= self.chunk_size:
+            self.Flush()
+
+    def Flush(self):
+        if self.buffer:
+            arrays = numpy.array(self.buffer).transpose(1, 0, 2)
+            self.buffer = []
+            self.WriteArrays(**dict(zip(self.dtypes, arrays)))
+
+    def Close(self):
+        self.Flush()
+        self._WriteManifest()
+
+    def _WriteManifest(self):
+        manifest = {'format': self.FORMAT, 'teams': self.teams, 'dtypes': self.dtypes, 'chunks': self.chunks}
+        atomic_write(os.path.join(self.directory, self.MANIFEST), lambda f: f.write(json.dumps(manifest).encode()))
+
+
+class StandingsReader:
+    """Reads a directory written by `StandingsWriter`, memory-mapping the chunks.
+
+    Args:
+        directory: Directory holding `manifest.json` and the chunks
+
+    Attributes:
+        teams (List[str]): Team names, in column order
+        chunks (List[Dict]): Number of seasons and file of every field, for every chunk
+
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, StandingsWriter.MANIFEST)) as f:
+            manifest = json.load(f)
+        if manifest['format'] != StandingsWriter.FORMAT:
+            raise ValueError(f"Unsupported format {manifest['format']}")
+        self.teams = manifest['teams']
+        self.fields = list(manifest['dtypes'])
+        self.chunks = manifest['chunks']
+
+    @property
+    def seasons(self) -> int:
+        return sum(chunk['seasons'] for chunk in self.chunks)
+
+    def Chunks(self, field: str) -> Iterator[numpy.ndarray]:
+        """Memory-mapped arrays of `field`, one per chunk, indexed by `[season, team]`"""
+        for chunk in self.chunks:
+            yield numpy.load(os.path.join(self.directory, chunk['files'][field]), mmap_mode='r')
+
+    def Load(self, field: str) -> numpy.ndarray:
+        """All seasons of `field` in memory"""
+        return numpy.concatenate(list(self.Chunks(field)))
+
+
+def export_simulation(compiled: CompiledSeason, directory: str, seasons: int, batch_size: int=10000,
+                      seed: Optional[int]=None) -> List[Dict]:
+    """Simulates `seasons` seasons in batches with `BatchSimulator`, writing each batch as
+    a chunk as soon as it is done.
+
+    Returns:
+        The chunks of the manifest
+
+    """
+    rng = numpy.random.default_rng(seed)
+    writer = StandingsWriter(directory, compiled.teams)
+    simulator = BatchSimulator(compiled)
+    for start in range(0, seasons, batch_size):
+        writer.Write(simulator.Simulate(min(batch_size, seasons - start), rng))
+    writer.Close()
+    return writer.chunks
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export simulated final standings as .npy chunks')
+    parser.add_argument('output')
+    parser.add_argument('--directory', default=os.path.join('data', '2016'))
+    parser.add_argument('--seasons', type=int, default=100000)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    chunks = export_simulation(CompiledSeason.FromJSONDirectory(args.directory), args.output,
+                               args.seasons, args.batch_size, args.seed)
+    print(f'Wrote {sum(c["seasons"] for c in chunks)} seasons in {len(chunks)} chunks to {args.output}')
@@ -2,10 +2,15 @@ import math
 import random
 from typing import Optional
 
+import numpy
 import scipy.stats
 
 import elo
 
+# Overtime games have resulted in 1 SAF win, 22 FG wins, and 52 TD wins
+OVERTIME_MARGINS = [2] + 52*[3] + 22*[6]
+# Mean of the Beta(5, 74) distribution used to decide whether overtime ends in a tie
+TIE_RATE = 5.0 / 79.0
 
 def sign(x: float) -> float:
     """Returns +1.0 for positive `x` and -1.0 for negative `x`"""
@@ -109,6 +114,22 @@ def get_spread(mu: float,
         return result
     if random.random() < scipy.stats.beta(5, 74).rvs(random_state=random_state):
         return 0
-    # Overtime games have resulted in 1 SAF win, 22 FG wins, and 52 TD wins
     # Choose a random representative outcome
-    return random.choice([1, -1]) * random.choice([2] + 52*[3] + 22*[6])
+    return random.choice([1, -1]) * random.choice(OVERTIME_MARGINS)
+
+
+def inv_erf_array(x: numpy.ndarray) -> numpy.ndarray:
+    """Element-wise version of `inv_erf` for arrays; no range checking is performed."""
+    log = numpy.log(1.0 - x**2)
+    a = 8.0 * (math.pi - 3.0) / (3.0 * math.pi * (4.0 - math.pi))
+    common_term = 2.0 / (math.pi * a) + log / 2.0
+    result = numpy.sqrt(common_term**2 - (log / a)) - common_term
+    return numpy.copysign(numpy.sqrt(result), x)
+
+
+def get_sigma_array(mu: numpy.ndarray, prob: numpy.ndarray) -> numpy.ndarray:
+    """Element-wise version of `get_sigma` for arrays, including its limit for `mu = 0`."""
+    den = inv_erf_array(1.0 - 2.0 * prob) * math.sqrt(2.0)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        sigma = -mu / den
+    return numpy.where(den == 0.0, 11.087, sigma)
@@ -0,0 +1,135 @@
+import os
+import argparse
+from typing import Dict, Optional, Sequence
+
+import numpy
+
+import elo
+import inv_erf
+from standings import Standings
+from batch_simulator import ModelParameters, Draws, sample_spreads, outcome_probabilities
+
+
+class MatchupMatrix:
+    """Every team's odds against every other team at home, away and at a neutral site,
+    computed in one vectorized step instead of one `ELOGameSimulator` per pair.
+
+    Arrays are indexed by `[venue, team, opponent]`, with venues ordered as `VENUES` and
+    always from the point of view of `team`.  Diagonal entries are `nan`.
+
+    Args:
+        standings: Ratings of every team
+        parameters (optional): Game model parameters
+
+    Attributes:
+        teams (List[str]): Team names in sorted order
+        index (Dict[str, int]): Position of every team
+        elo (numpy.ndarray): Current ELO of every team
+        margin (numpy.ndarray): ELO advantage, see `ELOGameSimulator.ELOMargin`
+        win_probability (numpy.ndarray): See `ELOGameSimulator.HomeWinProbability`
+        point_margin (numpy.ndarray): Expected margin, see `ELOGameSimulator.PointMargin`
+        tie_probability (numpy.ndarray): Probability of a tie under the game model
+        spreads (numpy.ndarray): After `SampleSpreads`, the probability of each margin in
+                                 `[-max_spread, max_spread]`, with larger margins counted
+                                 in the edge bins, indexed by `[venue, team, opponent, bin]`
+
+    """
+    VENUES = ('home', 'away', 'neutral')
+
+    def __init__(self, standings: Standings, parameters: ModelParameters=ModelParameters()):
+        self.parameters = parameters
+        self.teams = sorted(standings)
+        self.index = {team: i for i, team in enumerate(self.teams)}
+        self.elo = numpy.array([standings[team].elo for team in self.teams], dtype=float)
+        shape = (len(self.VENUES), len(self.teams), len(self.teams))
+        self.margin = numpy.empty(shape)
+        self.win_probability = numpy.empty(shape)
+        self.point_margin = numpy.empty(shape)
+        self.tie_probability = numpy.empty(shape)
+        self.spreads = None
+        self.max_spread = None
+        self.samples = None
+        self.rng = None
+        everyone = numpy.arange(len(self.teams))
+        self._Compute(everyone, everyone)
+
+    def _Compute(self, rows: numpy.ndarray, columns: numpy.ndarray):
+        """Recomputes the block of every array for `rows` against `columns`"""
+        block = numpy.ix_(rows, columns)
+        difference = self.elo[rows, numpy.newaxis] - self.elo[numpy.newaxis, columns]
+        advantage = self.parameters.home_advantage
+        margin = numpy.stack([difference + advantage, difference - advantage, difference])
+        margin[:, rows[:, numpy.newaxis] == columns[numpy.newaxis, :]] = numpy.nan
+        probability = elo.probability(margin)
+        mu = margin / 25.0
+        sigma = inv_erf.get_sigma_array(mu, probability)
+        win, loss = outcome_probabilities(mu, sigma, self.parameters.tie_rate)
+        for name, value in [('margin', margin), ('win_probability', probability),
+                            ('point_margin', mu), ('tie_probability', 1.0 - win - loss)]:
+            getattr(self, name)[(slice(None),) + block] = value
+        if self.spreads is not None:
+            self.spreads[(slice(None),) + block] = self._SampleBlock(mu, sigma)
+
+    def _SampleBlock(self, mu: numpy.ndarray, sigma: numpy.ndarray, chunk: int=1000) -> numpy.ndarray:
+        """Monte Carlo distribution of the margin for every entry of `mu` and `sigma`"""
+        shape = mu.shape
+        n_bins = 2 * self.max_spread + 1
+        counts = numpy.zeros((mu.size, n_bins), dtype=numpy.int64)
+        offsets = n_bins * numpy.arange(mu.size)
+        valid = ~numpy.isnan(mu.ravel())
+        mu, sigma = numpy.nan_to_num(mu.ravel()), numpy.nan_to_num(sigma.ravel(), nan=1.0)
+        for start in range(0, self.samples, chunk):
+            size = min(chunk, self.samples - start)
+            draws = Draws(*self.rng.random((3, size, mu.size)))
+            spread = sample_spreads(mu, sigma, draws, self.parameters.tie_rate)
+            bins = numpy.clip(spread, -self.max_spread, self.max_spread) + self.max_spread + offsets
+            counts += numpy.bincount(bins.ravel(), minlength=counts.size).reshape(counts.shape)
+        distribution = counts / self.samples
+        distribution[~valid] = numpy.nan
+        return distribution.reshape(shape + (n_bins,))
+
+    def SampleSpreads(self, samples: int=10000, max_spread: int=40, rng: Optional[numpy.random.Generator]=None):
+        """Estimates the distribution of the margin of every matchup from `samples` games
+        each, kept up to date by later calls to `Update`.
+
+        """
+        self.samples = samples
+        self.max_spread = max_spread
+        self.rng = rng or numpy.random.default_rng()
+        self.spreads = numpy.empty(self.margin.shape + (2 * max_spread + 1,))
+        everyone = numpy.arange(len(self.teams))
+        self._Compute(everyone, everyone)
+
+    def Update(self, ratings: Dict[str, float]):
+        """Changes the ELO of some teams, recomputing only their rows and columns"""
+        changed = numpy.array(sorted(self.index[team] for team in ratings), dtype=numpy.intp)
+        if not len(changed):
+            return
+        for team, rating in ratings.items():
+            self.elo[self.index[team]] = rating
+        everyone = numpy.arange(len(self.teams))
+        self._Compute(changed, everyone)
+        unchanged = numpy.setdiff1d(everyone, changed, assume_unique=True)
+        if len(unchanged):
+            self._Compute(unchanged, changed)
+
+    def Rankings(self, venue: str='neutral') -> Sequence[str]:
+        """Teams ordered by their mean win probability against every other team"""
+        strength = numpy.nanmean(self.win_probability[self.VENUES.index(venue)], axis=1)
+        return [self.teams[i] for i in numpy.argsort(-strength, kind='stable')]
+
+    def PrintRankings(self, venue: str='neutral'):
+        v = self.VENUES.index(venue)
+        print(f'{"Team":<5}{"ELO":>6}{"Win %":>8}{"Margin":>8}')
+        for team in self.Rankings(venue):
+            t = self.index[team]
+            print(f'{team:<5}{self.elo[t]:>6.0f}{100 * numpy.nanmean(self.win_probability[v, t]):>8.1f}'
+                  f'{numpy.nanmean(self.point_margin[v, t]):>8.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Power rankings from the all pairs matchup matrix')
+    parser.add_argument('--directory', default=os.path.join('data', '2016'))
+    parser.add_argument('--venue', default='neutral', choices=MatchupMatrix.VENUES)
+    args = parser.parse_args()
+    MatchupMatrix(Standings.FromJSONDirectory(args.directory)).PrintRankings(args.venue)
@@ -0,0 +1,193 @@
+import os
+import sys
+import json
+import time
+import cProfile
+import collections
+import contextlib
+from typing import Any, Dict, Iterable, Optional, TextIO
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from elo_game import ELOGameSimulator, ELOKnownGame
+
+
+def peak_rss(children: bool=False) -> Optional[int]:
+    """Peak resident set size of the current process in bytes, or `None` if unknown.
+    With `children`, the largest peak of any terminated child process instead.
+
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes while macOS reports bytes
+    return peak if sys.platform == 'darwin' else 1024 * peak
+
+
+class NullMetrics:
+    """Instrumentation that records nothing.  Used as the default everywhere so that
+    simulation code never needs to check whether metrics are enabled; every hook is a
+    single no-op call.
+
+    """
+    enabled = False
+
+    def Stage(self, name: str):
+        return contextlib.nullcontext()
+
+    def Count(self, name: str, value: int=1):
+        pass
+
+    def ObserveGame(self, game: ELOGameSimulator):
+        pass
+
+    def Start(self, total_seasons: Optional[int]=None):
+        pass
+
+    def StartSeason(self):
+        pass
+
+    def EndSeason(self):
+        pass
+
+    def Stop(self):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+class Metrics(NullMetrics):
+    """Collects per-stage timers and counters for a simulation run.
+
+    Stages used by the simulation pipeline are `load`, `verify_data`, `copy`, `simulate`,
+    `verify_simulation` and `aggregate`.  Counters include `seasons`, `games` and `rng_draws`,
+    the random numbers drawn by `inv_erf.get_spread`: one for the spread of every simulated
+    game and two more for the overtime of every tie.  A decided overtime can't be told apart
+    from a regulation result, so its draws are counted once.
+    `Multisimulator` calls `Stop` once its run finishes; when driving a `Simulator` directly,
+    call `Stop` before exporting the report.
+
+    Args:
+        progress (optional): Print progress and ETA to `stream` while running
+        progress_interval (optional): Minimum number of seconds between progress lines
+        profile_seasons (optional): Indices of seasons for which a profile is recorded
+        profile_dir (optional): Directory receiving one `.prof` file per profiled season and stage
+        stream (optional): Destination of progress output, default `sys.stderr`
+
+    Attributes:
+        timers (Dict[str, float]): Seconds spent in each stage
+        counters (Dict[str, int]): Event counts
+
+    """
+    enabled = True
+
+    def __init__(self, progress: bool=False, progress_interval: float=1.0,
+                 profile_seasons: Iterable[int]=(), profile_dir: Optional[str]=None,
+                 stream: Optional[TextIO]=None):
+        self.timers = collections.defaultdict(float)
+        self.counters = collections.defaultdict(int)
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.profile_seasons = set(profile_seasons)
+        self.profile_dir = profile_dir or '.'
+        self.stream = stream or sys.stderr
+        self.total_seasons = None
+        self.start_time = None
+        self.stop_time = None
+        self._last_progress = 0.0
+        self._profiling = False
+
+    @contextlib.contextmanager
+    def Stage(self, name: str):
+        """Context manager timing a stage; while profiling a season, each stage
+        is profiled separately.
+
+        """
+        profiler = None
+        if self._profiling:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] += time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                season = self.counters['seasons']
+                profiler.dump_stats(os.path.join(self.profile_dir, f'season{season:06d}_{name}.prof'))
+
+    def Count(self, name: str, value: int=1):
+        self.counters[name] += value
+
+    def ObserveGame(self, game: ELOGameSimulator):
+        """Counts the random numbers drawn to simulate `game`"""
+        if not isinstance(game, ELOKnownGame):
+            self.counters['rng_draws'] += 3 if game.tie else 1
+
+    def Start(self, total_seasons: Optional[int]=None):
+        """Marks the beginning of a run of `total_seasons` seasons, used for the ETA.
+        Only the first call has an effect, so nested simulators may call it freely.
+
+        """
+        if self.start_time is None:
+            self.start_time = time.perf_counter()
+        if self.total_seasons is None:
+            self.total_seasons = total_seasons
+
+    def StartSeason(self):
+        self._profiling = self.counters['seasons'] in self.profile_seasons
+        if self._profiling:
+            os.makedirs(self.profile_dir, exist_ok=True)
+
+    def EndSeason(self):
+        self._profiling = False
+        self.counters['seasons'] += 1
+        if self.progress:
+            now = time.perf_counter()
+            if now - self._last_progress >= self.progress_interval:
+                self._last_progress = now
+                self.PrintProgress()
+
+    def Stop(self):
+        self.stop_time = time.perf_counter()
+        if self.progress:
+            self.PrintProgress()
+            print(file=self.stream)
+
+    @property
+    def elapsed(self) -> float:
+        if self.start_time is None:
+            return 0.0
+        return (self.stop_time or time.perf_counter()) - self.start_time
+
+    def PrintProgress(self):
+        done = self.counters['seasons']
+        rate = done / self.elapsed if self.elapsed else 0.0
+        line = f'{done} seasons, {rate:.1f} seasons/s'
+        if self.total_seasons:
+            line = f'{done}/{self.total_seasons} seasons, {rate:.1f} seasons/s'
+            if rate:
+                line += f', ETA {(self.total_seasons - done) / rate:.0f}s'
+        print(f'\r{line}', end='', file=self.stream, flush=True)
+
+    def Report(self) -> Dict[str, Any]:
+        """Summarizes the run as a JSON-serializable dictionary"""
+        elapsed = self.elapsed
+        report = {'elapsed': elapsed,
+                  'stages': dict(self.timers),
+                  'counters': dict(self.counters),
+                  'peak_rss': peak_rss()}
+        if elapsed:
+            report['seasons_per_second'] = self.counters['seasons'] / elapsed
+            report['games_per_second'] = self.counters['games'] / elapsed
+        return report
+
+    def Export(self, json_file: str):
+        """Writes `Report` to `json_file`"""
+        with open(json_file, 'w') as f:
+            json.dump(self.Report(), f, indent=2, sort_keys=True)
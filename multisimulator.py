@@ -1,54 +1,267 @@
 import os
+import time
+import random
+import logging
 import collections
 import functools
+from typing import Dict, List, Optional
+
+import numpy
+import scipy.stats
+
+import inv_erf
+from elo_game import ELOGameSimulator
+from checkpoint import get_random_state, set_random_state, save_checkpoint, load_checkpoint
+from result_cache import ResultCache, content_hash
 
 from season import Season
 from standings import Standings
 from simulator import Simulator
+from clinch import ClinchAnalyzer
+from metrics import NullMetrics, NULL_METRICS
 
 
 class Multisimulator:
-    """
+    """Estimates how much the undefeated percentages vary between runs of `simulations`
+    seasons, by default by running `experiments` independent `Simulator` instances.
+
+    With `interval`, a single pool of `seasons` seasons is simulated instead and the
+    per-experiment counts are derived from it, so every season contributes to every
+    band and `PrintUndefeated` produces the same report for a fraction of the compute:
+
+        'binomial': each team's count in a run of `simulations` seasons is binomial with
+                    the pooled probability, and the experiments are its quantiles
+        'bootstrap': each experiment resamples `simulations` seasons from the pool
+
+    With `prune`, `settled` holds the exact undefeated probabilities of the teams whose
+    outcome `ClinchAnalyzer` proves certain, which are reported instead of their bands.
 
     """
-    def __init__(self, season, standings, simulations, experiments):
+    INTERVALS = ('binomial', 'bootstrap')
+    # Bump when the simulation changes in a way that invalidates cached results
+    CACHE_VERSION = 1
+
+    def __init__(self, season, standings, simulations, experiments, metrics: NullMetrics=NULL_METRICS,
+                 seed: Optional[int]=None, interval: Optional[str]=None, seasons: Optional[int]=None,
+                 prune: bool=False):
+        if interval is not None and interval not in self.INTERVALS:
+            raise ValueError(f"Unknown interval {interval}, expected one of {self.INTERVALS}")
         self.season = season
         self.standings = standings
         self.simulations = simulations
         self.experiments = experiments
+        self.metrics = metrics
+        self.seed = seed
+        self.interval = interval
+        self.prune = prune
+        self.seasons = seasons or 10 * simulations
+        self.results = None
+        self.simulated = 0
         self.undefeated = None
+        self.settled = {}
+        self.checkpoint_time = 0.0
 
     @classmethod
-    def FromJSON(cls, season_file, standings_file, simulations, experiments):
-        return cls(Season.FromJSON(season_file),
-                   Standings.FromJSON(standings_file),
+    def FromJSON(cls, season_file, standings_file, simulations, experiments, metrics: NullMetrics=NULL_METRICS,
+                 seed: Optional[int]=None, interval: Optional[str]=None, seasons: Optional[int]=None,
+                 prune: bool=False):
+        with metrics.Stage('load'):
+            standings = Standings.FromJSON(standings_file)
+        return cls(Season.FromJSON(season_file, metrics),
+                   standings,
                    simulations,
-                   experiments)
+                   experiments,
+                   metrics,
+                   seed,
+                   interval,
+                   seasons,
+                   prune)
 
     @classmethod
-    def FromJSONDirectory(cls, directory, simulations, experiments):
-        return cls(Season.FromJSONDirectory(directory),
-                   Standings.FromJSONDirectory(directory),
+    def FromJSONDirectory(cls, directory, simulations, experiments, metrics: NullMetrics=NULL_METRICS,
+                          seed: Optional[int]=None, interval: Optional[str]=None, seasons: Optional[int]=None,
+                          prune: bool=False):
+        with metrics.Stage('load'):
+            standings = Standings.FromJSONDirectory(directory)
+        return cls(Season.FromJSONDirectory(directory, metrics),
+                   standings,
                    simulations,
-                   experiments)
+                   experiments,
+                   metrics,
+                   seed,
+                   interval,
+                   seasons,
+                   prune)
+
+    def CacheKey(self) -> str:
+        """Hash of everything determining the per-experiment results: the schedule,
+        the starting standings, the model constants, the number of simulations per
+        experiment and the seed.
 
-    def Simulate(self):
         """
+        schedule = [[list(game) for game in week] for week in self.season]
+        standings = {name: [team.elo, team.wins, team.losses, team.ties]
+                     for name, team in sorted(self.standings.items())}
+        if self.standings.uncertainty:
+            standings['uncertainty'] = self.standings.uncertainty
+        model = [ELOGameSimulator.K, ELOGameSimulator.HOME_ADVANTAGE, inv_erf.TIE_RATE, inv_erf.OVERTIME_MARGINS]
+        parts = [self.CACHE_VERSION, schedule, standings, model, self.simulations, self.seed]
+        # Pruned runs consume random numbers differently
+        if self.prune:
+            parts.append('prune')
+        return content_hash(*parts)
+
+    def _SeedExperiment(self, experiment: int):
+        """Seeds both generators from `seed` and the experiment index, so that any
+        experiment can be reproduced without running the ones before it.
 
-        :return:
         """
-        undefeated = {'ANY': []}
-        for i in range(self.experiments):
-            simulator = Simulator(self.season, self.standings, self.simulations)
+        state = numpy.random.SeedSequence([self.seed, experiment]).generate_state(2)
+        random.seed(int(state[0]) << 32 | int(state[1]))
+        numpy.random.seed(state)
+
+    def Simulate(self, checkpoint: Optional[str]=None, checkpoint_interval: float=60.0, resume: bool=False,
+                 cache: Optional[ResultCache]=None):
+        """Runs `experiments` independent `Simulator` instances, each of `simulations` seasons.
+
+        When `checkpoint` is given, the accumulated results and the random number generator
+        positions are written to that file at most every `checkpoint_interval` seconds (and
+        once more at the end), always between experiments.  With `resume`, a run continues
+        from an existing checkpoint and produces the same result as an uninterrupted run.
+
+        With a `seed`, every experiment is seeded independently and the results can be
+        stored in `cache`.  A repeated run is then answered from the cache, and a run with
+        more experiments than cached only simulates the missing ones.
+
+        Args:
+            checkpoint (optional): Path of the checkpoint file
+            checkpoint_interval (optional): Minimum number of seconds between checkpoints
+            resume (optional): Continue from `checkpoint` if it exists
+            cache (optional): Cache of per-experiment results, requires `seed`
+
+        With `interval`, the single pool of seasons is simulated by `SimulatePooled`;
+        checkpoints and caching only apply to independent experiments.
+
+        Raises:
+            ValueError: If the checkpoint was made with a different number of simulations
+                        or already holds more experiments than requested, if `cache`
+                        is given without a `seed`, or if either is used with `interval`
+
+        """
+        if self.interval is not None:
+            if checkpoint is not None or cache is not None:
+                raise ValueError("Checkpoints and caching are not supported with interval estimation")
+            self.SimulatePooled()
+            return
+        results = []
+        cached = []
+        if cache is not None:
+            if self.seed is None:
+                raise ValueError("Caching results requires a seed")
+            key = self.CacheKey()
+            cached = cache.Get(key) or []
+            results = cached[:self.experiments]
+        if resume and checkpoint is not None and os.path.exists(checkpoint):
+            state = load_checkpoint(checkpoint)
+            if state['simulations'] != self.simulations:
+                raise ValueError(f"Checkpoint has {state['simulations']} simulations per experiment, "
+                                 f"expected {self.simulations}")
+            if state['completed'] > self.experiments:
+                raise ValueError(f"Checkpoint has {state['completed']} experiments, "
+                                 f"expected at most {self.experiments}")
+            if state['completed'] > len(results):
+                results = state['results']
+                set_random_state(state['random_state'])
+                logging.info("Resuming from %s after %d experiments", checkpoint, len(results))
+        start = len(results)
+        self.simulated = 0
+        self.checkpoint_time = 0.0
+        self.metrics.Start(self.simulations * (self.experiments - start))
+        run_start = last_checkpoint = time.perf_counter()
+        for i in range(start, self.experiments):
+            if self.seed is not None:
+                self._SeedExperiment(i)
+            simulator = Simulator(self.season, self.standings, self.simulations, self.metrics, prune=self.prune)
             simulator.Simulate()
-            count_undefeated = collections.Counter(simulator.undefeated)
-            for team in count_undefeated:
-                if team in undefeated:
-                    undefeated[team].append(count_undefeated[team])
-                else:
-                    undefeated[team] = [count_undefeated[team]]
-            undefeated['ANY'].append(collections.Counter(simulator.nUndefeated)[1])
-        self.undefeated = {team: sorted(undefeated[team]) for team in undefeated}
+            self.settled = simulator.settled
+            count_undefeated = collections.Counter(team.name for team in simulator.undefeated)
+            count_undefeated['ANY'] = collections.Counter(simulator.nUndefeated)[1]
+            results.append(count_undefeated)
+            self.simulated += 1
+            now = time.perf_counter()
+            if checkpoint is not None and (now - last_checkpoint >= checkpoint_interval
+                                           or i + 1 == self.experiments):
+                self._SaveCheckpoint(checkpoint, results)
+                last_checkpoint = time.perf_counter()
+                self.checkpoint_time += last_checkpoint - now
+        if checkpoint is not None:
+            elapsed = time.perf_counter() - run_start
+            logging.info("Checkpoint overhead %.3fs of %.3fs (%.2f%%)", self.checkpoint_time, elapsed,
+                         100.0 * self.checkpoint_time / elapsed if elapsed else 0.0)
+        if self.prune and start == self.experiments:
+            self.settled = ClinchAnalyzer(self.season, self.standings).SettledUndefeated()
+        if cache is not None and len(results) > len(cached):
+            cache.Put(key, results)
+        self.results = results
+        self.undefeated = self._CollectUndefeated(results)
+        self.metrics.Stop()
+
+    def SimulatePooled(self):
+        """Simulates one pool of `seasons` seasons and derives `experiments` per-experiment
+        counts of `simulations` seasons from it, according to `interval`.
+
+        """
+        self.metrics.Start(self.seasons)
+        if self.seed is not None:
+            self._SeedExperiment(0)
+        simulator = Simulator(self.season, self.standings, self.seasons, self.metrics, prune=self.prune)
+        simulator.Simulate()
+        self.settled = simulator.settled
+        teams = sorted({team for undefeated in simulator.seasonUndefeated for team in undefeated})
+        column = {team: i for i, team in enumerate(teams)}
+        # One row per season: undefeated flag of every team, then whether any team was
+        outcomes = numpy.zeros((self.seasons, len(teams) + 1), dtype=bool)
+        for i, undefeated in enumerate(simulator.seasonUndefeated):
+            outcomes[i, [column[team] for team in undefeated]] = True
+            outcomes[i, -1] = bool(undefeated)
+        names = teams + ['ANY']
+        if self.interval == 'binomial':
+            quantiles = (numpy.arange(self.experiments) + 0.5) / self.experiments
+            counts = scipy.stats.binom.ppf(quantiles[:, numpy.newaxis], self.simulations,
+                                           outcomes.mean(axis=0)).astype(int)
+        else:
+            rng = numpy.random.default_rng(self.seed)
+            counts = numpy.array([outcomes[rng.integers(self.seasons, size=self.simulations)].sum(axis=0)
+                                  for _ in range(self.experiments)])
+        self.results = [collections.Counter(dict(zip(names, map(int, row)))) for row in counts]
+        self.simulated = self.experiments
+        self.undefeated = self._CollectUndefeated(self.results)
+        self.metrics.Stop()
+
+    @staticmethod
+    def _CollectUndefeated(results: List[Dict[str, int]]) -> Dict[str, List[int]]:
+        """Converts per-experiment counts into sorted per-team lists of counts; a team
+        only contributes for the experiments in which it went undefeated.
+
+        """
+        undefeated = {'ANY': []}
+        for count_undefeated in results:
+            for team, count in count_undefeated.items():
+                if team == 'ANY':
+                    undefeated['ANY'].append(count)
+                elif count:
+                    undefeated.setdefault(team, []).append(count)
+        return {team: sorted(undefeated[team]) for team in undefeated}
+
+    def _SaveCheckpoint(self, checkpoint, results):
+        """Stores the per-experiment counts together with the generator positions
+        needed to continue the run.
+
+        """
+        save_checkpoint(checkpoint, {'simulations': self.simulations,
+                                     'completed': len(results),
+                                     'results': results,
+                                     'random_state': get_random_state()})
 
     def _PrintUndefeated(self, percentile, do_range=True):
         """
@@ -66,6 +279,8 @@ class Multisimulator:
         if self.undefeated is None:
             self.Simulate()
         for team in self.undefeated:
+            if team in self.settled:
+                continue
             result = self.undefeated[team]
             Percentile = functools.partial(GetPercentile, result)
             if do_range:
@@ -73,7 +288,7 @@ class Multisimulator:
                 p_max = Percentile((1.0 + percentile) / 2.0)
                 print(f'{team:<3} [{int(100 * percentile)}%]: {p_min}% - {p_max}%')
             else:
-                print(f'{team:<3} [{int(100 * percentile)}%]: {GetPercentile(percentile)}%')
+                print(f'{team:<3} [{int(100 * percentile)}%]: {Percentile(percentile)}%')
 
     def PrintUndefeated(self):
         """
@@ -83,3 +298,5 @@ class Multisimulator:
         for percentile in [0.50, 0.68, 0.95]:
             self._PrintUndefeated(percentile)
         self._PrintUndefeated(0.50, do_range=False)
+        for team, probability in sorted(self.settled.items()):
+            print(f'{team:<3} [exact]: {100.0 * probability:.3}%')
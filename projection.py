@@ -0,0 +1,123 @@
+import os
+import argparse
+from typing import Dict, List, Optional, Sequence
+
+import numpy
+
+from season import Season
+from standings import Standings
+from compiled_season import CompiledSeason
+from batch_simulator import BatchSimulator, BatchResult, ModelParameters
+
+# Share of the distance to the mean a rating loses between seasons, as for NFL ELO
+REGRESSION = 1 / 3
+
+
+def future_season(season: Season, elo: int=1505) -> CompiledSeason:
+    """Compiles the schedule of a season yet to be played: results in `season` are
+    dropped and every team starts without a record at `elo`, which is only used for
+    teams that did not play the season before in a `ChainedProjection`.
+
+    """
+    unplayed = Season({'schedule': [[game[:2] for game in week] for week in season]})
+    return CompiledSeason(unplayed, Standings.FromData({team: elo for team in season.teams}))
+
+
+class ChainedProjection:
+    """Projects several consecutive seasons with `BatchSimulator`.  The final ELO of
+    every simulated season is regressed towards the mean and becomes the starting ELO of
+    the same simulated future in the next season, entirely within the result arrays, so
+    the cost grows linearly with the number of seasons.
+
+    Teams are matched between seasons by name, after `renames`; teams new to a season
+    start from the ELO of its standings.
+
+    Args:
+        seasons: Compiled seasons in order, the first one usually current, see `future_season`
+        parameters (optional): One or more sets of model parameters
+        regression (optional): Share of the distance to the mean removed between seasons
+        mean (optional): ELO ratings regress to; by default the mean final ELO of the teams
+                         carried over, separately for every simulated future
+        renames (optional): New name of teams which changed names, by old name
+
+    """
+
+    def __init__(self, seasons: Sequence[CompiledSeason], parameters=ModelParameters(),
+                 regression: float=REGRESSION, mean: Optional[float]=None,
+                 renames: Optional[Dict[str, str]]=None):
+        if not 0 <= regression <= 1:
+            raise ValueError(f"Regression must be between 0 and 1, found {regression}")
+        self.seasons = list(seasons)
+        self.simulators = [BatchSimulator(compiled, parameters) for compiled in self.seasons]
+        self.regression = regression
+        self.mean = mean
+        renames = renames or {}
+        # Index in the previous season of every team of each later season, -1 for new teams
+        self.carry = []
+        for previous, compiled in zip(self.seasons, self.seasons[1:]):
+            index = {renames.get(team, team): t for t, team in enumerate(previous.teams)}
+            self.carry.append(numpy.array([index.get(team, -1) for team in compiled.teams], dtype=numpy.intp))
+
+    def Regress(self, elo: numpy.ndarray, season: int) -> numpy.ndarray:
+        """Starting ELO of season `season`, from the final `elo` of the season before,
+        both indexed by `[parameter set, season, team]`.
+
+        """
+        carry = self.carry[season - 1]
+        kept = carry >= 0
+        final = elo[..., carry[kept]].astype(numpy.float64)
+        mean = final.mean(axis=-1, keepdims=True) if self.mean is None else self.mean
+        start = numpy.empty(elo.shape[:-1] + carry.shape, dtype=numpy.int64)
+        start[...] = self.seasons[season].elo
+        start[..., kept] = numpy.rint(mean + (1.0 - self.regression) * (final - mean))
+        return start
+
+    def Simulate(self, seasons: int, rng: Optional[numpy.random.Generator]=None,
+                 dtype=numpy.int64) -> List[BatchResult]:
+        """Simulates `seasons` futures of every season in turn.
+
+        Returns:
+            The final standings of every season, in order; the same index along the
+            season axis of each result is the same simulated future
+
+        """
+        rng = rng or numpy.random.default_rng()
+        results = [self.simulators[0].Simulate(seasons, rng, dtype=dtype)]
+        for season in range(1, len(self.seasons)):
+            start_elo = self.Regress(results[-1].elo, season)
+            results.append(self.simulators[season].Simulate(seasons, rng, start_elo=start_elo, dtype=dtype))
+        return results
+
+
+def print_projection(projection: ChainedProjection, results: Sequence[BatchResult]):
+    """Prints the mean wins, mean final ELO and chance of finishing undefeated of every
+    team in every season, for the first parameter set.
+
+    """
+    for number, result in enumerate(results, 1):
+        undefeated = result.Undefeated()[0]
+        print(f'Season {number}: ANY undefeated {100 * undefeated.any(axis=1).mean():.3f}%')
+        for t, team in enumerate(result.teams):
+            print(f'    {team:<4} {result.wins[0, :, t].mean():6.3f} wins, ELO {result.elo[0, :, t].mean():7.1f} '
+                  f'+- {result.elo[0, :, t].std():5.1f}, undefeated {100 * undefeated[:, t].mean():7.3f}%')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Project several consecutive seasons')
+    parser.add_argument('--directory', default=os.path.join('data', '2016'), help='Current season')
+    parser.add_argument('--schedule', nargs='*', default=[],
+                        help='schedule.json of each following season, by default the current one repeated')
+    parser.add_argument('--years', type=int, default=3, help='Number of seasons, including the current one')
+    parser.add_argument('--regression', type=float, default=REGRESSION)
+    parser.add_argument('--mean', type=float)
+    parser.add_argument('--rename', nargs='*', default=[], metavar='OLD=NEW')
+    parser.add_argument('--seasons', type=int, default=10000)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    current = Season.FromJSONDirectory(args.directory)
+    schedules = [Season.FromJSON(path) for path in args.schedule] or [current] * (args.years - 1)
+    compiled = [CompiledSeason(current, Standings.FromJSONDirectory(args.directory))]
+    compiled += [future_season(schedule) for schedule in schedules]
+    projection = ChainedProjection(compiled, regression=args.regression, mean=args.mean,
+                                   renames=dict(rename.split('=') for rename in args.rename))
+    print_projection(projection, projection.Simulate(args.seasons, numpy.random.default_rng(args.seed)))
@@ -0,0 +1,66 @@
+import os
+import json
+import pickle
+import hashlib
+from typing import Any, Optional
+
+from checkpoint import save_checkpoint
+
+
+def content_hash(*parts: Any) -> str:
+    """SHA-256 of the canonical JSON encoding of `parts`, used as a cache key"""
+    encoded = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=repr)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class ResultCache:
+    """Content-addressed on-disk cache of simulation results.  Each entry is a pickle file
+    named by its key; since keys are hashes of the inputs, changed input data simply maps
+    to a new key and the outdated entry is never served again.  Entries are evicted in
+    least-recently-used order, tracked through file modification times, once the cache
+    holds more than `max_bytes`.
+
+    Args:
+        directory: Where entries are stored, created if needed
+        max_bytes (optional): Upper bound on the total size of all entries
+
+    """
+    suffix = '.pickle'
+
+    def __init__(self, directory: str, max_bytes: int=256 * 1024**2):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _Path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def Get(self, key: str) -> Optional[Any]:
+        """Returns the entry for `key`, or `None`, marking it as recently used"""
+        path = self._Path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        os.utime(path)
+        return value
+
+    def Put(self, key: str, value: Any):
+        """Stores `value` under `key`, then evicts old entries if the cache is too large"""
+        save_checkpoint(self._Path(key), value)
+        self.Evict()
+
+    def Evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(self.suffix):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime_ns, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        # Never evict the most recent entry, even if it alone exceeds the budget
+        for _, size, name in sorted(entries)[:-1]:
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
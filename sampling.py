@@ -0,0 +1,130 @@
+import os
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+import numpy
+import scipy.stats
+
+from compiled_season import CompiledSeason
+from batch_simulator import BatchSimulator, BatchResult, Draws, random_draws
+
+SAMPLERS = ('random', 'antithetic', 'sobol')
+
+
+def antithetic_draws(rng: numpy.random.Generator, seasons: int, games: int) -> Draws:
+    """Draws in mirrored pairs: the second half of the seasons uses `1 - u` for every
+    uniform of the first half, flipping the Gaussian spread and the overtime winner.
+
+    Raises:
+        ValueError: If `seasons` is odd
+
+    """
+    if seasons % 2:
+        raise ValueError(f"Antithetic sampling needs an even number of seasons, found {seasons}")
+    half = rng.random((3, seasons // 2, games))
+    return Draws(*numpy.concatenate([half, 1.0 - half], axis=1))
+
+
+def sobol_draws(rng: numpy.random.Generator, seasons: int, games: int) -> Draws:
+    """Scrambled Sobol points with one dimension per uniform of every unplayed game.
+    The balance properties only hold when `seasons` is a power of two.
+
+    """
+    sobol = scipy.stats.qmc.Sobol(3 * games, scramble=True, seed=rng)
+    points = sobol.random(seasons)
+    return Draws(*points.reshape(seasons, 3, games).transpose(1, 0, 2))
+
+
+DRAWS = {'random': random_draws, 'antithetic': antithetic_draws, 'sobol': sobol_draws}
+
+
+def control_variate_mean(y: numpy.ndarray, control: numpy.ndarray) -> numpy.ndarray:
+    """Estimates the mean of `y` along the first axis, corrected by a control with known
+    mean zero using the variance minimizing coefficient.  Both arrays are indexed by
+    `[season, ...]` and the correction is made independently for every other index.
+
+    """
+    y = numpy.asarray(y, dtype=float)
+    control = numpy.asarray(control, dtype=float)
+    c = control - control.mean(axis=0)
+    variance = (c * c).sum(axis=0)
+    covariance = (c * (y - y.mean(axis=0))).sum(axis=0)
+    beta = numpy.divide(covariance, variance, out=numpy.zeros_like(covariance), where=variance > 0)
+    return y.mean(axis=0) - beta * control.mean(axis=0)
+
+
+def estimate(result: BatchResult, control: bool=False, threshold: Optional[int]=None) -> Dict[str, numpy.ndarray]:
+    """Per-team estimates of expected wins and of the probability of reaching `threshold`
+    wins (by default 10 of 16 games, a typical playoff record), from the first parameter
+    set of `result`.
+
+    """
+    wins = result.wins[0]
+    if threshold is None:
+        threshold = int(0.625 * (result.wins + result.losses + result.ties)[0, 0].max())
+    targets = {'wins': wins, f'P(wins >= {threshold})': wins >= threshold}
+    if not control:
+        return {name: y.mean(axis=0) for name, y in targets.items()}
+    c = result.ControlVariate()[0]
+    return {name: control_variate_mean(y, c) for name, y in targets.items()}
+
+
+def variance_reduction(compiled: CompiledSeason, seasons: int=1024, replications: int=50,
+                       seed: Optional[int]=None) -> List[Tuple[str, Dict[str, float]]]:
+    """Measures how much every combination of sampler and control variate reduces the
+    variance of the estimates of `estimate`, relative to independent random draws.
+
+    Each method is run `replications` times with independent seeds, and the variance of
+    its estimates across replications is averaged over teams.
+
+    Returns:
+        Name of every method with the variance ratio (plain / method) for every estimate;
+        `nan` when nothing is random, as in a fully played season
+
+    """
+    simulator = BatchSimulator(compiled)
+    games = len(compiled.unplayed)
+    seeds = numpy.random.SeedSequence(seed).spawn(replications)
+    estimates = {}
+    for sampler in SAMPLERS:
+        runs = {False: [], True: []}
+        for child in seeds:
+            draws = DRAWS[sampler](numpy.random.default_rng(child), seasons, games)
+            result = simulator.Simulate(seasons, draws=draws, expected_wins=True)
+            for control in runs:
+                runs[control].append(estimate(result, control))
+        for control, values in runs.items():
+            name = sampler + (' + control' if control else '')
+            estimates[name] = {key: numpy.array([v[key] for v in values]).var(axis=0, ddof=1).mean()
+                               for key in values[0]}
+    baseline = estimates['random']
+    report = []
+    for name, variances in estimates.items():
+        ratios = {}
+        for key, variance in variances.items():
+            ratios[key] = baseline[key] / variance if variance > 0 else float('nan')
+        report.append((name, ratios))
+    return report
+
+
+def print_report(report: List[Tuple[str, Dict[str, float]]]):
+    keys = list(report[0][1])
+    print(f'{"method":<22}' + ''.join(f'{key:>18}' for key in keys))
+    for name, ratios in report:
+        print(f'{name:<22}' + ''.join(f'{ratios[key]:>17.2f}x' for key in keys))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure the variance saved by each sampling method')
+    parser.add_argument('--seasons', type=int, default=1024, help='Seasons per estimate, a power of two')
+    parser.add_argument('--replications', type=int, default=50)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('directories', nargs='*', default=[os.path.join('data', '2015'), os.path.join('data', '2016')])
+    args = parser.parse_args()
+    for directory in args.directories:
+        print(directory)
+        compiled = CompiledSeason.FromJSONDirectory(directory)
+        if not len(compiled.unplayed):
+            print('Every game has been played, there is no variance to reduce')
+            continue
+        print_report(variance_reduction(compiled, args.seasons, args.replications, args.seed))
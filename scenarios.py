@@ -0,0 +1,443 @@
+import os
+import argparse
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+import numpy
+import scipy.special
+
+import elo
+import inv_erf
+from compiled_season import CompiledSeason
+from batch_simulator import BatchSimulator, ModelParameters, elo_exchange, outcome_probabilities
+from season_kernel import _jit, JIT_AVAILABLE
+
+# Outcomes of a game, in the order of their digits
+HOME_WIN, TIE, AWAY_WIN = range(3)
+OUTCOMES = ('home win', 'tie', 'away win')
+
+
+def expected_log_margin(mu: numpy.ndarray, sigma: numpy.ndarray, tie_rate) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Expected `log(|spread| + 1)` of `batch_simulator.sample_spreads`, given that the
+    home team wins and given that the away team wins.  This is the part of the ELO
+    exchange of a game which depends on its margin.
+
+    """
+    mu, sigma = numpy.broadcast_arrays(numpy.asarray(mu, dtype=float), numpy.asarray(sigma, dtype=float))
+    largest = int(numpy.ceil(numpy.abs(mu).max(initial=0) + 12 * sigma.max(initial=1))) + 1
+    n = numpy.arange(1, largest + 1).reshape((-1,) + (1,) * mu.ndim)
+    log = numpy.log(n + 1.0)
+    p_home = scipy.special.ndtr((n + 0.5 - mu) / sigma) - scipy.special.ndtr((n - 0.5 - mu) / sigma)
+    p_away = scipy.special.ndtr((-n + 0.5 - mu) / sigma) - scipy.special.ndtr((-n - 0.5 - mu) / sigma)
+    home, away = (p_home * log).sum(axis=0), (p_away * log).sum(axis=0)
+    # Overtime: the winner is even and the margin follows the historical margins
+    p_overtime = scipy.special.ndtr((0.5 - mu) / sigma) - scipy.special.ndtr((-0.5 - mu) / sigma)
+    overtime = p_overtime * (1.0 - tie_rate) / 2.0 * numpy.log(numpy.array(inv_erf.OVERTIME_MARGINS) + 1.0).mean()
+    p_home_win, p_away_win = outcome_probabilities(mu, sigma, tie_rate)
+    return (home + overtime) / p_home_win, (away + overtime) / p_away_win
+
+
+@_jit
+def _apply_result(h, a, result, sign, wins, losses, ties):
+    """Adds (`sign` 1) or takes out (`sign` -1) `result` of a game of `h` at home to `a`"""
+    if result == HOME_WIN:
+        wins[h] += sign
+        losses[a] += sign
+    elif result == TIE:
+        ties[h] += sign
+        ties[a] += sign
+    else:
+        wins[a] += sign
+        losses[h] += sign
+
+
+@_jit
+def _update_mask(mask, t, bit, losses, ties):
+    """Sets or clears the bit of team `t` in the set of undefeated teams `mask`"""
+    if bit[t] >= 0:
+        if losses[t] == 0 and ties[t] == 0:
+            mask |= 1 << bit[t]
+        else:
+            mask &= ~(1 << bit[t])
+    return mask
+
+
+@_jit
+def _replay(first, home, away, previous, start, venue, low, chance, exchange, outcome, after, prefix):
+    """Recomputes the ratings after every game from `first` on, `after[2 * g]` for the
+    home team and `after[2 * g + 1]` for the away team, and the probability of the
+    results of the games up to it, `prefix[g + 1]`.
+
+    """
+    for i in range(first, len(home)):
+        j = previous[i, 0]
+        home_elo = start[home[i]] if j < 0 else after[j]
+        j = previous[i, 1]
+        away_elo = start[away[i]] if j < 0 else after[j]
+        d = home_elo - away_elo - low
+        v = venue[i]
+        o = outcome[i]
+        prefix[i + 1] = prefix[i] * chance[v, d, o]
+        after[2 * i] = home_elo + exchange[v, d, o]
+        after[2 * i + 1] = away_elo - exchange[v, d, o]
+
+
+@_jit
+def _gray_walk(home, away, previous, start, venue, low, chance, exchange, wins, losses, ties, bit, involved,
+               probability, marginals, win_distribution, undefeated_sets):
+    """Visits every outcome of the games between `home` and `away` in reflected ternary
+    Gray-code order, so that consecutive outcomes differ in a single game by one step
+    (home win, tie, away win), and accumulates the probability of each into
+    `probability`, indexed by the base 3 number whose digit `g` is the result of game
+    `g`, `marginals`, `win_distribution` of the `involved` teams and `undefeated_sets`.
+
+    The records `wins`, `losses` and `ties` and the set of undefeated teams, with bit
+    `bit[t]` for team `t`, are updated by the one game which changes.  The ratings
+    before game `g` are `start` or those after the previous game of each team, at
+    `previous[g]`, and the probability and the ELO won by the home team of every result
+    are looked up in `chance` and `exchange` by venue and rating difference minus `low`.
+
+    """
+    n_games = len(home)
+    outcome = numpy.zeros(n_games, dtype=numpy.int64)
+    after = numpy.zeros(2 * n_games, dtype=numpy.int64)
+    prefix = numpy.ones(n_games + 1)
+    power = numpy.ones(n_games, dtype=numpy.int64)
+    for g in range(n_games):
+        _apply_result(home[g], away[g], HOME_WIN, 1, wins, losses, ties)
+        if g:
+            power[g] = 3 * power[g - 1]
+    mask = 0
+    for t in range(len(bit)):
+        mask = _update_mask(mask, t, bit, losses, ties)
+    _replay(0, home, away, previous, start, venue, low, chance, exchange, outcome, after, prefix)
+    # Knuth's loopless reflected Gray code, with the last game as the fastest digit
+    focus = numpy.arange(n_games + 1)
+    direction = numpy.ones(n_games, dtype=numpy.int64)
+    code = 0
+    while True:
+        p = prefix[n_games]
+        probability[code] = p
+        for i in range(n_games):
+            marginals[i, outcome[i]] += p
+        for t in involved:
+            win_distribution[t, wins[t]] += p
+        undefeated_sets[mask] += p
+        j = focus[0]
+        focus[0] = 0
+        if j == n_games:
+            break
+        g = n_games - 1 - j
+        step = direction[j]
+        h, a = home[g], away[g]
+        _apply_result(h, a, outcome[g], -1, wins, losses, ties)
+        outcome[g] += step
+        _apply_result(h, a, outcome[g], 1, wins, losses, ties)
+        mask = _update_mask(mask, h, bit, losses, ties)
+        mask = _update_mask(mask, a, bit, losses, ties)
+        code += step * power[g]
+        if outcome[g] == 0 or outcome[g] == 2:
+            direction[j] = -step
+            focus[j] = focus[j + 1]
+            focus[j + 1] = j + 1
+        _replay(g, home, away, previous, start, venue, low, chance, exchange, outcome, after, prefix)
+
+
+class ScenarioEnumerator:
+    """Joint probabilities of every combination of results of the unplayed games, for
+    questions near the end of a season which Monte Carlo answers slowly and noisily,
+    like the chance that exactly one team finishes undefeated.
+
+    Every game ends in a home win, a tie or an away win, with the probabilities of the
+    game model of `BatchSimulator` given the ratings before the game, from
+    `elo.probability` and the overtime and tie model.  The ELO exchanged depends on the
+    margin, which is not enumerated.  When no team has more than one unplayed game,
+    e.g. in the final week, no result depends on an earlier exchange and the
+    probabilities are exact, see `exact`.  Otherwise, e.g. with two weeks left, the
+    enumeration is only done with `approximate`: after a result, ratings change by the
+    expected exchange given that result, rounded like a simulated one.
+
+    Outcomes are walked in Gray-code order by `_gray_walk`, each differing from the
+    previous one in a single game, so only the records of its two teams and the ratings
+    and probabilities of that game and the later ones change.  The walk accumulates
+    the game marginals, win distributions and sets of undefeated teams as it goes.
+    Outcome `code` is the base 3 number whose digit `g` is the result of unplayed game
+    `g`, see `OUTCOMES`.
+
+    Args:
+        compiled: Season with at most `max_games` unplayed games
+        parameters (optional): Model parameters
+        max_games (optional): Largest number of games enumerated, 3^16 is about 43
+                              million; the walk needs Numba to get that far quickly
+        approximate (optional): Allow teams with several unplayed games, approximating
+                                the exchanges of their earlier games
+
+    Attributes:
+        exact (bool): Whether the probabilities are exact, with at most one unplayed
+                      game for every team
+        games (numpy.ndarray): Schedule index of every unplayed game
+        elo (numpy.ndarray): ELO of every team after the played games
+        wins (numpy.ndarray): Wins of every team after the played games
+        losses (numpy.ndarray): Losses of every team after the played games
+        ties (numpy.ndarray): Ties of every team after the played games
+        contenders (List[str]): Teams which can still finish undefeated
+        probability (numpy.ndarray): Probability of every outcome, after `Enumerate`
+        marginals (numpy.ndarray): Probability of every result of every unplayed game,
+                                   indexed by `[game, outcome]`, after `Enumerate`
+        win_distribution (numpy.ndarray): Probability of every number of final wins,
+                                          indexed by `[team, wins]`, after `Enumerate`
+        undefeated_sets (numpy.ndarray): Probability of every set of `contenders`
+                                         finishing undefeated, indexed by the bitmask
+                                         of the set, after `Enumerate`
+
+    Raises:
+        ValueError: If there are too many unplayed games, a team has several unplayed
+                    games without `approximate`, or a played game follows an
+                    unplayed game of one of its teams
+
+    """
+
+    def __init__(self, compiled: CompiledSeason, parameters: ModelParameters=ModelParameters(),
+                 max_games: int=16 if JIT_AVAILABLE else 11, approximate: bool=False):
+        self.compiled = compiled
+        self.parameters = parameters
+        self.games = compiled.unplayed
+        if len(self.games) > max_games:
+            raise ValueError(f"{len(self.games)} unplayed games, at most {max_games} can be enumerated")
+        games_left = numpy.bincount(numpy.concatenate([compiled.home[self.games], compiled.away[self.games]]),
+                                    minlength=compiled.n_teams)
+        self.exact = bool((games_left <= 1).all())
+        if not self.exact and not approximate:
+            t = int(numpy.argmax(games_left))
+            raise ValueError(f"{compiled.teams[t]} has {games_left[t]} unplayed games, whose exchanges can "
+                             f"only be approximated; pass approximate=True to enumerate them anyway")
+        self.elo, self.wins, self.losses, self.ties = self._ApplyPlayed()
+        self.contenders = [team for t, team in enumerate(compiled.teams)
+                           if self.losses[t] == 0 and self.ties[t] == 0]
+        self.probability = None
+        self.marginals = None
+        self.win_distribution = None
+        self.undefeated_sets = None
+
+    @property
+    def n_games(self) -> int:
+        return len(self.games)
+
+    def _Margin(self, g: int, home_elo, away_elo):
+        margin = home_elo - away_elo
+        return margin if self.compiled.neutral[g] else margin + self.parameters.home_advantage
+
+    def _Exchange(self, diff, p_winner, log_margin):
+        """ELO won by the winner, as in `ELOGameSimulator.UpdateTeams`"""
+        return numpy.rint(elo_exchange(self.parameters.k, p_winner, log_margin, diff))
+
+    def _ApplyPlayed(self) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """Ratings and records after the played games, which must not depend on unplayed ones"""
+        compiled = self.compiled
+        ratings = compiled.elo.astype(numpy.int64)
+        wins, losses, ties = (x.astype(numpy.int64) for x in (compiled.wins, compiled.losses, compiled.ties))
+        pending = set()
+        for g in range(compiled.n_games):
+            h, a = compiled.home[g], compiled.away[g]
+            if not compiled.played[g]:
+                pending.update((h, a))
+                continue
+            if h in pending or a in pending:
+                raise ValueError(f"Played game {g} follows an unplayed game of "
+                                 f"{compiled.teams[h] if h in pending else compiled.teams[a]}")
+            spread = compiled.home_score[g] - compiled.away_score[g]
+            if spread == 0:
+                ties[h] += 1
+                ties[a] += 1
+                continue
+            p_home = elo.probability(self._Margin(g, ratings[h], ratings[a]))
+            winner, loser, p_winner = (h, a, p_home) if spread > 0 else (a, h, 1.0 - p_home)
+            points = int(self._Exchange(ratings[winner] - ratings[loser], p_winner, numpy.log(abs(spread) + 1.0)))
+            ratings[winner] += points
+            ratings[loser] -= points
+            wins[winner] += 1
+            losses[loser] += 1
+        return ratings, wins, losses, ties
+
+    def _Tables(self, low: int, high: int, neutral: bool) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """Probability of every result, and the ELO won by the home team, indexed by
+        `[home minus away rating - low, outcome]` for ratings differing by `low` to `high`
+
+        """
+        p = self.parameters
+        diff = numpy.arange(low, high + 1)
+        margin = diff if neutral else diff + p.home_advantage
+        p_home = elo.probability(margin)
+        mu = margin / 25.0
+        sigma = inv_erf.get_sigma_array(mu, p_home)
+        p_home_win, p_away_win = outcome_probabilities(mu, sigma, p.tie_rate)
+        log_home, log_away = expected_log_margin(mu, sigma, p.tie_rate)
+        chance = numpy.stack([p_home_win, 1.0 - p_home_win - p_away_win, p_away_win], axis=1)
+        exchange = numpy.stack([self._Exchange(diff, p_home, log_home), numpy.zeros(len(diff)),
+                                -self._Exchange(-diff, 1.0 - p_home, log_away)], axis=1)
+        return chance, exchange.astype(numpy.int64)
+
+    def _DifferenceRange(self) -> Tuple[int, int]:
+        """Bounds on the rating difference of the teams of any unplayed game, from the
+        largest exchange each game allows given the bounds of its teams before it
+
+        """
+        compiled = self.compiled
+        low, high = self.elo.copy(), self.elo.copy()
+        lowest, highest = 0, 0
+        for g in self.games:
+            h, a = compiled.home[g], compiled.away[g]
+            d_low, d_high = int(low[h] - high[a]), int(high[h] - low[a])
+            lowest, highest = min(lowest, d_low), max(highest, d_high)
+            step = int(numpy.abs(self._Tables(d_low, d_high, compiled.neutral[g])[1]).max())
+            low[[h, a]] -= step
+            high[[h, a]] += step
+        return lowest, highest
+
+    def Enumerate(self) -> numpy.ndarray:
+        """Walks every outcome, see `_gray_walk`, and returns the probability of each"""
+        compiled, n = self.compiled, self.n_games
+        home, away = compiled.home[self.games].astype(numpy.int64), compiled.away[self.games].astype(numpy.int64)
+        # Position in the ratings after each game of the previous game of both teams
+        previous = numpy.full((n, 2), -1, dtype=numpy.int64)
+        last = {}
+        for k in range(n):
+            for side, team in enumerate((home[k], away[k])):
+                previous[k, side] = last.get(team, -1)
+                last[team] = 2 * k + side
+        low, high = self._DifferenceRange()
+        chance, exchange = zip(*(self._Tables(low, high, neutral) for neutral in (False, True)))
+        venue = compiled.neutral[self.games].astype(numpy.int64)
+        bit = numpy.full(compiled.n_teams, -1, dtype=numpy.int64)
+        bit[[compiled.index[team] for team in self.contenders]] = numpy.arange(len(self.contenders))
+        involved = numpy.unique(numpy.concatenate([home, away]))
+        games_left = numpy.bincount(numpy.concatenate([home, away]), minlength=compiled.n_teams)
+        self.probability = numpy.zeros(3**n)
+        self.marginals = numpy.zeros((n, 3))
+        self.win_distribution = numpy.zeros((compiled.n_teams, int((self.wins + games_left).max()) + 1))
+        self.undefeated_sets = numpy.zeros(2**len(self.contenders))
+        _gray_walk(home, away, previous, self.elo, venue, low, numpy.stack(chance), numpy.stack(exchange),
+                   self.wins.copy(), self.losses.copy(), self.ties.copy(), bit, involved,
+                   self.probability, self.marginals, self.win_distribution, self.undefeated_sets)
+        fixed = numpy.flatnonzero(games_left == 0)
+        self.win_distribution[fixed, self.wins[fixed]] = 1.0
+        return self.probability
+
+    def _Enumerated(self):
+        if self.probability is None:
+            self.Enumerate()
+
+    def Outcome(self, game: int) -> numpy.ndarray:
+        """Result of unplayed game `game` in every outcome"""
+        digits = numpy.arange(3, dtype=numpy.uint8)[:, numpy.newaxis]
+        return numpy.broadcast_to(digits, (3**(self.n_games - 1 - game), 3, 3**game)).ravel()
+
+    def Probability(self, mask: numpy.ndarray) -> float:
+        """Total probability of the outcomes selected by the boolean `mask`"""
+        self._Enumerated()
+        return float(self.probability[mask].sum())
+
+    def GameMarginals(self) -> numpy.ndarray:
+        """Probability of every result of every unplayed game, indexed by `[game, outcome]`"""
+        self._Enumerated()
+        return self.marginals
+
+    def Wins(self, team: str) -> numpy.ndarray:
+        """Final wins of `team` in every outcome"""
+        compiled = self.compiled
+        t = compiled.index[team]
+        wins = numpy.full(3**self.n_games, self.wins[t], dtype=numpy.uint8)
+        for k, g in enumerate(self.games):
+            if compiled.home[g] == t:
+                wins += self.Outcome(k) == HOME_WIN
+            elif compiled.away[g] == t:
+                wins += self.Outcome(k) == AWAY_WIN
+        return wins
+
+    def WinDistribution(self) -> Dict[str, numpy.ndarray]:
+        """Probability of every number of final wins, for every team"""
+        self._Enumerated()
+        return dict(zip(self.compiled.teams, self.win_distribution))
+
+    def Undefeated(self) -> Dict[str, numpy.ndarray]:
+        """Whether every team which can still finish undefeated does, in every outcome"""
+        compiled = self.compiled
+        undefeated = {team: numpy.ones(3**self.n_games, dtype=bool) for team in self.contenders}
+        for k, g in enumerate(self.games):
+            for team, win in ((compiled.home[g], HOME_WIN), (compiled.away[g], AWAY_WIN)):
+                if compiled.teams[team] in undefeated:
+                    undefeated[compiled.teams[team]] &= self.Outcome(k) == win
+        return undefeated
+
+    def UndefeatedSets(self) -> Dict[FrozenSet[str], float]:
+        """Joint probability of every set of teams finishing undefeated"""
+        self._Enumerated()
+        return {frozenset(team for i, team in enumerate(self.contenders) if s >> i & 1): float(total)
+                for s, total in enumerate(self.undefeated_sets) if total > 0}
+
+    def UndefeatedCount(self) -> numpy.ndarray:
+        """Probability of every number of teams finishing undefeated"""
+        self._Enumerated()
+        sets = numpy.arange(len(self.undefeated_sets))
+        count = sum((sets >> i & 1 for i in range(len(self.contenders))), numpy.zeros_like(sets))
+        return numpy.bincount(count, self.undefeated_sets)
+
+    def GameName(self, game: int) -> str:
+        g = self.games[game]
+        return f'{self.compiled.teams[self.compiled.away[g]]} @ {self.compiled.teams[self.compiled.home[g]]}'
+
+    def Describe(self, code: int) -> List[str]:
+        """Results of outcome `code`, as text"""
+        compiled = self.compiled
+        results = []
+        for k, g in enumerate(self.games):
+            home, away, outcome = compiled.teams[compiled.home[g]], compiled.teams[compiled.away[g]], code // 3**k % 3
+            results.append({HOME_WIN: f'{home} beats {away}', TIE: f'{away} @ {home} tie',
+                            AWAY_WIN: f'{away} beats {home}'}[outcome])
+        return results
+
+    def TopScenarios(self, mask: Optional[numpy.ndarray]=None, count: int=10) -> List[Tuple[int, float]]:
+        """The `count` most likely outcomes, among those selected by `mask`"""
+        self._Enumerated()
+        probability = self.probability
+        if mask is not None:
+            probability = numpy.where(mask, probability, 0.0)
+        top = numpy.argsort(probability)[::-1][:count]
+        return [(int(code), float(probability[code])) for code in top if probability[code] > 0]
+
+
+def play_until(compiled: CompiledSeason, week: int, seed: Optional[int]=None) -> CompiledSeason:
+    """Gives the unplayed games before `week` the results of one simulated season, to
+    explore the end of a season which is not that far yet.
+
+    """
+    spreads = BatchSimulator(compiled).Simulate(1, numpy.random.default_rng(seed), record_spreads=True).spreads[0, 0]
+    results = [(compiled.teams[compiled.home[g]], compiled.teams[compiled.away[g]],
+                max(spreads[g], 0), max(-spreads[g], 0))
+               for g in compiled.unplayed if compiled.week[g] < week]
+    return compiled.WithResults(results)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Joint probabilities of the results of the last games')
+    parser.add_argument('--directory', default=os.path.join('data', '2016'))
+    parser.add_argument('--from-week', type=int,
+                        help='Simulate the unplayed games before this week (counting from 1) first')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--max-games', type=int, default=16 if JIT_AVAILABLE else 11)
+    parser.add_argument('--approximate', action='store_true',
+                        help='Allow teams with several unplayed games, using expected ELO exchanges')
+    args = parser.parse_args()
+    compiled = CompiledSeason.FromJSONDirectory(args.directory)
+    if args.from_week:
+        compiled = play_until(compiled, args.from_week - 1, args.seed)
+    enumerator = ScenarioEnumerator(compiled, max_games=args.max_games, approximate=args.approximate)
+    probability = enumerator.Enumerate()
+    print(f'{enumerator.n_games} unplayed games, {len(probability)} outcomes, '
+          f'{"exact" if enumerator.exact else "approximate"} probabilities')
+    for k, (p_home, p_tie, p_away) in enumerate(enumerator.GameMarginals()):
+        print(f'    {enumerator.GameName(k):<10}: '
+              f'home {100 * p_home:.2f}%, tie {100 * p_tie:.2f}%, away {100 * p_away:.2f}%')
+    for count, p in enumerate(enumerator.UndefeatedCount()):
+        print(f'{count} undefeated teams: {100 * p:.4f}%')
+    for teams, p in sorted(enumerator.UndefeatedSets().items(), key=lambda item: -item[1]):
+        print(f'    {", ".join(sorted(teams)) or "none"}: {100 * p:.4f}%')
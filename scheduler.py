@@ -0,0 +1,260 @@
+import os
+import time
+import argparse
+import collections
+import concurrent.futures
+from typing import NamedTuple, Optional, Sequence
+
+import numpy
+
+from metrics import peak_rss
+from compiled_season import CompiledSeason
+from batch_simulator import BatchSimulator, BatchResult, ModelParameters
+
+# Integer dtypes tried for the ELO and records, narrowest first
+DTYPES = (numpy.int16, numpy.int32, numpy.int64)
+
+
+class ChunkPlan(NamedTuple):
+    """How a run is split to fit in a memory budget.
+
+    Attributes:
+        seasons: Total number of seasons
+        chunk_size: Seasons simulated per chunk
+        chunks: Number of chunks
+        workers: Number of chunks simulated at the same time
+        dtype: Name of the integer dtype of the ELO and records
+        bytes_per_season: Estimated memory of one season of one chunk
+        budget: Memory budget in bytes
+
+    """
+    seasons: int
+    chunk_size: int
+    chunks: int
+    workers: int
+    dtype: str
+    bytes_per_season: int
+    budget: int
+
+
+class RunReport(NamedTuple):
+    """Outcome of `Scheduler.Run`.
+
+    Attributes:
+        plan: Chunking used
+        widened: Number of chunks rerun with a wider dtype after an overflow
+        seconds: Wall time of the run
+        peak_rss: Peak resident memory of this process in bytes, `None` if unknown
+        peak_rss_workers: Largest peak resident memory of a worker process in bytes,
+                          `None` if unknown or without worker processes
+
+    """
+    plan: ChunkPlan
+    widened: int
+    seconds: float
+    peak_rss: Optional[int]
+    peak_rss_workers: Optional[int]
+
+
+def _simulate_chunk(compiled: CompiledSeason, parameters: Sequence[ModelParameters], seasons: int,
+                    seed: numpy.random.SeedSequence, dtype) -> BatchResult:
+    """Simulates one chunk, widening `dtype` whenever the ELO or records could overflow it"""
+    for candidate in DTYPES[DTYPES.index(dtype):]:
+        try:
+            rng = numpy.random.default_rng(seed)
+            return BatchSimulator(compiled, parameters).Simulate(seasons, rng, dtype=candidate)
+        except OverflowError:
+            if candidate is DTYPES[-1]:
+                raise
+
+
+class Summary:
+    """Accumulator of the mean and standard deviation of every team's wins and of the
+    chance of each team, and of any team, finishing undefeated, per parameter set.
+
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.wins = self.wins_sq = self.undefeated = self.any_undefeated = 0
+
+    def Add(self, result: BatchResult):
+        undefeated = result.Undefeated()
+        self.n += result.seasons
+        self.wins = self.wins + result.wins.sum(axis=1, dtype=numpy.int64)
+        self.wins_sq = self.wins_sq + numpy.einsum('pst,pst->pt', result.wins, result.wins, dtype=numpy.int64)
+        self.undefeated = self.undefeated + undefeated.sum(axis=1)
+        self.any_undefeated = self.any_undefeated + undefeated.any(axis=2).sum(axis=1)
+
+    def MeanWins(self) -> numpy.ndarray:
+        return self.wins / self.n
+
+    def StdWins(self) -> numpy.ndarray:
+        return numpy.sqrt(numpy.maximum(self.wins_sq / self.n - self.MeanWins()**2, 0.0))
+
+    def Undefeated(self) -> numpy.ndarray:
+        return self.undefeated / self.n
+
+    def AnyUndefeated(self) -> numpy.ndarray:
+        return self.any_undefeated / self.n
+
+
+class Scheduler:
+    """Runs large batch simulations within a memory budget.  Seasons are split into
+    chunks simulated by `BatchSimulator`, at most `workers` at a time, and every chunk is
+    handed to the accumulators, in chunk order, and dropped before more are started, so
+    memory is bounded by the chunk size rather than the number of seasons.
+
+    The ELO and records are stored in the narrowest dtype that cannot overflow given the
+    starting ratings and a generous bound on the ELO exchanged per game.  The engine
+    checks the exact bound as it goes, and a chunk which could overflow is rerun with a
+    wider dtype, so results never depend on the dtype chosen.
+
+    The budget can be as small as a CPU cache, with `overhead=0`, to keep the arrays of
+    every game in cache at the cost of more Python overhead per season.
+
+    Args:
+        compiled: Season to simulate
+        memory_budget: Bytes available to the simulation
+        workers (optional): Number of processes, by default one per CPU; with one worker
+                            chunks are simulated in this process
+        parameters (optional): One or more sets of model parameters
+        overhead (optional): Bytes used by a process before it simulates anything
+        max_chunk (optional): Largest chunk size, bounding the latency of a chunk
+
+    """
+    # Float64 temporaries alive per season and parameter set while a game is simulated,
+    # with room for the temporaries of the accumulators
+    TEMPORARIES = 32
+    # Generous bound on the ELO points exchanged in one game, used to pick the dtype
+    MAX_EXCHANGE = 100
+    PROCESS_OVERHEAD = 100 * 2**20
+
+    def __init__(self, compiled: CompiledSeason, memory_budget: int, workers: Optional[int]=None,
+                 parameters=ModelParameters(), overhead: int=PROCESS_OVERHEAD, max_chunk: int=100000):
+        self.compiled = compiled
+        self.memory_budget = memory_budget
+        self.workers = workers or os.cpu_count() or 1
+        self.parameters = [parameters] if isinstance(parameters, ModelParameters) else list(parameters)
+        self.overhead = overhead
+        self.max_chunk = max_chunk
+
+    def ChooseDtype(self):
+        """Narrowest dtype of `DTYPES` expected to hold the ELO and records"""
+        compiled = self.compiled
+        games = numpy.bincount(compiled.home, minlength=compiled.n_teams)
+        games += numpy.bincount(compiled.away, minlength=compiled.n_teams)
+        elo = numpy.abs(compiled.elo).astype(float)
+        for t, team in enumerate(compiled.teams):
+            uncertainty = compiled.uncertainty.get(team, {})
+            if 'ensemble' in uncertainty:
+                elo[t] = numpy.abs(uncertainty['ensemble']).max()
+            elo[t] += 6 * uncertainty.get('sd', 0.0)
+        elo_bound = (elo + self.MAX_EXCHANGE * games).max(initial=0)
+        records = (numpy.maximum(numpy.maximum(compiled.wins, compiled.losses), compiled.ties) + games).max(initial=0)
+        for dtype in DTYPES:
+            if max(elo_bound, records) <= numpy.iinfo(dtype).max:
+                return dtype
+        return DTYPES[-1]
+
+    def BytesPerSeason(self, dtype, pooled: bool) -> int:
+        """Estimated memory of one season of a chunk.  Chunks simulated in worker
+        processes are also held by this process while they are accumulated.
+
+        """
+        state = 4 * self.compiled.n_teams * numpy.dtype(dtype).itemsize
+        per_season = state + 8 * self.TEMPORARIES + (state if pooled else 0)
+        return len(self.parameters) * per_season
+
+    def Plan(self, seasons: int) -> ChunkPlan:
+        """Chooses the dtype, number of workers and chunk size for `seasons` seasons.
+
+        Raises:
+            ValueError: If the budget doesn't fit a single season
+
+        """
+        dtype = self.ChooseDtype()
+        workers = max(1, min(self.workers, seasons))
+        while True:
+            pooled = workers > 1
+            processes = workers + 1 if pooled else 1
+            available = self.memory_budget - processes * self.overhead
+            per_season = self.BytesPerSeason(dtype, pooled)
+            chunk_size = min(available // (workers * per_season) if available > 0 else 0,
+                             self.max_chunk, -(-seasons // workers))
+            if chunk_size >= 1 or workers == 1:
+                break
+            workers -= 1
+        if chunk_size < 1:
+            raise ValueError(f"A memory budget of {self.memory_budget} bytes doesn't fit one season")
+        return ChunkPlan(seasons, int(chunk_size), -(-seasons // int(chunk_size)), workers,
+                         numpy.dtype(dtype).name, per_season, self.memory_budget)
+
+    def Run(self, seasons: int, accumulators: Sequence, seed: Optional[int]=None) -> RunReport:
+        """Simulates `seasons` seasons, calling `Add(result)` of every accumulator with the
+        `BatchResult` of each chunk.  Chunks are seeded from `seed` independently of the
+        number of workers, so results only depend on `seed` and the chunk size.
+
+        """
+        plan = self.Plan(seasons)
+        dtype = DTYPES[[numpy.dtype(d).name for d in DTYPES].index(plan.dtype)]
+        seeds = numpy.random.SeedSequence(seed).spawn(plan.chunks)
+        sizes = [min(plan.chunk_size, seasons - c * plan.chunk_size) for c in range(plan.chunks)]
+        start = time.perf_counter()
+        widened = 0
+
+        def accumulate(result: BatchResult):
+            nonlocal widened
+            widened += result.elo.dtype != numpy.dtype(dtype)
+            for accumulator in accumulators:
+                accumulator.Add(result)
+
+        if plan.workers == 1:
+            for size, chunk_seed in zip(sizes, seeds):
+                accumulate(_simulate_chunk(self.compiled, self.parameters, size, chunk_seed, dtype))
+            workers_rss = None
+        else:
+            with concurrent.futures.ProcessPoolExecutor(plan.workers) as executor:
+                pending = collections.deque()
+                for size, chunk_seed in zip(sizes, seeds):
+                    if len(pending) == plan.workers:
+                        accumulate(pending.popleft().result())
+                    pending.append(executor.submit(_simulate_chunk, self.compiled, self.parameters,
+                                                   size, chunk_seed, dtype))
+                while pending:
+                    accumulate(pending.popleft().result())
+            workers_rss = peak_rss(children=True)
+        return RunReport(plan, widened, time.perf_counter() - start, peak_rss(), workers_rss)
+
+
+def print_report(report: RunReport):
+    plan = report.plan
+    print(f'{plan.seasons} seasons in {plan.chunks} chunks of up to {plan.chunk_size}, '
+          f'{plan.workers} worker{"s" if plan.workers > 1 else ""}, {plan.dtype} state '
+          f'({plan.bytes_per_season} bytes per season, budget {plan.budget / 2**20:.1f} MB)')
+    if report.widened:
+        print(f'{report.widened} chunks were rerun with a wider dtype')
+    print(f'{report.seconds:.2f} s, {plan.seasons / report.seconds:.0f} seasons/s')
+    if report.peak_rss is not None:
+        print(f'Peak memory: {report.peak_rss / 2**20:.1f} MB in this process', end='')
+        if report.peak_rss_workers is not None:
+            print(f', {report.peak_rss_workers / 2**20:.1f} MB per worker', end='')
+        print()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Simulate many seasons within a memory budget')
+    parser.add_argument('--directory', default=os.path.join('data', '2016'))
+    parser.add_argument('--seasons', type=int, default=1000000)
+    parser.add_argument('--memory', type=float, default=1024, help='Memory budget in MB')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    compiled = CompiledSeason.FromJSONDirectory(args.directory)
+    summary = Summary()
+    report = Scheduler(compiled, int(args.memory * 2**20), args.workers).Run(args.seasons, [summary], args.seed)
+    print_report(report)
+    for team, wins, std, undefeated in zip(compiled.teams, summary.MeanWins()[0], summary.StdWins()[0],
+                                           summary.Undefeated()[0]):
+        print(f'{team:<4} {wins:6.3f} +- {std:5.3f} wins, undefeated {100 * undefeated:7.3f}%')
+    print(f'ANY  undefeated {100 * summary.AnyUndefeated()[0]:7.3f}%')
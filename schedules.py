@@ -0,0 +1,263 @@
+import os
+import argparse
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy
+
+import inv_erf
+from season import Season, SeasonError
+from standings import Standings
+from batch_simulator import Draws, ModelParameters, play_games, sample_spreads
+
+
+def schedule_array(seasons: Sequence[Season], teams: Sequence[str]) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Packs schedules into the arrays taken by `ScheduleEvaluator`.  Results of played
+    games are ignored.
+
+    Args:
+        seasons: Schedules
+        teams: Team names, in team id order
+
+    Returns:
+        Home and away team ids indexed by `[schedule, week, game, side]`, padded with -1,
+        and whether each game is at a neutral site, indexed by `[schedule, week, game]`
+
+    """
+    index = {team: i for i, team in enumerate(teams)}
+    weeks = max(len(season) for season in seasons)
+    games = max(len(week) for season in seasons for week in season)
+    schedules = numpy.full((len(seasons), weeks, games, 2), -1, dtype=numpy.int16)
+    neutral = numpy.zeros((len(seasons), weeks, games), dtype=bool)
+    for s, season in enumerate(seasons):
+        for w, week in enumerate(season):
+            for m, game in enumerate(week):
+                schedules[s, w, m] = index[game[0].strip('*')], index[game[1].strip('*')]
+                neutral[s, w, m] = game[0].startswith('*')
+    return schedules, neutral
+
+
+def validate_schedules(schedules: numpy.ndarray, n_teams: int, games: Optional[int]=None) -> Dict[int, str]:
+    """Checks many schedules at once, like `Season.VerifyData`: team ids must be valid,
+    a team can't play itself or twice in a week, and with `games` every team must play
+    that many games.  Games where both ids are -1 are padding.
+
+    Args:
+        schedules: Team ids indexed by `[schedule, week, game, side]`
+        n_teams: Number of teams
+        games (optional): Required number of games of every team
+
+    Returns:
+        The first problem found with every invalid schedule, by schedule index
+
+    """
+    schedules = numpy.asarray(schedules)
+    if schedules.ndim != 4 or schedules.shape[3] != 2:
+        raise SeasonError(f"Schedules must be indexed by [schedule, week, game, side], found shape {schedules.shape}")
+    n, weeks = schedules.shape[:2]
+    home, away = schedules[..., 0], schedules[..., 1]
+    padding = (home == -1) & (away == -1)
+    checks = [((schedules < -1) | (schedules >= n_teams)).any(axis=(1, 2, 3)), 'has an invalid team id',
+              ((home == -1) != (away == -1)).any(axis=(1, 2)), 'has a game with a single team',
+              ((home == away) & ~padding).any(axis=(1, 2)), 'has a team playing itself']
+    # Games of every team in every week; padding and invalid ids go to an extra column
+    ids = numpy.where(((schedules >= 0) & (schedules < n_teams)), schedules, n_teams).astype(numpy.int64)
+    rows = numpy.arange(n * weeks).reshape(n, weeks, 1, 1)
+    counts = numpy.bincount((rows * (n_teams + 1) + ids).ravel(), minlength=n * weeks * (n_teams + 1))
+    counts = counts.reshape(n, weeks, n_teams + 1)[..., :n_teams]
+    checks += [(counts > 1).any(axis=(1, 2)), 'has a team playing twice in a week']
+    if games is not None:
+        checks += [(counts.sum(axis=1) != games).any(axis=1), f'has a team without {games} games']
+    errors = {}
+    for failed, message in zip(checks[::2], checks[1::2]):
+        for s in numpy.flatnonzero(failed):
+            errors.setdefault(int(s), f'Schedule {s} {message}')
+    return errors
+
+
+class ScheduleMetrics:
+    """Summary of the simulated seasons of every candidate schedule.  Ties count as half
+    a win.  Arrays are indexed by schedule first.
+
+    Attributes:
+        teams (List[str]): Team names
+        mean_wins (numpy.ndarray): Expected wins of every team, indexed by `[schedule, team]`
+        balance (numpy.ndarray): Spread (standard deviation) of the expected wins of the teams
+        season_balance (numpy.ndarray): Mean over seasons of the spread of the wins of the teams
+        top_wins (numpy.ndarray): Expected wins of the team with the most wins
+        any_undefeated (numpy.ndarray): Chance of at least one undefeated team, with wins
+                                        and without losses or ties
+        single_undefeated (numpy.ndarray): Chance of exactly one undefeated team, which
+                                           dominates the season
+
+    """
+    METRICS = ('balance', 'season_balance', 'top_wins', 'any_undefeated', 'single_undefeated')
+
+    def __init__(self, teams: Sequence[str], mean_wins, balance, season_balance, top_wins,
+                 any_undefeated, single_undefeated):
+        self.teams = list(teams)
+        self.mean_wins = mean_wins
+        self.balance = balance
+        self.season_balance = season_balance
+        self.top_wins = top_wins
+        self.any_undefeated = any_undefeated
+        self.single_undefeated = single_undefeated
+
+    @classmethod
+    def Concatenate(cls, parts: Sequence['ScheduleMetrics']) -> 'ScheduleMetrics':
+        return cls(parts[0].teams, *(numpy.concatenate([getattr(p, name) for p in parts])
+                                     for name in ('mean_wins',) + cls.METRICS))
+
+    def Ranking(self, metric: str='balance', descending: bool=False) -> List[Tuple[int, float]]:
+        """Schedule indices and values of `metric`, best first; by default the smallest
+        value, e.g. the most balanced schedule, is best.
+
+        """
+        if metric not in self.METRICS:
+            raise ValueError(f"Unknown metric {metric}, expected one of {', '.join(self.METRICS)}")
+        values = getattr(self, metric)
+        order = numpy.argsort(-values if descending else values, kind='stable')
+        return [(int(s), float(values[s])) for s in order]
+
+    def PrintRanking(self, metric: str='balance', descending: bool=False, count: int=10):
+        print(f'{"rank":>4} {"schedule":>8} ' + ' '.join(f'{name:>17}' for name in self.METRICS))
+        for rank, (s, _) in enumerate(self.Ranking(metric, descending)[:count], 1):
+            print(f'{rank:4d} {s:8d} ' + ' '.join(f'{getattr(self, name)[s]:17.4f}' for name in self.METRICS))
+
+
+class ScheduleEvaluator:
+    """Simulates many candidate schedules against the same starting standings, for
+    competitive balance studies.  Schedules are given as arrays of team ids, see
+    `schedule_array`, and simulated together, every game slot of every schedule at once,
+    with the game model of `BatchSimulator`.
+
+    Every schedule uses the same random draws: season `i` of every schedule draws the
+    same numbers for the game in the same week and slot, and the same starting ratings
+    when `standings` have rating uncertainty.  Differences between schedules are
+    therefore free of most independent sampling noise.  A schedule packed from a season
+    without padding gives the same seasons as `BatchSimulator` with the same seed.
+
+    Args:
+        standings: Starting ELO and records; team ids index the sorted team names
+        parameters (optional): Model parameters
+        batch_size (optional): Number of schedules simulated together, bounding memory
+
+    """
+
+    def __init__(self, standings: Standings, parameters: ModelParameters=ModelParameters(),
+                 batch_size: int=64):
+        self.standings = standings
+        self.teams = sorted(standings.keys())
+        self.parameters = parameters
+        self.batch_size = batch_size
+        self.elo = numpy.array([standings[t].elo for t in self.teams], dtype=numpy.int64)
+        self.records = numpy.array([[standings[t].wins, standings[t].losses, standings[t].ties]
+                                    for t in self.teams], dtype=numpy.int64).T
+
+    @property
+    def n_teams(self) -> int:
+        return len(self.teams)
+
+    def Evaluate(self, schedules: numpy.ndarray, seasons: int, neutral: Optional[numpy.ndarray]=None,
+                 seed: Optional[int]=None, games: Optional[int]=None) -> ScheduleMetrics:
+        """Simulates `seasons` seasons of every schedule.
+
+        Args:
+            schedules: Team ids indexed by `[schedule, week, game, side]`, padded with -1
+            seasons: Number of seasons per schedule
+            neutral (optional): Whether each game is at a neutral site, indexed by
+                                `[schedule, week, game]`
+            seed (optional): Seed of the draws shared by all schedules
+            games (optional): Required number of games of every team
+
+        Raises:
+            SeasonError: If any schedule is invalid, see `validate_schedules`
+
+        """
+        schedules = numpy.asarray(schedules)
+        errors = validate_schedules(schedules, self.n_teams, games)
+        if errors:
+            listed = '; '.join(list(errors.values())[:5])
+            raise SeasonError(f"{len(errors)} invalid schedules: {listed}{'; ...' if len(errors) > 5 else ''}")
+        if neutral is None:
+            neutral = numpy.zeros(schedules.shape[:3], dtype=bool)
+        seed = numpy.random.SeedSequence(seed).entropy if seed is None else seed
+        parts = [self._Simulate(schedules[start:start + self.batch_size], neutral[start:start + self.batch_size],
+                                seasons, seed)
+                 for start in range(0, len(schedules), self.batch_size)]
+        return ScheduleMetrics.Concatenate(parts)
+
+    def _Simulate(self, schedules: numpy.ndarray, neutral: numpy.ndarray, seasons: int, seed) -> ScheduleMetrics:
+        """Simulates a group of schedules, drawing from a generator seeded identically for
+        every group so that all schedules share their draws.
+
+        """
+        p = self.parameters
+        rng = numpy.random.default_rng(seed)
+        n = len(schedules)
+        home = schedules[..., 0].reshape(n, -1).astype(numpy.intp)
+        away = schedules[..., 1].reshape(n, -1).astype(numpy.intp)
+        advantage = numpy.where(neutral.reshape(n, -1), 0.0, p.home_advantage)
+        # Team-major layout, indexed by [schedule, team, season]
+        shape = (n, self.n_teams, seasons)
+        elo = numpy.empty(shape, dtype=numpy.int64)
+        if self.standings.uncertainty:
+            elo[...] = self.standings.SampleELO(seasons, rng).T
+        else:
+            elo[...] = self.elo[:, numpy.newaxis]
+        wins, losses, ties = (numpy.empty(shape, dtype=numpy.int64) for _ in range(3))
+        for array, start in zip((wins, losses, ties), self.records):
+            array[...] = start[:, numpy.newaxis]
+        for slot in range(home.shape[1]):
+            # Drawn for every slot, even when padding, to keep the draws of later games aligned
+            draws = Draws(*rng.random((3, seasons)))
+            s = numpy.flatnonzero(home[:, slot] >= 0)
+            if len(s) == 0:
+                continue
+            h, a = home[s, slot], away[s, slot]
+            diff = elo[s, h] - elo[s, a]
+            margin = diff + advantage[s, slot, numpy.newaxis]
+            p_home = 1.0 / (1.0 + 10.0**(-margin / 400.0))
+            mu = margin / 25.0
+            sigma = inv_erf.get_sigma_array(mu, p_home)
+            spread = sample_spreads(mu, sigma, draws, p.tie_rate)
+            play_games(elo, wins, losses, ties, (s, h), (s, a), spread, p_home, p.k)
+        points = wins + 0.5 * ties
+        # A team without a loss or tie is only undefeated if it has played: with padding,
+        # or without `games` in `Evaluate`, a candidate may leave a team without games
+        undefeated = ((losses == 0) & (ties == 0) & (wins > 0)).sum(axis=1)
+        mean_wins = points.mean(axis=2)
+        return ScheduleMetrics(self.teams, mean_wins, mean_wins.std(axis=1), points.std(axis=1).mean(axis=1),
+                               points.max(axis=1).mean(axis=1), (undefeated > 0).mean(axis=1),
+                               (undefeated == 1).mean(axis=1))
+
+
+def permuted_schedules(season: Season, teams: Sequence[str], count: int,
+                       rng: Optional[numpy.random.Generator]=None) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Candidate schedules with the structure of `season`: the first is `season` and the
+    others assign its slots to the teams in a random order.  Returns the schedules and
+    neutral sites, see `schedule_array`.
+
+    """
+    rng = rng or numpy.random.default_rng()
+    base, neutral = schedule_array([season], teams)
+    permutations = numpy.array([numpy.arange(len(teams))] + [rng.permutation(len(teams)) for _ in range(count - 1)])
+    candidates = numpy.where(base[0] >= 0, permutations[:, numpy.maximum(base[0], 0)], -1).astype(base.dtype)
+    return candidates, numpy.repeat(neutral, count, axis=0)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rank candidate schedules by competitive balance')
+    parser.add_argument('--directory', default=os.path.join('data', '2016'),
+                        help='Standings, and the schedule whose relabelings are the candidates')
+    parser.add_argument('--candidates', type=int, default=100)
+    parser.add_argument('--seasons', type=int, default=2000)
+    parser.add_argument('--metric', choices=ScheduleMetrics.METRICS, default='balance')
+    parser.add_argument('--descending', action='store_true')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    standings = Standings.FromJSONDirectory(args.directory)
+    evaluator = ScheduleEvaluator(standings)
+    candidates, neutral = permuted_schedules(Season.FromJSONDirectory(args.directory), evaluator.teams,
+                                             args.candidates, numpy.random.default_rng(args.seed))
+    metrics = evaluator.Evaluate(candidates, args.seasons, neutral, seed=args.seed)
+    metrics.PrintRanking(args.metric, args.descending)
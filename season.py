@@ -1,9 +1,10 @@
 import os
 import json
-from typing import List, Dict, Union
-from collections import UserList
+from typing import List, Dict, Optional, Union
+from collections import Counter, UserList
 
 from elo import ELO
+from metrics import NullMetrics, NULL_METRICS
 
 class Week(UserList):
     """
@@ -21,46 +22,72 @@ class SeasonError(Exception):
 
 
 class Season(UserList):
-    """
+    """Schedule of a season as a list of weeks, each a list of games.  The shape of the
+    league is taken from the data: the number of weeks is the length of `schedule`, the
+    teams are those appearing in it, and each team's number of games is counted from it.
+    The optional keys `weeks`, `teams` and `games` (games per team) are checked if present.
 
     """
-    def __init__(self, data: Dict[str, List[Union[int, List[Union[str, int]]]]]):
+    def __init__(self, data: Dict[str, List[Union[int, List[Union[str, int]]]]],
+                 metrics: NullMetrics=NULL_METRICS):
         super().__init__(Week(d) for d in data['schedule'])
-        self.VerifyData(data['expected'])
+        with metrics.Stage('verify_data'):
+            self.VerifyData(data.get('expected'), data.get('weeks'), data.get('teams'), data.get('games'))
 
     @classmethod
-    def FromJSON(cls, json_file: str):
+    def FromJSON(cls, json_file: str, metrics: NullMetrics=NULL_METRICS):
         """
 
         :param json_file:
+        :param metrics: instrumentation receiving the `load` and `verify_data` timings
         :return:
         """
         if not json_file.endswith(".json"):
             json_file += '.json'
-        with open(json_file) as f:
-            return cls(json.load(f))
+        with metrics.Stage('load'):
+            with open(json_file) as f:
+                data = json.load(f)
+        return cls(data, metrics)
 
     @classmethod
-    def FromJSONDirectory(cls, directory: str):
+    def FromJSONDirectory(cls, directory: str, metrics: NullMetrics=NULL_METRICS):
         """
 
         :param directory:
+        :param metrics: instrumentation receiving the `load` and `verify_data` timings
         :return:
         """
-        return cls.FromJSON(os.path.join(directory, 'schedule.json'))
+        return cls.FromJSON(os.path.join(directory, 'schedule.json'), metrics)
+
+    @property
+    def teams(self) -> List[str]:
+        """Sorted names of all teams appearing in the schedule"""
+        return sorted(self.GamesPerTeam())
+
+    def GamesPerTeam(self) -> Dict[str, int]:
+        """Number of scheduled games for every team"""
+        games = Counter()
+        for week in self:
+            for game in week:
+                games.update(team.strip("*") for team in game[0:2])
+        return dict(games)
 
-    def VerifyData(self, expected=None):
+    def VerifyData(self, expected=None, weeks: Optional[int]=None, n_teams: Optional[int]=None,
+                   games: Optional[int]=None):
         """
 
-        :param expected:
+        :param expected: number of games in each week
+        :param weeks: if given, the required number of weeks
+        :param n_teams: if given, the required number of teams
+        :param games: if given, the required number of games for every team
         :return:
         """
-        if len(self) != 17:
-            raise SeasonError(f"Season must have 17 weeks, found {len(self)}")
+        if weeks is not None and len(self) != weeks:
+            raise SeasonError(f"Season must have {weeks} weeks, found {len(self)}")
         if expected is None:
             expected = [len(w) for w in self]
-        if len(expected) != 17:
-            raise SeasonError(f"Expected season data must have 17 weeks, found {len(expected)}")
+        if len(expected) != len(self):
+            raise SeasonError(f"Expected season data must have {len(self)} weeks, found {len(expected)}")
         teams = set()
         for i, week in enumerate(self):
             if len(week) != expected[i]:
@@ -93,8 +120,12 @@ class Season(UserList):
             if not week_teams.issubset(teams):
                 extra_teams = week_teams - teams
                 raise SeasonError(f"Unexpected teams found: {extra_teams}")
-        if len(teams) != 32:
-            raise SeasonError(f"Must have 32 teams, found {len(teams)}")
+        if n_teams is not None and len(teams) != n_teams:
+            raise SeasonError(f"Must have {n_teams} teams, found {len(teams)}")
+        if games is not None:
+            for team, n in self.GamesPerTeam().items():
+                if n != games:
+                    raise SeasonError(f"Team {team} must have {games} games, found {n}")
         for team in teams:
             if len(team) not in (2, 3):
                 raise SeasonError(f"Team name must be 2 or 3 characters, found {team}")
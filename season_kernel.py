@@ -0,0 +1,140 @@
+import math
+from typing import Optional
+
+import numpy
+
+import inv_erf
+from compiled_season import CompiledSeason
+from batch_simulator import BatchResult, ModelParameters, elo_exchange
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Whether the kernel is compiled; without Numba it runs as plain Python
+JIT_AVAILABLE = numba is not None
+
+
+def _jit(function):
+    """Compiles `function` with Numba when it is installed, otherwise returns it unchanged"""
+    if numba is None:
+        return function
+    return numba.njit(cache=True)(function)
+
+
+_elo_exchange = _jit(elo_exchange)
+
+
+@_jit
+def _rint(x):
+    """Rounds to the nearest integer, halves to even like `numpy.rint` and `round`"""
+    r = math.floor(x + 0.5)
+    if r - x == 0.5 and r % 2 != 0:
+        r -= 1
+    return int(r)
+
+
+@_jit
+def _sigma(mu, prob):
+    """`inv_erf.get_sigma` without argument checks"""
+    x = 1.0 - 2.0 * prob
+    log = math.log(1.0 - x * x)
+    a = 8.0 * (math.pi - 3.0) / (3.0 * math.pi * (4.0 - math.pi))
+    common_term = 2.0 / (math.pi * a) + log / 2.0
+    den = math.copysign(math.sqrt(math.sqrt(common_term * common_term - log / a) - common_term), x)
+    den *= math.sqrt(2.0)
+    if den == 0.0:
+        return 11.087
+    return -mu / den
+
+
+@_jit
+def _simulate_seasons(home, away, neutral, played, played_spread, elo, wins, losses, ties,
+                      normal, tie_draw, overtime_draw, k, home_advantage, tie_rate, overtime_margins,
+                      spreads, record_spreads):
+    """Simulates every season, one game at a time, updating `elo`, `wins`, `losses` and
+    `ties` (indexed by `[season, team]`) in place, and with `record_spreads` storing the
+    margin of every game in `spreads`.  The draws are indexed by `[season, unplayed game]`.
+
+    """
+    n_margins = len(overtime_margins)
+    for s in range(elo.shape[0]):
+        u = 0
+        for g in range(len(home)):
+            h = home[g]
+            a = away[g]
+            margin = float(elo[s, h] - elo[s, a])
+            if not neutral[g]:
+                margin += home_advantage
+            p_home = 1.0 / (1.0 + 10.0**(-margin / 400.0))
+            if played[g]:
+                spread = played_spread[g]
+            else:
+                mu = margin / 25.0
+                spread = _rint(mu + _sigma(mu, p_home) * normal[s, u])
+                if spread == 0 and tie_draw[s, u] >= tie_rate:
+                    ot = overtime_draw[s, u]
+                    spread = overtime_margins[int(2.0 * ot % 1.0 * n_margins)]
+                    if ot >= 0.5:
+                        spread = -spread
+                u += 1
+            if record_spreads:
+                spreads[s, g] = spread
+            if spread == 0:
+                ties[s, h] += 1
+                ties[s, a] += 1
+                continue
+            if spread > 0:
+                winner, loser, p_winner = h, a, p_home
+            else:
+                winner, loser, p_winner = a, h, 1.0 - p_home
+            delta = _rint(_elo_exchange(k, p_winner, math.log(abs(spread) + 1.0), elo[s, winner] - elo[s, loser]))
+            elo[s, winner] += delta
+            elo[s, loser] -= delta
+            wins[s, winner] += 1
+            losses[s, loser] += 1
+
+
+class KernelSimulator:
+    """Simulates seasons one at a time with a compiled kernel over integer team ids and ELO
+    arrays, for workloads that do not vectorize across seasons, e.g. adaptive or pruned
+    runs.  The kernel is compiled with Numba when it is installed and otherwise runs as
+    plain Python with identical results.
+
+    The game model is that of `BatchSimulator`, except that Gaussian spreads are drawn
+    directly instead of from uniform quantiles.
+
+    Args:
+        compiled: Season to simulate
+        parameters (optional): Model parameters
+
+    """
+
+    def __init__(self, compiled: CompiledSeason, parameters: ModelParameters=ModelParameters()):
+        self.compiled = compiled
+        self.parameters = parameters
+        self._played_spread = compiled.home_score - compiled.away_score
+        self._overtime_margins = numpy.array(inv_erf.OVERTIME_MARGINS, dtype=numpy.int64)
+
+    def Simulate(self, seasons: int, rng: Optional[numpy.random.Generator]=None,
+                 start_elo: Optional[numpy.ndarray]=None, record_spreads: bool=False) -> BatchResult:
+        """Simulates `seasons` seasons, see `BatchSimulator.Simulate`"""
+        compiled = self.compiled
+        rng = rng or numpy.random.default_rng()
+        if start_elo is None:
+            start_elo = compiled.SampleELO(seasons, rng)
+        elo = numpy.array(start_elo, dtype=numpy.int64)
+        wins = numpy.repeat(compiled.wins[numpy.newaxis, :], seasons, axis=0)
+        losses = numpy.repeat(compiled.losses[numpy.newaxis, :], seasons, axis=0)
+        ties = numpy.repeat(compiled.ties[numpy.newaxis, :], seasons, axis=0)
+        games = len(compiled.unplayed)
+        normal = rng.standard_normal((seasons, games))
+        tie_draw, overtime_draw = rng.random((2, seasons, games))
+        spreads = numpy.zeros((seasons, compiled.n_games if record_spreads else 0), dtype=numpy.int64)
+        _simulate_seasons(compiled.home, compiled.away, compiled.neutral, compiled.played, self._played_spread,
+                          elo, wins, losses, ties, normal, tie_draw, overtime_draw,
+                          float(self.parameters.k), float(self.parameters.home_advantage),
+                          float(self.parameters.tie_rate), self._overtime_margins, spreads, record_spreads)
+        return BatchResult(compiled.teams, *(x[numpy.newaxis] for x in (elo, wins, losses, ties)),
+                           spreads=spreads[numpy.newaxis] if record_spreads else None)
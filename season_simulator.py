@@ -1,6 +1,10 @@
+import copy
+from typing import Dict, Optional, Sequence
+
 from elo_game import GetGame
 from season import Season
 from standings import Standings
+from metrics import NullMetrics, NULL_METRICS
 
 
 class SimulationError(Exception):
@@ -10,10 +14,24 @@ class SimulationError(Exception):
 class SeasonSimulator:
     """
 
+    Simulates a copy of `standings`.  When many seasons start from the same standings,
+    pass `games`, the result of `season.GamesPerTeam()`, with standings whose season
+    length is already set by `Standings.SetSeasonGames`, so neither is redone per season.
+
     """
-    def __init__(self, season: Season, standings: Standings):
+    def __init__(self, season: Season, standings: Standings, metrics: NullMetrics=NULL_METRICS,
+                 observers: Sequence=(), prune_undefeated: bool=False, games: Optional[Dict[str, int]]=None):
         self.season = season
-        self.standings = standings
+        # Simulated on a copy, leaving the caller's standings untouched
+        self.standings = copy.deepcopy(standings)
+        self.metrics = metrics
+        self.observers = observers
+        self.prune_undefeated = prune_undefeated
+        self.pruned = False
+        if games is None:
+            games = season.GamesPerTeam()
+            self.standings.SetSeasonGames(games)
+        self.games = games
 
     @classmethod
     def FromJSON(cls, season_file, standings_file):
@@ -24,31 +42,33 @@ class SeasonSimulator:
 
         :return:
         """
-        if len(self.standings) != 32:
-            raise SimulationError
+        if len(self.standings) != len(self.games):
+            raise SimulationError(f'{len(self.standings)} teams in standings, {len(self.games)} in season')
         totalWins = sum(map(lambda t: t.wins, self.standings.values()))
         totalLosses = sum(map(lambda t: t.losses, self.standings.values()))
         totalTies = sum(map(lambda t: t.ties, self.standings.values()))
         if totalWins != totalLosses:
             raise SimulationError('{} Wins, {} Losses'.format(totalWins, totalLosses))
-        if totalWins + totalLosses + totalTies != 16 * 32:
+        if totalWins + totalLosses + totalTies != sum(self.games.values()):
             raise SimulationError('{} Wins, {} Losses, {} Ties'.format(totalWins, totalLosses, totalTies))
         for team in self.standings.values():
             if team.wins < 0 or team.losses < 0 or team.ties < 0:
                 raise SimulationError(team)
-            if team.wins + team.losses + team.ties != 16:
+            if team.wins + team.losses + team.ties != self.games[team.name]:
                 raise SimulationError(team)
 
     def SimulateGame(self, game):
         """
 
         :param game:
-        :return:
+        :return: the game simulator, after updating the teams
         """
         home, away = map(lambda k: self.standings[k], game[0:2])
-        simulator = GetGame(home, away, *game[2:])
+        simulator = GetGame(home, away, *game[2:], neutral=game[0].startswith('*'))
         simulator.Simulate()
         simulator.UpdateTeams()
+        self.metrics.ObserveGame(simulator)
+        return simulator
 
     def SimulateWeek(self, week):
         """
@@ -62,8 +82,20 @@ class SeasonSimulator:
     def SimulateSeason(self):
         """
 
+        With `prune_undefeated`, the season stops as soon as no team can finish undefeated,
+        setting `pruned`; the standings are then incomplete and are not verified.
+
         :return:
         """
-        for week in self.season:
-            self.SimulateWeek(week)
-        self.VerifySimulation()
+        with self.metrics.Stage('simulate'):
+            for i, week in enumerate(self.season):
+                self.SimulateWeek(week)
+                self.metrics.Count('games', len(week))
+                for observer in self.observers:
+                    observer.ObserveWeek(i, self.standings)
+                if self.prune_undefeated and not any(t.losses == 0 and t.ties == 0
+                                                     for t in self.standings.values()):
+                    self.pruned = True
+                    return
+        with self.metrics.Stage('verify_simulation'):
+            self.VerifySimulation()
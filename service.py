@@ -0,0 +1,211 @@
+import os
+import json
+import asyncio
+import logging
+import argparse
+import collections
+import concurrent.futures
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl
+
+import numpy
+
+from compiled_season import CompiledSeason
+from batch_simulator import BatchSimulator, ModelParameters
+
+
+class ServiceError(Exception):
+    pass
+
+
+def simulate_odds(compiled: CompiledSeason, seasons: int, seed: Optional[int],
+                  parameters: ModelParameters) -> Dict[str, Any]:
+    """Simulates `seasons` seasons and summarizes them.  Runs inside the worker pool.
+
+    Returns:
+        Dictionary with the number of `seasons`, the probability of `any_undefeated`, and
+        per team `wins`, `losses`, `ties` expectations and `undefeated` probability
+
+    """
+    result = BatchSimulator(compiled, parameters).Simulate(seasons, numpy.random.default_rng(seed))
+    undefeated = result.Undefeated()[0]
+    teams = {team: {'wins': float(result.wins[0, :, t].mean()),
+                    'losses': float(result.losses[0, :, t].mean()),
+                    'ties': float(result.ties[0, :, t].mean()),
+                    'undefeated': float(undefeated[:, t].mean())}
+             for t, team in enumerate(compiled.teams)}
+    return {'seasons': seasons,
+            'any_undefeated': float(undefeated.any(axis=1).mean()),
+            'teams': teams}
+
+
+class Service:
+    """Local simulation service answering odds and what-if queries over HTTP.
+
+    Compiled seasons are kept in memory (reloaded when the data files change), recent
+    answers are kept in a least-recently-used cache, identical requests arriving while
+    one is being computed share that computation, and the simulation itself runs in a
+    process pool so the event loop stays responsive.  Only requests with a `seed` are
+    cached or shared; every request without one gets a fresh simulation.
+
+    Requests are `GET /odds?directory=data/2016&seasons=10000&seed=1` or `POST /whatif`
+    with a JSON body holding the same fields plus `results`, a list of
+    `[home, away, home_score, away_score]` for games to treat as played.  The model
+    parameters `k`, `home_advantage` and `tie_rate` may also be given.
+
+    Args:
+        root (optional): Directory against which data directories are resolved
+        workers (optional): Number of worker processes
+        cache_size (optional): Number of answers kept in memory
+        executor (optional): Executor to use instead of a new process pool
+
+    """
+    default_seasons = 10000
+    max_seasons = 1000000
+
+    def __init__(self, root: str='.', workers: Optional[int]=None, cache_size: int=256,
+                 executor: Optional[concurrent.futures.Executor]=None):
+        self.root = os.path.abspath(root)
+        self.executor = executor or concurrent.futures.ProcessPoolExecutor(workers)
+        self.cache_size = cache_size
+        self.seasons = {}
+        self.results = collections.OrderedDict()
+        self.inflight = {}
+        self.computations = 0
+        self.server = None
+
+    def GetSeason(self, directory: str) -> Tuple[CompiledSeason, Tuple[Any, ...]]:
+        """Returns the compiled season for `directory`, recompiling it when the files change,
+        along with a key identifying this version of the data.
+
+        """
+        path = os.path.abspath(os.path.join(self.root, directory))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ServiceError(f"Directory {directory} is outside of {self.root}")
+        files = [os.path.join(path, f) for f in ('schedule.json', 'elo_start.json')]
+        try:
+            version = tuple(os.stat(f).st_mtime_ns for f in files)
+        except FileNotFoundError:
+            raise ServiceError(f"No season data in {directory}")
+        version = (path,) + version
+        cached = self.seasons.get(path)
+        if cached is None or cached[1] != version:
+            cached = (CompiledSeason.FromJSONDirectory(path), version)
+            self.seasons[path] = cached
+        return cached
+
+    async def Odds(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answers a request, from the cache when possible"""
+        directory = request.get('directory', os.path.join('data', '2016'))
+        seasons = int(request.get('seasons', self.default_seasons))
+        if not 0 < seasons <= self.max_seasons:
+            raise ServiceError(f"Seasons must be between 1 and {self.max_seasons}, found {seasons}")
+        seed = request.get('seed')
+        seed = None if seed is None else int(seed)
+        parameters = ModelParameters(**{k: float(request[k]) for k in ModelParameters._fields if k in request})
+        results = [tuple(r) for r in request.get('results', [])]
+        compiled, version = self.GetSeason(directory)
+        if seed is None:
+            return await self._Compute(compiled, seasons, seed, parameters, results)
+        key = (version, seasons, seed, parameters, tuple(results))
+        if key in self.results:
+            self.results.move_to_end(key)
+            return self.results[key]
+        if key in self.inflight:
+            return await asyncio.shield(self.inflight[key])
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            answer = await self._Compute(compiled, seasons, seed, parameters, results)
+            self.results[key] = answer
+            while len(self.results) > self.cache_size:
+                self.results.popitem(last=False)
+            future.set_result(answer)
+            return answer
+        except BaseException as error:
+            future.set_exception(error)
+            # Mark the exception as retrieved when nobody else is waiting
+            future.exception()
+            raise
+        finally:
+            del self.inflight[key]
+
+    async def _Compute(self, compiled: CompiledSeason, seasons: int, seed: Optional[int],
+                       parameters: ModelParameters, results: List[Tuple]) -> Dict[str, Any]:
+        """Runs `simulate_odds` in the executor, after applying what-if `results`"""
+        if results:
+            try:
+                compiled = compiled.WithResults(results)
+            except (ValueError, TypeError) as error:
+                raise ServiceError(str(error))
+        self.computations += 1
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, simulate_odds, compiled, seasons, seed, parameters)
+
+    async def Handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serves a single HTTP/1.1 request on a connection"""
+        status, answer = 200, None
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            if len(request_line) != 3:
+                raise ServiceError("Malformed request")
+            method, target, _ = request_line
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            url = urlsplit(target)
+            request = dict(parse_qsl(url.query))
+            if method == 'POST':
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                request.update(json.loads(body or b'{}'))
+            if url.path not in ('/odds', '/whatif'):
+                status, answer = 404, {'error': f'Unknown path {url.path}'}
+            else:
+                answer = await self.Odds(request)
+        except (ServiceError, ValueError, TypeError) as error:
+            status, answer = 400, {'error': str(error)}
+        except Exception as error:
+            logging.exception("Request failed")
+            status, answer = 500, {'error': str(error)}
+        body = json.dumps(answer).encode()
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}[status]
+        writer.write(f'HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n'
+                     f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def Start(self, host: str='127.0.0.1', port: int=8016) -> int:
+        """Starts listening and returns the bound port, useful when `port` is 0"""
+        self.server = await asyncio.start_server(self.Handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def Serve(self, host: str='127.0.0.1', port: int=8016):
+        port = await self.Start(host, port)
+        logging.info("Listening on http://%s:%d", host, port)
+        async with self.server:
+            await self.server.serve_forever()
+
+    def Close(self):
+        if self.server is not None:
+            self.server.close()
+        self.executor.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve simulation odds over local HTTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8016)
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    service = Service(workers=args.workers)
+    try:
+        asyncio.run(service.Serve(args.host, args.port))
+    finally:
+        service.Close()
@@ -1,9 +1,38 @@
 import os
+import logging
+import argparse
 
 from multisimulator import Multisimulator
+from metrics import Metrics, NULL_METRICS
+from result_cache import ResultCache
 
 
 if __name__ == '__main__':
-    simulator = Multisimulator.FromJSONDirectory(os.path.join('data', '2016'), 2000, 250)
-    simulator.Simulate(useKnown=True)
+    parser = argparse.ArgumentParser(description='Simulate the remainder of an NFL season')
+    parser.add_argument('--checkpoint', help='File used to periodically save progress')
+    parser.add_argument('--resume', action='store_true', help='Continue from the checkpoint file')
+    parser.add_argument('--progress', action='store_true', help='Show progress and ETA')
+    parser.add_argument('--metrics', help='Write a JSON report of stage timings and counters to this file')
+    parser.add_argument('--profile-seasons', type=int, nargs='*', default=[],
+                        help='Indices of seasons to profile, one file per stage')
+    parser.add_argument('--profile-dir', default='profiles', help='Directory receiving profiles')
+    parser.add_argument('--seed', type=int, help='Seed making every experiment reproducible')
+    parser.add_argument('--cache', help='Directory caching results of seeded runs')
+    parser.add_argument('--interval', choices=Multisimulator.INTERVALS,
+                        help='Estimate the bands from a single pool of seasons')
+    parser.add_argument('--seasons', type=int, help='Size of the pool of seasons used with --interval')
+    parser.add_argument('--prune', action='store_true',
+                        help='Skip simulating outcomes which are already certain')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    metrics = NULL_METRICS
+    if args.progress or args.metrics or args.profile_seasons:
+        metrics = Metrics(progress=args.progress, profile_seasons=args.profile_seasons,
+                          profile_dir=args.profile_dir)
+    simulator = Multisimulator.FromJSONDirectory(os.path.join('data', '2016'), 2000, 250, metrics, args.seed,
+                                                 args.interval, args.seasons, args.prune)
+    cache = ResultCache(args.cache) if args.cache else None
+    simulator.Simulate(checkpoint=args.checkpoint, resume=args.resume, cache=cache)
     simulator.PrintUndefeated()
+    if args.metrics:
+        metrics.Export(args.metrics)
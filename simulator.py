@@ -1,27 +1,44 @@
 import os
 import copy
 import collections
+from typing import Sequence
 
 from season import Season
 from standings import Standings
 from season_simulator import SeasonSimulator
+from clinch import ClinchAnalyzer
+from metrics import NullMetrics, NULL_METRICS
 
 class Simulator:
     """
 
+    With `prune`, outcomes which `ClinchAnalyzer` proves settled are not simulated: when
+    no team can still finish undefeated no season is simulated at all, and otherwise each
+    season stops once every team has lost or tied.  Seasons observed by `observers` are
+    always simulated in full.  `settled` holds the exact undefeated probabilities of the
+    teams whose outcome is certain.
+
     """
-    def __init__(self, season: Season, standings: Standings, simulations: int):
+    def __init__(self, season: Season, standings: Standings, simulations: int,
+                 metrics: NullMetrics=NULL_METRICS, observers: Sequence=(), prune: bool=False):
         self.undefeated = []
         self.nUndefeated = []
+        self.seasonUndefeated = []
         self.season = season
         self.standings = standings
         self.simulations = simulations
+        self.metrics = metrics
+        self.observers = observers
+        self.prune = prune
+        self.settled = {}
 
     @classmethod
-    def FromJSONDirectory(cls, directory: str, simulations: int):
+    def FromJSONDirectory(cls, directory: str, simulations: int, metrics: NullMetrics=NULL_METRICS):
         season = os.path.join(directory, 'schedule.json')
         standings = os.path.join(directory, 'elo_start.json')
-        return cls(Season.FromJSON(season), Standings.FromJSON(standings), simulations)
+        with metrics.Stage('load'):
+            standings = Standings.FromJSON(standings)
+        return cls(Season.FromJSON(season, metrics), standings, simulations, metrics)
 
     def Simulate(self, simulations=None):
         """
@@ -31,12 +48,37 @@ class Simulator:
         """
         if simulations:
             self.simulations = simulations
+        metrics = self.metrics
+        metrics.Start(self.simulations)
+        if self.prune:
+            analyzer = ClinchAnalyzer(self.season, self.standings)
+            self.settled = analyzer.SettledUndefeated()
+            if not analyzer.UndefeatedContenders() and not self.observers:
+                self.seasonUndefeated += [[] for _ in range(self.simulations)]
+                return
+        # Starting ratings of every season are drawn up front when they are uncertain
+        teams = sorted(self.standings.keys())
+        # The season length is counted and checked once, not for every copy
+        games = self.season.GamesPerTeam()
+        start = copy.deepcopy(self.standings)
+        start.SetSeasonGames(games)
+        ratings = self.standings.SampleELO(self.simulations) if self.standings.uncertainty else None
         for i in range(self.simulations):
-            simulation = SeasonSimulator(self.season, copy.deepcopy(self.standings))
+            metrics.StartSeason()
+            with metrics.Stage('copy'):
+                simulation = SeasonSimulator(self.season, start, metrics, self.observers,
+                                             prune_undefeated=self.prune and not self.observers, games=games)
+                standings = simulation.standings
+                if ratings is not None:
+                    for team, rating in zip(teams, ratings[i]):
+                        standings[team].elo = int(rating)
             simulation.SimulateSeason()
-            standings = simulation.standings
-            self.undefeated += standings.GetUndefeated()
-            self.nUndefeated += range(1, standings.GetNumberUndefeated() + 1)
+            with metrics.Stage('aggregate'):
+                undefeated = standings.GetUndefeated()
+                self.undefeated += undefeated
+                self.seasonUndefeated.append([team.name for team in undefeated])
+                self.nUndefeated += range(1, standings.GetNumberUndefeated() + 1)
+            metrics.EndSeason()
 
     def GetPercent(self, value):
         """
@@ -53,10 +95,13 @@ class Simulator:
 
         :return:
         """
-        undefeated = collections.Counter(self.undefeated)
+        undefeated = collections.Counter(team.name for team in self.undefeated)
         nUndefeated = collections.Counter(self.nUndefeated)
+        for team, probability in sorted(self.settled.items()):
+            print('{} {}% (settled)'.format(team, 100.0 * probability))
         for team in undefeated:
-            print('{} {}%'.format(team, self.GetPercent(undefeated[team])))
+            if team not in self.settled:
+                print('{} {}%'.format(team, self.GetPercent(undefeated[team])))
         for n in nUndefeated:
             print('Probability of >= {} undefeated teams: {}%'.format(n, self.GetPercent(nUndefeated[n])))
 
@@ -1,18 +1,59 @@
 import os
 import json
-from typing import Dict, List
+from typing import Any, Dict, List, Sequence, Union
 from collections import UserDict
 
+import numpy
+
 from elo import ELO
 
 
+def sample_elo(elo: Sequence[int], teams: Sequence[str], uncertainty: Dict[str, Dict[str, Any]],
+               seasons: int, rng=numpy.random) -> numpy.ndarray:
+    """Draws starting ELO for `seasons` seasons in one step.
+
+    Teams with an `ensemble` take the ratings of one ensemble member per season, the same
+    member for every such team so that correlations between ratings are kept.  Teams with
+    an `sd` then get Gaussian noise of that standard deviation added.
+
+    Args:
+        elo: Point estimate of the ELO of every team
+        teams: Team names, in the order of `elo`
+        uncertainty: Per team `sd` and/or `ensemble`, see `Standings.FromData`
+        seasons: Number of seasons
+        rng (optional): Either a `numpy.random.Generator` or the global `numpy.random`
+
+    Returns:
+        Starting ELO indexed by `[season, team]`
+
+    """
+    base = numpy.asarray(elo, dtype=numpy.int64)[numpy.newaxis, :]
+    ensembles = [(t, uncertainty[team]['ensemble']) for t, team in enumerate(teams)
+                 if 'ensemble' in uncertainty.get(team, {})]
+    if ensembles:
+        base = numpy.repeat(base, len(ensembles[0][1]), axis=0)
+        for t, ensemble in ensembles:
+            base[:, t] = ensemble
+        base = base[(rng.random(seasons) * len(base)).astype(numpy.intp)]
+    else:
+        base = numpy.repeat(base, seasons, axis=0)
+    sd = numpy.array([uncertainty.get(team, {}).get('sd', 0.0) for team in teams])
+    if sd.any():
+        base += numpy.rint(rng.standard_normal(base.shape) * sd).astype(numpy.int64)
+    return base
+
+
 class Standings(UserDict):
     """
 
+    Attributes:
+        uncertainty (Dict[str, Dict[str, Any]]): Optional rating uncertainty of some
+                                                 teams, see `FromData` and `SampleELO`
 
     """
-    def __init__(self, start_elo: Dict[str, ELO]):
+    def __init__(self, start_elo: Dict[str, ELO], uncertainty: Dict[str, Dict[str, Any]]=None):
         super().__init__(start_elo)
+        self.uncertainty = uncertainty or {}
 
     @classmethod
     def FromJSON(cls, json_file):
@@ -25,14 +66,38 @@ class Standings(UserDict):
             json_file += '.json'
         with open(json_file) as f:
             data = json.load(f)
+        return cls.FromData(data)
+
+    @classmethod
+    def FromData(cls, data: Dict[str, Union[int, List[int], Dict[str, Any], ELO]]):
+        """Builds standings from the contents of an `elo_start.json` file
+
+        :param data: for each team, either the starting ELO, a list of starting ELO,
+                     wins, losses and ties, an `ELO` object, or a dictionary with the
+                     starting `elo`, optional `wins`, `losses` and `ties`, and optional
+                     rating uncertainty: an `sd` and/or an `ensemble` of ratings, where
+                     all ensembles must have the same number of members
+        :return:
+        :raises ValueError: if the rating uncertainty is invalid
+        """
+        data = dict(data)
+        uncertainty = {}
         for team, val in data.items():
             if isinstance(val, ELO):
                 continue
             if isinstance(val, int):
                 data[team] = ELO(team, val)
-            elif isinstance(val, List[int]):
+            elif isinstance(val, list):
                 data[team] = ELO(team, *val)
-        return cls(data)
+            elif isinstance(val, dict):
+                data[team] = ELO(team, val['elo'], val.get('wins', 0), val.get('losses', 0), val.get('ties', 0))
+                uncertainty[team] = {key: val[key] for key in ('sd', 'ensemble') if key in val}
+                if uncertainty[team].get('sd', 0) < 0:
+                    raise ValueError(f"Rating standard deviation of {team} is negative")
+        sizes = {len(u['ensemble']) for u in uncertainty.values() if 'ensemble' in u}
+        if len(sizes) > 1 or 0 in sizes:
+            raise ValueError(f"Rating ensembles must have the same, positive size, found {sorted(sizes)}")
+        return cls(data, {team: u for team, u in uncertainty.items() if u})
 
     @classmethod
     def FromJSONDirectory(cls, directory):
@@ -65,6 +130,22 @@ class Standings(UserDict):
     def Ties(self, team: str) -> int:
         return self[team].ties
 
+    def SampleELO(self, seasons: int, rng=numpy.random) -> numpy.ndarray:
+        """Draws starting ELO for `seasons` seasons, indexed by `[season, team]` with teams
+        in sorted order, see `sample_elo`.
+
+        """
+        teams = sorted(self.keys())
+        return sample_elo([self[team].elo for team in teams], teams, self.uncertainty, seasons, rng)
+
+    def SetSeasonGames(self, games: Dict[str, int]):
+        """Sets the length of the season of every team, as found in `Season.GamesPerTeam`
+
+        :raises ValueError: if a starting record has more games than the season
+        """
+        for team, n in games.items():
+            self[team].record.SetSeasonGames(n)
+
     def GetUndefeated(self) -> List[ELO]:
         result = filter(ELO.IsUndefeated, self.values())
         return list(result)
@@ -0,0 +1,180 @@
+import os
+import argparse
+import itertools
+from typing import Dict, List, Optional, Sequence
+
+import numpy
+
+from compiled_season import CompiledSeason
+from batch_simulator import BatchSimulator, ModelParameters
+
+
+class PairedMoments:
+    """Running sums of a per-season quantity for several parameter sets, together with
+    the sums of its difference against a baseline parameter set.  The arrays added must
+    be indexed by `[parameter set, season, ...]`.
+
+    Args:
+        baseline: Index of the baseline parameter set
+
+    """
+
+    def __init__(self, baseline: int=0):
+        self.baseline = baseline
+        self.n = 0
+        self.sum = self.sum_sq = self.diff = self.diff_sq = 0.0
+
+    def Add(self, x: numpy.ndarray):
+        x = x.astype(float)
+        d = x - x[self.baseline]
+        self.n += x.shape[1]
+        self.sum = self.sum + x.sum(axis=1)
+        self.sum_sq = self.sum_sq + (x**2).sum(axis=1)
+        self.diff = self.diff + d.sum(axis=1)
+        self.diff_sq = self.diff_sq + (d**2).sum(axis=1)
+
+    def Mean(self) -> numpy.ndarray:
+        return self.sum / self.n
+
+    def Difference(self) -> numpy.ndarray:
+        """Mean difference of each parameter set from the baseline"""
+        return self.diff / self.n
+
+    def DifferenceError(self) -> numpy.ndarray:
+        """Standard error of `Difference` using the paired seasons"""
+        variance = self.diff_sq / self.n - self.Difference()**2
+        return numpy.sqrt(numpy.maximum(variance, 0.0) / max(self.n - 1, 1))
+
+    def IndependentError(self) -> numpy.ndarray:
+        """Standard error `Difference` would have if every parameter set were
+        simulated with independent random numbers
+
+        """
+        variance = numpy.maximum(self.sum_sq / self.n - self.Mean()**2, 0.0)
+        return numpy.sqrt((variance + variance[self.baseline]) / max(self.n - 1, 1))
+
+
+class Sweep:
+    """Simulates a season for every combination of model parameters using common random
+    numbers: all parameter sets are driven by the same draws in a single vectorized run,
+    so the difference between any setting and the baseline has much lower variance
+    than the difference between independent `Simulator` runs.
+
+    Args:
+        compiled: Season to simulate
+        parameters: Parameter sets to compare
+        seasons: Number of seasons simulated for every parameter set
+        baseline (optional): Parameter set used as reference, default `ModelParameters()`
+                             if present, otherwise the first one
+        batch_size (optional): Number of seasons simulated per array batch
+        seed (optional): Seed of the random number generator
+
+    """
+
+    def __init__(self, compiled: CompiledSeason, parameters: Sequence[ModelParameters], seasons: int,
+                 baseline: Optional[ModelParameters]=None, batch_size: int=10000,
+                 seed: Optional[int]=None):
+        self.compiled = compiled
+        self.parameters = list(parameters)
+        if baseline is None:
+            baseline = ModelParameters() if ModelParameters() in self.parameters else self.parameters[0]
+        self.baseline = self.parameters.index(baseline)
+        self.seasons = seasons
+        self.batch_size = batch_size
+        self.seed = seed
+        self.wins = PairedMoments(self.baseline)
+        self.undefeated = PairedMoments(self.baseline)
+        self.any_undefeated = PairedMoments(self.baseline)
+
+    @classmethod
+    def FromJSONDirectory(cls, directory: str, parameters: Sequence[ModelParameters], seasons: int, **kwargs):
+        return cls(CompiledSeason.FromJSONDirectory(directory), parameters, seasons, **kwargs)
+
+    @staticmethod
+    def Grid(**values: Sequence[float]) -> List[ModelParameters]:
+        """Every combination of the given parameter values, with unspecified parameters
+        left at their defaults.
+
+        Examples:
+            >>> len(Sweep.Grid(k=[15, 20, 25], home_advantage=[50, 65, 80]))
+            9
+
+        """
+        names = list(values)
+        return [ModelParameters(**dict(zip(names, combination)))
+                for combination in itertools.product(*(values[name] for name in names))]
+
+    def Simulate(self):
+        """Runs all parameter sets over the same draws, in batches of `batch_size` seasons"""
+        rng = numpy.random.default_rng(self.seed)
+        simulator = BatchSimulator(self.compiled, self.parameters)
+        remaining = self.seasons
+        while remaining > 0:
+            n = min(remaining, self.batch_size)
+            result = simulator.Simulate(n, rng)
+            undefeated = result.Undefeated()
+            self.wins.Add(result.wins + 0.5 * result.ties)
+            self.undefeated.Add(undefeated)
+            self.any_undefeated.Add(undefeated.any(axis=2))
+            remaining -= n
+
+    def Results(self) -> List[Dict]:
+        """Per parameter set results and paired differences against the baseline.
+
+        Returns:
+            One dictionary per parameter set with keys `parameters`, `baseline`,
+            `any_undefeated`, `any_undefeated_diff`, `any_undefeated_error`, and
+            `teams`, which maps team names to `wins`, `wins_diff`, `wins_error`,
+            `undefeated`, `undefeated_diff` and `undefeated_error`; ties count as half a win
+
+        """
+        if self.wins.n == 0:
+            self.Simulate()
+        wins, wins_diff, wins_error = self.wins.Mean(), self.wins.Difference(), self.wins.DifferenceError()
+        und, und_diff, und_error = (self.undefeated.Mean(), self.undefeated.Difference(),
+                                    self.undefeated.DifferenceError())
+        results = []
+        for p, parameters in enumerate(self.parameters):
+            teams = {team: {'wins': wins[p, t], 'wins_diff': wins_diff[p, t], 'wins_error': wins_error[p, t],
+                            'undefeated': und[p, t], 'undefeated_diff': und_diff[p, t],
+                            'undefeated_error': und_error[p, t]}
+                     for t, team in enumerate(self.compiled.teams)}
+            results.append({'parameters': parameters._asdict(),
+                            'baseline': p == self.baseline,
+                            'any_undefeated': self.any_undefeated.Mean()[p],
+                            'any_undefeated_diff': self.any_undefeated.Difference()[p],
+                            'any_undefeated_error': self.any_undefeated.DifferenceError()[p],
+                            'teams': teams})
+        return results
+
+    def PrintSweep(self):
+        """Prints expected wins for every team and parameter set, with the paired
+        difference from the baseline and its standard error.
+
+        """
+        results = self.Results()
+        paired = self.wins.DifferenceError()
+        nonzero = paired > 0
+        gain = numpy.median(self.wins.IndependentError()[nonzero] / paired[nonzero]) if nonzero.any() else 1.0
+        print(f'{self.seasons} seasons; common random numbers reduce the error of differences by {gain:.1f}x')
+        for result in results:
+            label = ', '.join(f'{k}={v:.4g}' for k, v in result['parameters'].items())
+            print(f'{label}{" (baseline)" if result["baseline"] else ""}')
+            print(f'    ANY undefeated {100 * result["any_undefeated"]:.3f}% '
+                  f'({100 * result["any_undefeated_diff"]:+.3f} +- {100 * result["any_undefeated_error"]:.3f})')
+            for team, r in result['teams'].items():
+                print(f'    {team:<3} {r["wins"]:6.3f} wins ({r["wins_diff"]:+.3f} +- {r["wins_error"]:.3f})  '
+                      f'undefeated {100 * r["undefeated"]:.3f}% ({100 * r["undefeated_diff"]:+.3f})')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare model parameters using common random numbers')
+    parser.add_argument('--directory', default=os.path.join('data', '2016'))
+    parser.add_argument('--seasons', type=int, default=20000)
+    parser.add_argument('--k', type=float, nargs='+', default=[ModelParameters().k])
+    parser.add_argument('--home-advantage', type=float, nargs='+', default=[ModelParameters().home_advantage])
+    parser.add_argument('--tie-rate', type=float, nargs='+', default=[ModelParameters().tie_rate])
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    grid = Sweep.Grid(k=args.k, home_advantage=args.home_advantage, tie_rate=args.tie_rate)
+    Sweep.FromJSONDirectory(args.directory, grid, args.seasons, seed=args.seed).PrintSweep()
@@ -0,0 +1,66 @@
+import os
+import copy
+import unittest
+
+import numpy
+
+from season import Season
+from standings import Standings
+from season_simulator import SeasonSimulator
+from compiled_season import CompiledSeason
+from batch_simulator import BatchSimulator, ModelParameters
+from sweep import Sweep
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data')
+
+
+class TestBatchSimulator(unittest.TestCase):
+    def test_played_season(self):
+        # Every 2015 game has been played, so both simulators must agree exactly
+        season = Season.FromJSONDirectory(os.path.join(DATA, '2015'))
+        standings = Standings.FromJSONDirectory(os.path.join(DATA, '2015'))
+        compiled = CompiledSeason(season, standings)
+        reference = SeasonSimulator(season, copy.deepcopy(standings))
+        reference.SimulateSeason()
+        result = BatchSimulator(compiled).Simulate(2, numpy.random.default_rng(0))
+        for t, team in enumerate(compiled.teams):
+            for field in ['elo', 'wins', 'losses', 'ties']:
+                expected = getattr(reference.standings[team], field)
+                self.assertEqual(list(getattr(result, field)[0, :, t]), [expected, expected],
+                                 f"{team} {field}")
+
+    def test_records(self):
+        compiled = CompiledSeason.FromJSONDirectory(os.path.join(DATA, '2016'))
+        result = BatchSimulator(compiled).Simulate(100, numpy.random.default_rng(1), record_spreads=True)
+        games = result.wins + result.losses + result.ties
+        self.assertTrue(numpy.all(games == 16))
+        self.assertTrue(numpy.all(result.wins.sum(axis=2) == result.losses.sum(axis=2)))
+        self.assertTrue(numpy.all(result.elo.sum(axis=2) == compiled.elo.sum()))
+        self.assertEqual(result.spreads.shape, (1, 100, compiled.n_games))
+        played = compiled.played
+        self.assertTrue(numpy.all(result.spreads[0, :, played] ==
+                                  (compiled.home_score - compiled.away_score)[played, numpy.newaxis]))
+
+
+class TestSweep(unittest.TestCase):
+    def test_grid(self):
+        grid = Sweep.Grid(k=[15, 20, 25], home_advantage=[50, 65, 80])
+        self.assertEqual(len(grid), 9)
+        self.assertIn(ModelParameters(), grid)
+
+    def test_common_random_numbers(self):
+        compiled = CompiledSeason.FromJSONDirectory(os.path.join(DATA, '2016'))
+        grid = [ModelParameters(), ModelParameters(k=25.0), ModelParameters()]
+        sweep = Sweep(compiled, grid, 500, batch_size=200, seed=3)
+        results = sweep.Results()
+        self.assertTrue(results[0]['baseline'])
+        for team in compiled.teams:
+            # Identical parameters see identical draws
+            self.assertEqual(results[2]['teams'][team]['wins_diff'], 0.0)
+            self.assertEqual(results[2]['teams'][team]['wins_error'], 0.0)
+        errors = sweep.wins.DifferenceError()[1]
+        self.assertTrue(numpy.all(errors < sweep.wins.IndependentError()[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import random
+import logging
+import tempfile
+import unittest
+
+import numpy
+
+from multisimulator import Multisimulator
+
+logging.basicConfig(level=logging.INFO)
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data', '2016')
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.DEBUG)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    @staticmethod
+    def seed():
+        random.seed(2016)
+        numpy.random.seed(2016)
+
+    def test_resume(self):
+        self.seed()
+        uninterrupted = Multisimulator.FromJSONDirectory(DATA, 3, 3)
+        uninterrupted.Simulate()
+        final_state = random.getstate()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'run.pickle')
+            self.seed()
+            interrupted = Multisimulator.FromJSONDirectory(DATA, 3, 1)
+            interrupted.Simulate(checkpoint=path)
+            self.assertTrue(os.path.exists(path))
+            self.assertEqual(os.listdir(tmp), ['run.pickle'], "Temporary files should not remain")
+            # A new process would not share the generator positions of the first run
+            random.seed()
+            numpy.random.seed()
+            resumed = Multisimulator.FromJSONDirectory(DATA, 3, 3)
+            resumed.Simulate(checkpoint=path, resume=True)
+        self.assertEqual(resumed.undefeated, uninterrupted.undefeated)
+        self.assertEqual(random.getstate(), final_state)
+
+    def test_mismatch(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'run.pickle')
+            Multisimulator.FromJSONDirectory(DATA, 2, 1).Simulate(checkpoint=path)
+            with self.assertRaises(ValueError):
+                Multisimulator.FromJSONDirectory(DATA, 3, 2).Simulate(checkpoint=path, resume=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
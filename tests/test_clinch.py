@@ -0,0 +1,107 @@
+import io
+import os
+import random
+import contextlib
+import itertools
+import unittest
+
+from season import Season
+from standings import Standings
+from simulator import Simulator
+from multisimulator import Multisimulator
+from clinch import ClinchAnalyzer
+from data.make_synthetic import synthetic_season
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data', '2016')
+
+
+def partial_season(seed, played_weeks=3, weeks=5):
+    """A six team league in which the first `played_weeks` weeks have random results"""
+    schedule, elo = synthetic_season(6, weeks, seed=seed)
+    rng = random.Random(seed)
+    for week in schedule['schedule'][:played_weeks]:
+        for game in week:
+            game += rng.choice([[21, 14], [14, 21], [17, 17], [24, 3]])
+    return Season(schedule), Standings.FromData(elo)
+
+
+def final_points(analyzer, outcomes):
+    """Points of every team after the remaining games end with `outcomes`, each 2 for a
+    home win, 1 for a tie and 0 for an away win
+
+    """
+    points = {team: analyzer.Points(team) for team in analyzer.teams}
+    for (home, away), outcome in zip(analyzer.remaining, outcomes):
+        points[home] += outcome
+        points[away] += 2 - outcome
+    return points
+
+
+class TestClinchAnalyzer(unittest.TestCase):
+    def test_brute_force(self):
+        for seed in range(8):
+            analyzer = ClinchAnalyzer(*partial_season(seed))
+            completions = [final_points(analyzer, outcomes)
+                           for outcomes in itertools.product([0, 1, 2], repeat=len(analyzer.remaining))]
+            for group in [None, analyzer.teams[:4]]:
+                members = group or analyzer.teams
+                for team in members:
+                    others = [t for t in members if t != team]
+                    ahead = any(all(p[team] >= p[t] for t in others) for p in completions)
+                    strictly_ahead = any(all(p[team] > p[t] for t in others) for p in completions)
+                    clinched = all(all(p[team] > p[t] for t in others) for p in completions)
+                    self.assertEqual(analyzer.CanFinishAhead(team, group), ahead, f'{seed} {team}')
+                    self.assertEqual(analyzer.CanFinishAhead(team, group, strict=True), strictly_ahead)
+                    self.assertEqual(analyzer.HasClinched(team, group), clinched)
+
+    def test_undefeated(self):
+        analyzer = ClinchAnalyzer.FromJSONDirectory(DATA)
+        self.assertEqual(analyzer.UndefeatedContenders(), [])
+        self.assertEqual(set(analyzer.SettledUndefeated().values()), {0.0})
+        low, high = analyzer.WinRange('NE')
+        self.assertEqual(high - low, analyzer.games_left['NE'])
+
+    def test_prune(self):
+        season, standings = Season.FromJSONDirectory(DATA), Standings.FromJSONDirectory(DATA)
+        simulator = Simulator(season, standings, 50, prune=True)
+        simulator.Simulate()
+        self.assertEqual(len(simulator.seasonUndefeated), 50)
+        self.assertEqual(simulator.undefeated, [])
+        self.assertEqual(len(simulator.settled), 32)
+
+        season, standings = partial_season(1, played_weeks=0)
+        counts = []
+        for prune in [False, True]:
+            random.seed(2)
+            simulator = Simulator(season, standings, 2000, prune=prune)
+            simulator.Simulate()
+            counts.append(len(simulator.nUndefeated))
+        # Pruning only skips games after every team has lost, so the rates agree
+        self.assertGreater(counts[0], 0)
+        self.assertLess(abs(counts[0] - counts[1]), 5 * (counts[0] ** 0.5))
+
+    def test_settled_reported(self):
+        season, standings = partial_season(1, played_weeks=1)
+        settled = ClinchAnalyzer(season, standings).SettledUndefeated()
+        self.assertIn(0.0, settled.values())
+        simulator = Simulator(season, standings, 20, prune=True)
+        simulator.Simulate()
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            simulator.PrintUndefeated()
+        for team in settled:
+            self.assertIn(f'{team} 0.0% (settled)', output.getvalue())
+        for interval in [None, 'binomial']:
+            multisimulator = Multisimulator(season, standings, 20, 5, seed=1, interval=interval, prune=True)
+            multisimulator.Simulate()
+            self.assertEqual(multisimulator.settled, settled)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                multisimulator.PrintUndefeated()
+            for team in settled:
+                self.assertIn(f'{team:<3} [exact]: 0.0%', output.getvalue())
+                self.assertNotIn(f'{team:<3} [50%]', output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
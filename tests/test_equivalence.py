@@ -0,0 +1,57 @@
+import os
+import unittest
+
+import numpy
+
+from season import Season
+from standings import Standings
+from compiled_season import CompiledSeason
+from batch_simulator import BatchSimulator, ModelParameters
+from equivalence import Outcomes, compare, reference_backend, batch_backend, kernel_backend, merge_sparse
+from season_kernel import KernelSimulator, _rint
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data', '2016')
+
+
+class TestEquivalence(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.season = Season.FromJSONDirectory(DATA)
+        cls.standings = Standings.FromJSONDirectory(DATA)
+        cls.compiled = CompiledSeason(cls.season, cls.standings)
+        cls.reference = reference_backend(cls.season, cls.standings, 300, 5)
+
+    def test_batch(self):
+        candidate = batch_backend(self.season, self.standings, 300, 6)
+        self.assertTrue(compare(self.reference, candidate, self.compiled.played).passed)
+
+    def test_kernel(self):
+        candidate = kernel_backend(self.season, self.standings, 300, 7)
+        self.assertTrue(compare(self.reference, candidate, self.compiled.played).passed)
+
+    def test_kernel_played_season(self):
+        # Every 2015 game has been played, so the kernel must agree with the batch engine
+        compiled = CompiledSeason.FromJSONDirectory(os.path.join(DATA, os.pardir, '2015'))
+        kernel = KernelSimulator(compiled).Simulate(2)
+        batch = BatchSimulator(compiled).Simulate(2)
+        for field in ['elo', 'wins', 'losses', 'ties']:
+            self.assertTrue(numpy.array_equal(getattr(kernel, field), getattr(batch, field)), field)
+        self.assertEqual([_rint(x) for x in [0.5, 1.5, -0.5, -1.5, 2.4, -2.6]],
+                         [int(numpy.rint(x)) for x in [0.5, 1.5, -0.5, -1.5, 2.4, -2.6]])
+
+    def test_detects_difference(self):
+        result = BatchSimulator(self.compiled, ModelParameters(home_advantage=250)).Simulate(
+            300, numpy.random.default_rng(6), record_spreads=True)
+        candidate = Outcomes(result.teams, result.spreads[0], result.wins[0], result.losses[0], result.ties[0])
+        report = compare(self.reference, candidate, self.compiled.played)
+        self.assertFalse(report.passed)
+        self.assertIn('spread histogram', [name for name, _ in report.failures])
+
+    def test_merge_sparse(self):
+        merged = merge_sparse(numpy.array([[1, 0, 30, 2, 40], [2, 0, 28, 1, 39]], dtype=float))
+        self.assertEqual(merged.sum(), 143)
+        self.assertTrue((merged.sum(axis=0) >= 10).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+
+import numpy
+
+from simulator import Simulator
+from compiled_season import CompiledSeason
+from batch_simulator import BatchSimulator
+from export import StandingsWriter, StandingsReader, export_simulation
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data')
+
+
+class TestExport(unittest.TestCase):
+    def test_batches(self):
+        compiled = CompiledSeason.FromJSONDirectory(os.path.join(DATA, '2016'))
+        with tempfile.TemporaryDirectory() as tmp:
+            chunks = export_simulation(compiled, tmp, 250, batch_size=100, seed=3)
+            self.assertEqual([c['seasons'] for c in chunks], [100, 100, 50])
+            reader = StandingsReader(tmp)
+            self.assertEqual(reader.teams, compiled.teams)
+            self.assertEqual(reader.seasons, 250)
+            self.assertTrue(all(isinstance(c, numpy.memmap) for c in reader.Chunks('elo')))
+            rng = numpy.random.default_rng(3)
+            expected = [BatchSimulator(compiled).Simulate(n, rng) for n in [100, 100, 50]]
+            for field in reader.fields:
+                values = reader.Load(field)
+                self.assertEqual(values.dtype, numpy.int16)
+                self.assertTrue(numpy.array_equal(values, numpy.concatenate([getattr(r, field)[0] for r in expected])))
+
+    def test_observer(self):
+        # Every 2015 game has been played, so every season has the same final standings
+        directory = os.path.join(DATA, '2015')
+        compiled = CompiledSeason.FromJSONDirectory(directory)
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = StandingsWriter(tmp, compiled.teams, chunk_size=2, weeks=compiled.n_weeks)
+            simulator = Simulator.FromJSONDirectory(directory, 5)
+            simulator.observers = [writer]
+            simulator.Simulate()
+            writer.Close()
+            reader = StandingsReader(tmp)
+            self.assertEqual([c['seasons'] for c in reader.chunks], [2, 2, 1])
+            batch = BatchSimulator(compiled).Simulate(5)
+            for field in reader.fields:
+                self.assertTrue(numpy.array_equal(reader.Load(field), getattr(batch, field)[0]), field)
+
+    def test_invalid(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = StandingsWriter(tmp, ['A', 'B'])
+            arrays = {field: numpy.zeros((3, 2), dtype=int) for field in writer.dtypes}
+            with self.assertRaises(ValueError):
+                writer.WriteArrays(**dict(arrays, elo=numpy.full((3, 2), 40000)))
+            with self.assertRaises(ValueError):
+                writer.WriteArrays(**dict(arrays, wins=numpy.zeros((2, 2))))
+            writer.WriteArrays(**arrays)
+            self.assertEqual(StandingsReader(tmp).seasons, 3)
+            simulator = Simulator.FromJSONDirectory(os.path.join(DATA, '2015'), 1)
+            simulator.observers = [writer]
+            with self.assertRaises(ValueError):
+                simulator.Simulate()
+
+
+if __name__ == '__main__':
+    unittest.main()
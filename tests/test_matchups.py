@@ -0,0 +1,67 @@
+import os
+import copy
+import unittest
+
+import numpy
+
+import inv_erf
+from standings import Standings
+from elo_game import GetGame
+from matchups import MatchupMatrix
+from batch_simulator import outcome_probabilities
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data', '2016')
+
+
+class TestMatchupMatrix(unittest.TestCase):
+    def setUp(self):
+        self.standings = Standings.FromJSONDirectory(DATA)
+        self.matrix = MatchupMatrix(self.standings)
+
+    def test_game_simulator(self):
+        m = self.matrix
+        for team, opponent in [('NE', 'NYJ'), ('CLE', 'DEN'), ('SF', 'SEA')]:
+            t, o = m.index[team], m.index[opponent]
+            for v, neutral in [(0, False), (2, True)]:
+                game = GetGame(self.standings[team], self.standings[opponent], neutral=neutral)
+                self.assertAlmostEqual(m.win_probability[v, t, o], game.HomeWinProbability())
+                self.assertAlmostEqual(m.point_margin[v, t, o], game.PointMargin())
+            game = GetGame(self.standings[opponent], self.standings[team])
+            self.assertAlmostEqual(m.win_probability[1, t, o], game.AwayWinProbability())
+            self.assertAlmostEqual(m.point_margin[1, t, o], -game.PointMargin())
+        self.assertTrue(numpy.isnan(m.win_probability[:, 0, 0]).all())
+
+    def test_update(self):
+        self.matrix.Update({'NE': 1700, 'CLE': 1300})
+        standings = copy.deepcopy(self.standings)
+        standings['NE'].elo, standings['CLE'].elo = 1700, 1300
+        fresh = MatchupMatrix(standings)
+        for name in ['margin', 'win_probability', 'point_margin', 'tie_probability']:
+            numpy.testing.assert_allclose(getattr(self.matrix, name), getattr(fresh, name), err_msg=name)
+        self.assertEqual(self.matrix.Rankings()[0], 'NE')
+        self.assertEqual(self.matrix.Rankings()[-1], 'CLE')
+
+    def test_spreads(self):
+        m = self.matrix
+        m.SampleSpreads(4000, max_spread=30, rng=numpy.random.default_rng(0))
+        self.assertEqual(m.spreads.shape, (3, 32, 32, 61))
+        valid = ~numpy.isnan(m.margin)
+        numpy.testing.assert_allclose(m.spreads[valid].sum(axis=1), 1.0)
+        # Win frequencies agree with the exact outcome probabilities within sampling error
+        wins = m.spreads[..., 31:].sum(axis=3)
+        ties = m.spreads[..., 30]
+        sigma = inv_erf.get_sigma_array(m.point_margin, m.win_probability)
+        exact_wins = outcome_probabilities(m.point_margin, sigma, m.parameters.tie_rate)[0]
+        self.assertLess(numpy.abs(wins - exact_wins)[valid].max(), 5 * numpy.sqrt(0.25 / 4000))
+        self.assertLess(numpy.abs(ties - m.tie_probability)[valid].max(), 0.01)
+        before = m.spreads.copy()
+        m.Update({'NE': 1800})
+        t = m.index['NE']
+        unchanged = numpy.ones(m.margin.shape, dtype=bool)
+        unchanged[:, t, :] = unchanged[:, :, t] = False
+        self.assertTrue(numpy.array_equal(before[unchanged], m.spreads[unchanged], equal_nan=True))
+        self.assertGreater(m.spreads[2, t, :, 31:].sum(axis=1)[valid[2, t]].min(), 0.6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import os
+import json
+import logging
+import tempfile
+import unittest
+
+from metrics import Metrics
+from simulator import Simulator
+
+logging.basicConfig(level=logging.INFO)
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data', '2016')
+
+
+class TestMetrics(unittest.TestCase):
+    def test_report(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            metrics = Metrics(profile_seasons=[1], profile_dir=tmp)
+            simulator = Simulator.FromJSONDirectory(DATA, 3, metrics)
+            simulator.Simulate()
+            metrics.Stop()
+            report_file = os.path.join(tmp, 'report.json')
+            metrics.Export(report_file)
+            with open(report_file) as f:
+                report = json.load(f)
+            profiles = sorted(p for p in os.listdir(tmp) if p.endswith('.prof'))
+        self.assertEqual(report['counters']['seasons'], 3)
+        self.assertEqual(report['counters']['games'], 3 * 256)
+        # Every unplayed game needs at least one draw
+        unplayed = sum(len(g) == 2 for week in simulator.season for g in week)
+        self.assertGreaterEqual(report['counters']['rng_draws'], 3 * unplayed)
+        self.assertLessEqual(report['counters']['rng_draws'], 3 * 3 * unplayed)
+        for stage in ['load', 'verify_data', 'copy', 'simulate', 'verify_simulation', 'aggregate']:
+            self.assertIn(stage, report['stages'])
+        self.assertGreater(report['games_per_second'], 0.0)
+        self.assertEqual(profiles, ['season000001_aggregate.prof', 'season000001_copy.prof',
+                                    'season000001_simulate.prof', 'season000001_verify_simulation.prof'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import io
+import contextlib
+import unittest
+
+import numpy
+
+from season import Season
+from standings import Standings
+from multisimulator import Multisimulator
+from data.make_synthetic import synthetic_season
+
+
+def short_season():
+    """A three week league in which undefeated teams are common"""
+    schedule, elo = synthetic_season(6, 3, seed=2)
+    return Season(schedule), Standings.FromData(elo)
+
+
+class TestIntervals(unittest.TestCase):
+    def test_matches_experiments(self):
+        season, standings = short_season()
+        nested = Multisimulator(season, standings, 50, 100, seed=3)
+        nested.Simulate()
+        for interval in Multisimulator.INTERVALS:
+            pooled = Multisimulator(season, standings, 50, 100, seed=4, interval=interval, seasons=2000)
+            pooled.Simulate()
+            self.assertEqual(len(pooled.results), 100)
+            self.assertEqual(len(pooled.undefeated['ANY']), 100)
+            for p in [0.025, 0.5, 0.975]:
+                expected = nested.undefeated['ANY'][int(100 * p)]
+                found = pooled.undefeated['ANY'][int(100 * p)]
+                self.assertLessEqual(abs(found - expected), 4, f"{interval} {p}")
+            self.assertTrue(all(numpy.diff(pooled.undefeated['ANY']) >= 0))
+
+    def test_print(self):
+        season, standings = short_season()
+        simulator = Multisimulator(season, standings, 20, 10, seed=5, interval='bootstrap')
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            simulator.PrintUndefeated()
+        self.assertEqual(simulator.seasons, 200)
+        self.assertIn('ANY [50%]:', output.getvalue())
+
+    def test_invalid(self):
+        season, standings = short_season()
+        with self.assertRaises(ValueError):
+            Multisimulator(season, standings, 20, 10, interval='normal')
+        simulator = Multisimulator(season, standings, 20, 10, interval='binomial')
+        with self.assertRaises(ValueError):
+            simulator.Simulate(checkpoint='unused')
+
+
+if __name__ == '__main__':
+    unittest.main()
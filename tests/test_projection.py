@@ -0,0 +1,66 @@
+import os
+import unittest
+
+import numpy
+
+from season import Season
+from compiled_season import CompiledSeason
+from batch_simulator import BatchSimulator, ModelParameters
+from projection import ChainedProjection, future_season
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data')
+
+
+class TestChainedProjection(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.current = CompiledSeason.FromJSONDirectory(os.path.join(DATA, '2016'))
+        cls.future = future_season(Season.FromJSONDirectory(os.path.join(DATA, '2016')))
+
+    def test_future_season(self):
+        self.assertFalse(self.future.played.any())
+        self.assertEqual(self.future.n_games, self.current.n_games)
+        self.assertTrue(numpy.array_equal(self.future.neutral, self.current.neutral))
+        self.assertEqual(self.future.wins.sum(), 0)
+
+    def test_no_regression_carries_ratings(self):
+        projection = ChainedProjection([self.current, self.future, self.future], regression=0)
+        results = projection.Simulate(50, numpy.random.default_rng(1))
+        self.assertEqual(len(results), 3)
+        self.assertTrue(numpy.array_equal(projection.Regress(results[0].elo, 1), results[0].elo))
+        # ELO is exchanged between teams, so every future keeps its total
+        totals = [result.elo.sum(axis=2) for result in results]
+        self.assertTrue(numpy.array_equal(totals[0], totals[1]))
+        self.assertTrue(numpy.array_equal(totals[0], totals[2]))
+        self.assertEqual(results[1].wins.sum(axis=2).max(), self.future.n_games)
+
+    def test_full_regression(self):
+        projection = ChainedProjection([self.current, self.future], regression=1, mean=1500)
+        elo = projection.Simulate(20, numpy.random.default_rng(2))[0].elo
+        self.assertTrue((projection.Regress(elo, 1) == 1500).all())
+        projection = ChainedProjection([self.current, self.future], regression=0.5)
+        start = projection.Regress(elo, 1)
+        self.assertTrue(numpy.allclose(start.mean(axis=2), elo.mean(axis=2), atol=0.5))
+        self.assertTrue((start.std(axis=2) < elo.std(axis=2)).all())
+
+    def test_renames(self):
+        old = CompiledSeason.FromJSONDirectory(os.path.join(DATA, '2015'))
+        projection = ChainedProjection([old, self.future])
+        new = [team for team, t in zip(self.future.teams, projection.carry[0]) if t < 0]
+        self.assertEqual(new, ['JAC', 'LA', 'WAS'])
+        start = projection.Regress(projection.Simulate(5, numpy.random.default_rng(3))[0].elo, 1)
+        self.assertTrue((start[..., self.future.index['LA']] == 1505).all())
+        projection = ChainedProjection([old, self.future], renames={'STL': 'LA', 'WSH': 'WAS', 'JAX': 'JAC'})
+        self.assertTrue((projection.carry[0] >= 0).all())
+
+    def test_start_elo_per_parameter_set(self):
+        parameters = [ModelParameters(), ModelParameters(k=30)]
+        start = numpy.empty((2, 10, self.future.n_teams), dtype=numpy.int64)
+        start[0], start[1] = 1400, 1600
+        result = BatchSimulator(self.future, parameters).Simulate(10, numpy.random.default_rng(4), start_elo=start)
+        self.assertEqual(result.elo[0].sum(axis=1).tolist(), [1400 * self.future.n_teams] * 10)
+        self.assertEqual(result.elo[1].sum(axis=1).tolist(), [1600 * self.future.n_teams] * 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
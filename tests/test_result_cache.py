@@ -0,0 +1,78 @@
+import os
+import json
+import logging
+import tempfile
+import unittest
+
+from season import Season
+from standings import Standings
+from multisimulator import Multisimulator
+from result_cache import ResultCache
+
+logging.basicConfig(level=logging.INFO)
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data', '2016')
+
+
+def unplayed_season(dominant='NE', elo=2400):
+    """The 2016 schedule with every game unplayed and one dominant team, so that
+    undefeated seasons actually occur.
+
+    """
+    with open(os.path.join(DATA, 'schedule.json')) as f:
+        data = json.load(f)
+    data['schedule'] = [[game[:2] for game in week] for week in data['schedule']]
+    standings = Standings.FromJSONDirectory(DATA)
+    standings[dominant].elo = elo
+    return Season(data), standings
+
+
+class TestResultCache(unittest.TestCase):
+    def test_top_up(self):
+        season, standings = unplayed_season()
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResultCache(tmp)
+            reference = Multisimulator(season, standings, 4, 3, seed=11)
+            reference.Simulate()
+            self.assertIn('NE', reference.undefeated)
+
+            first = Multisimulator(season, standings, 4, 2, seed=11)
+            first.Simulate(cache=cache)
+            self.assertEqual(first.simulated, 2)
+            repeat = Multisimulator(season, standings, 4, 2, seed=11)
+            repeat.Simulate(cache=cache)
+            self.assertEqual(repeat.simulated, 0)
+            self.assertEqual(repeat.undefeated, first.undefeated)
+
+            topped_up = Multisimulator(season, standings, 4, 3, seed=11)
+            topped_up.Simulate(cache=cache)
+            self.assertEqual(topped_up.simulated, 1)
+            self.assertEqual(topped_up.undefeated, reference.undefeated)
+
+            # Changed inputs must not be served from the cache
+            standings['NE'].elo += 1
+            changed = Multisimulator(season, standings, 4, 2, seed=11)
+            changed.Simulate(cache=cache)
+            self.assertEqual(changed.simulated, 2)
+            self.assertEqual(len(os.listdir(tmp)), 2)
+
+            with self.assertRaises(ValueError):
+                Multisimulator(season, standings, 4, 2).Simulate(cache=cache)
+
+    def test_eviction(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResultCache(tmp, max_bytes=1500)
+            for key in 'abc':
+                cache.Put(key, 'x' * 600)
+                os.utime(os.path.join(tmp, key + '.pickle'), ns=(ord(key), ord(key)))
+            self.assertIsNone(cache.Get('a'))
+            self.assertEqual(cache.Get('b'), 'x' * 600)
+            cache.Put('d', 'x' * 600)
+            # 'c' is now the least recently used entry
+            self.assertIsNone(cache.Get('c'))
+            self.assertIsNotNone(cache.Get('b'))
+            self.assertIsNotNone(cache.Get('d'))
+
+
+if __name__ == '__main__':
+    unittest.main()
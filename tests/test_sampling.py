@@ -0,0 +1,46 @@
+import os
+import unittest
+
+import numpy
+
+from compiled_season import CompiledSeason
+from batch_simulator import BatchSimulator
+from sampling import antithetic_draws, sobol_draws, control_variate_mean, estimate
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data')
+
+
+class TestSampling(unittest.TestCase):
+    def test_draws(self):
+        rng = numpy.random.default_rng(0)
+        draws = antithetic_draws(rng, 6, 5)
+        for d in draws:
+            self.assertEqual(d.shape, (6, 5))
+            self.assertTrue(numpy.allclose(d[:3] + d[3:], 1.0))
+        with self.assertRaises(ValueError):
+            antithetic_draws(rng, 5, 5)
+        draws = sobol_draws(rng, 8, 5)
+        for d in draws:
+            self.assertEqual(d.shape, (8, 5))
+            # Every dimension of a scrambled Sobol net has one point in each eighth
+            self.assertTrue(all(sorted((column * 8).astype(int)) == list(range(8)) for column in d.T))
+
+    def test_control_variate(self):
+        control = numpy.random.default_rng(1).normal(size=(100, 2))
+        estimated = control_variate_mean(3.0 * control + [5.0, -1.0], control)
+        self.assertTrue(numpy.allclose(estimated, [5.0, -1.0]))
+
+    def test_expected_wins(self):
+        compiled = CompiledSeason.FromJSONDirectory(os.path.join(DATA, '2016'))
+        result = BatchSimulator(compiled).Simulate(20000, numpy.random.default_rng(2), expected_wins=True)
+        control = result.ControlVariate()[0]
+        error = control.std(axis=0) / numpy.sqrt(result.seasons)
+        self.assertTrue(numpy.all(numpy.abs(control.mean(axis=0)) < 4.5 * error))
+        plain, corrected = estimate(result), estimate(result, control=True)
+        self.assertEqual(plain.keys(), corrected.keys())
+        with self.assertRaises(ValueError):
+            BatchSimulator(compiled).Simulate(2).ControlVariate()
+
+
+if __name__ == '__main__':
+    unittest.main()
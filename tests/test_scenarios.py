@@ -0,0 +1,119 @@
+import os
+import unittest
+
+import numpy
+
+import inv_erf
+from season import Season
+from standings import Standings
+from compiled_season import CompiledSeason
+from batch_simulator import BatchSimulator, outcome_probabilities
+from scenarios import ScenarioEnumerator, expected_log_margin, play_until, HOME_WIN, TIE, AWAY_WIN
+from data.make_synthetic import synthetic_season
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data', '2016')
+
+
+def small_league(teams=4, weeks=3, seed=5):
+    schedule, elo = synthetic_season(teams, weeks, seed=seed, spread=150)
+    return CompiledSeason(Season(schedule), Standings.FromData(elo))
+
+
+class TestScenarioEnumerator(unittest.TestCase):
+    def test_walk_matches_game_by_game(self):
+        compiled = small_league()
+        with self.assertRaises(ValueError):
+            ScenarioEnumerator(compiled)
+        enumerator = ScenarioEnumerator(compiled, approximate=True)
+        self.assertFalse(enumerator.exact)
+        probability = enumerator.Enumerate()
+        self.assertEqual(len(probability), 3**6)
+        self.assertAlmostEqual(probability.sum(), 1.0)
+        games = enumerator.games
+        for code in [0, 1, 100, 364, 728]:
+            ratings = compiled.elo.astype(float)
+            expected = 1.0
+            for k, g in enumerate(games):
+                h, a = compiled.home[g], compiled.away[g]
+                margin = ratings[h] - ratings[a] + 65.0
+                p_home = 1.0 / (1.0 + 10.0**(-margin / 400.0))
+                mu = margin / 25.0
+                sigma = inv_erf.get_sigma(mu, p_home)
+                home, away = outcome_probabilities(mu, sigma, inv_erf.TIE_RATE)
+                log_home, log_away = expected_log_margin(mu, sigma, inv_erf.TIE_RATE)
+                outcome = code // 3**k % 3
+                expected *= [home, 1.0 - home - away, away][outcome]
+                if outcome == HOME_WIN:
+                    points = numpy.rint(20 * (1 - p_home) * log_home / (1 + (ratings[h] - ratings[a]) / 2200))
+                elif outcome == AWAY_WIN:
+                    points = -numpy.rint(20 * p_home * log_away / (1 + (ratings[a] - ratings[h]) / 2200))
+                else:
+                    points = 0
+                ratings[h] += points
+                ratings[a] -= points
+            self.assertAlmostEqual(probability[code], expected, places=14)
+        for k in range(len(games)):
+            self.assertTrue(numpy.allclose(enumerator.GameMarginals()[k],
+                                           numpy.bincount(enumerator.Outcome(k), probability, minlength=3)))
+        for team, distribution in enumerator.WinDistribution().items():
+            wins = numpy.bincount(enumerator.Wins(team), probability, minlength=len(distribution))
+            self.assertTrue(numpy.allclose(distribution, wins))
+
+    def test_first_games(self):
+        compiled = small_league()
+        marginals = ScenarioEnumerator(compiled, approximate=True).GameMarginals()
+        for k in range(2):
+            h, a = compiled.home[k], compiled.away[k]
+            margin = compiled.elo[h] - compiled.elo[a] + 65.0
+            p_home = 1.0 / (1.0 + 10.0**(-margin / 400.0))
+            mu = margin / 25.0
+            home, away = outcome_probabilities(mu, inv_erf.get_sigma(mu, p_home), inv_erf.TIE_RATE)
+            self.assertTrue(numpy.allclose(marginals[k], [home, 1.0 - home - away, away]))
+
+    def test_final_week_independent(self):
+        compiled = play_until(CompiledSeason.FromJSONDirectory(DATA), 16, seed=3)
+        unplayed = compiled.unplayed
+        compiled = compiled.WithResults([(compiled.teams[compiled.home[g]], compiled.teams[compiled.away[g]], 20, 10)
+                                         for g in unplayed[:-7]])
+        enumerator = ScenarioEnumerator(compiled)
+        self.assertTrue(enumerator.exact)
+        probability = enumerator.Enumerate()
+        product = numpy.ones(1)
+        for marginal in enumerator.GameMarginals():
+            product = numpy.outer(marginal, product).ravel()
+        self.assertTrue(numpy.allclose(probability, product, rtol=1e-12, atol=0))
+        self.assertEqual(enumerator.WinDistribution()['NE'].sum().round(12), 1.0)
+        with self.assertRaises(ValueError):
+            ScenarioEnumerator(compiled, max_games=6)
+
+    def test_undefeated_matches_simulation(self):
+        compiled = small_league()
+        enumerator = ScenarioEnumerator(compiled, approximate=True)
+        sets = enumerator.UndefeatedSets()
+        count = enumerator.UndefeatedCount()
+        self.assertAlmostEqual(sum(sets.values()), 1.0)
+        self.assertAlmostEqual(sum(p for teams, p in sets.items() if len(teams) == 1), count[1])
+        result = BatchSimulator(compiled).Simulate(100000, numpy.random.default_rng(0))
+        simulated = numpy.bincount(result.Undefeated()[0].sum(axis=1), minlength=len(count)) / result.seasons
+        self.assertTrue(numpy.allclose(simulated[:len(count)], count, atol=0.006))
+        wins = enumerator.WinDistribution()
+        for t, team in enumerate(compiled.teams):
+            self.assertAlmostEqual(wins[team] @ numpy.arange(len(wins[team])), result.wins[0, :, t].mean(), delta=0.015)
+
+    def test_scenarios(self):
+        enumerator = ScenarioEnumerator(small_league(), approximate=True)
+        undefeated = enumerator.Undefeated()
+        self.assertEqual(sorted(undefeated), enumerator.contenders)
+        exactly_one = sum(u.astype(int) for u in undefeated.values()) == 1
+        top = enumerator.TopScenarios(exactly_one, count=3)
+        self.assertEqual(len(top), 3)
+        self.assertTrue(all(exactly_one[code] for code, _ in top))
+        self.assertAlmostEqual(enumerator.Probability(exactly_one), enumerator.UndefeatedCount()[1])
+        outcomes = [HOME_WIN, TIE, AWAY_WIN, HOME_WIN, HOME_WIN, AWAY_WIN]
+        code = sum(o * 3**k for k, o in enumerate(outcomes))
+        self.assertEqual([enumerator.Outcome(k)[code] for k in range(6)], outcomes)
+        self.assertIn('tie', enumerator.Describe(code)[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
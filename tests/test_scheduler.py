@@ -0,0 +1,83 @@
+import os
+import copy
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from compiled_season import CompiledSeason
+from batch_simulator import BatchSimulator
+from export import StandingsWriter, StandingsReader
+from scheduler import Scheduler, Summary
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data', '2016')
+
+
+class TestScheduler(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.compiled = CompiledSeason.FromJSONDirectory(DATA)
+
+    def test_plan_fits_budget(self):
+        scheduler = Scheduler(self.compiled, 2**20, workers=1, overhead=0)
+        plan = scheduler.Plan(10000)
+        self.assertEqual(plan.dtype, 'int16')
+        self.assertLessEqual(plan.chunk_size * plan.bytes_per_season, 2**20)
+        self.assertGreaterEqual(plan.chunk_size * plan.chunks, 10000)
+        with self.assertRaises(ValueError):
+            Scheduler(self.compiled, 2**20, workers=1).Plan(10000)
+
+    def test_plan_reduces_workers(self):
+        plan = Scheduler(self.compiled, 250 * 2**20, workers=4).Plan(10000)
+        self.assertEqual(plan.workers, 1)
+
+    def test_int16_matches_int64(self):
+        rng = numpy.random.default_rng(3)
+        narrow = BatchSimulator(self.compiled).Simulate(200, rng, dtype=numpy.int16)
+        wide = BatchSimulator(self.compiled).Simulate(200, numpy.random.default_rng(3))
+        self.assertEqual(narrow.elo.dtype, numpy.int16)
+        for field in ['elo', 'wins', 'losses', 'ties']:
+            self.assertTrue(numpy.array_equal(getattr(narrow, field), getattr(wide, field)), field)
+
+    def test_overflow(self):
+        with self.assertRaises(OverflowError):
+            BatchSimulator(self.compiled).Simulate(10, start_elo=numpy.full((10, self.compiled.n_teams), 32700),
+                                                   dtype=numpy.int16)
+
+    def test_run(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        summary = Summary()
+        writer = StandingsWriter(directory, self.compiled.teams)
+        scheduler = Scheduler(self.compiled, 30 * 2**10, workers=1, overhead=0)
+        report = scheduler.Run(250, [summary, writer], seed=1)
+        writer.Close()
+        self.assertEqual(report.plan.chunks, -(-250 // report.plan.chunk_size))
+        self.assertGreater(report.plan.chunks, 1)
+        self.assertEqual(report.widened, 0)
+        self.assertEqual(summary.n, 250)
+        wins = StandingsReader(directory).Load('wins')
+        self.assertEqual(wins.shape, (250, self.compiled.n_teams))
+        self.assertTrue(numpy.allclose(summary.MeanWins()[0], wins.mean(axis=0)))
+        self.assertTrue(numpy.allclose(summary.StdWins()[0], wins.std(axis=0)))
+        # The same seed and chunk size give the same seasons
+        again = Summary()
+        scheduler.Run(250, [again], seed=1)
+        self.assertTrue(numpy.array_equal(summary.wins, again.wins))
+
+    def test_widens_on_overflow(self):
+        # Ratings close to the int16 limit, which the dtype choice doesn't anticipate
+        compiled = copy.copy(self.compiled)
+        compiled.elo = compiled.elo + (32600 - compiled.elo.max())
+        scheduler = Scheduler(compiled, 2**20, workers=1, overhead=0)
+        scheduler.MAX_EXCHANGE = 0
+        summary = Summary()
+        report = scheduler.Run(20, [summary], seed=2)
+        self.assertEqual(report.plan.dtype, 'int16')
+        self.assertEqual(report.widened, report.plan.chunks)
+        self.assertEqual(summary.n, 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import unittest
+
+import numpy
+
+from season import Season, SeasonError
+from standings import Standings
+from compiled_season import CompiledSeason
+from batch_simulator import BatchSimulator
+from schedules import ScheduleEvaluator, schedule_array, validate_schedules, permuted_schedules
+from data.make_synthetic import synthetic_season
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data', '2016')
+
+
+class TestScheduleEvaluator(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        schedule, elo = synthetic_season(8, 6, seed=4)
+        cls.season = Season(schedule)
+        cls.standings = Standings.FromData(elo)
+        cls.teams = sorted(cls.standings.keys())
+
+    def test_matches_batch_simulator(self):
+        schedules, neutral = schedule_array([self.season], self.teams)
+        metrics = ScheduleEvaluator(self.standings).Evaluate(schedules, 500, neutral, seed=7)
+        result = BatchSimulator(CompiledSeason(self.season, self.standings)).Simulate(
+            500, numpy.random.default_rng(7))
+        points = result.wins[0] + 0.5 * result.ties[0]
+        self.assertTrue(numpy.allclose(metrics.mean_wins[0], points.mean(axis=0), rtol=0, atol=1e-12))
+        undefeated = result.Undefeated()[0]
+        self.assertAlmostEqual(metrics.any_undefeated[0], undefeated.any(axis=1).mean())
+
+    def test_shared_draws(self):
+        candidates, neutral = permuted_schedules(self.season, self.teams, 5, numpy.random.default_rng(1))
+        candidates = numpy.concatenate([candidates, candidates[:1]])
+        neutral = numpy.concatenate([neutral, neutral[:1]])
+        together = ScheduleEvaluator(self.standings).Evaluate(candidates, 200, neutral, seed=3)
+        split = ScheduleEvaluator(self.standings, batch_size=2).Evaluate(candidates, 200, neutral, seed=3)
+        self.assertTrue(numpy.array_equal(together.mean_wins, split.mean_wins))
+        self.assertTrue(numpy.array_equal(together.mean_wins[0], together.mean_wins[-1]))
+        self.assertFalse(numpy.array_equal(together.mean_wins[0], together.mean_wins[1]))
+        ranking = together.Ranking('balance')
+        self.assertEqual(sorted(s for s, _ in ranking), list(range(6)))
+        self.assertEqual([v for _, v in ranking], sorted(together.balance))
+        self.assertEqual(together.Ranking('top_wins', descending=True)[0][1], together.top_wins.max())
+        with self.assertRaises(ValueError):
+            together.Ranking('wins')
+
+    def test_team_without_games(self):
+        schedules, neutral = schedule_array([self.season], self.teams)
+        # A single game, every other team plays none
+        schedules[:, :, 1:] = -1
+        schedules[:, 1:] = -1
+        metrics = ScheduleEvaluator(self.standings).Evaluate(schedules, 200, neutral, seed=5)
+        self.assertGreater(metrics.single_undefeated[0], 0.9)
+        self.assertEqual(metrics.single_undefeated[0], metrics.any_undefeated[0])
+
+    def test_validate(self):
+        schedules, _ = permuted_schedules(self.season, self.teams, 6, numpy.random.default_rng(2))
+        self.assertEqual(validate_schedules(schedules, 8, games=6), {})
+        schedules[1, 0, 0, 0] = 8
+        schedules[2, 0, 0, 1] = -1
+        schedules[3, 1, 0, 1] = schedules[3, 1, 0, 0]
+        schedules[4, 2, 0, 0] = schedules[4, 2, 1, 1]
+        errors = validate_schedules(schedules, 8)
+        self.assertEqual(sorted(errors), [1, 2, 3, 4])
+        self.assertIn('invalid team id', errors[1])
+        self.assertIn('single team', errors[2])
+        self.assertIn('itself', errors[3])
+        self.assertIn('twice in a week', errors[4])
+        schedules[5, 5] = -1
+        self.assertIn('without 6 games', validate_schedules(schedules, 8, games=6)[5])
+        self.assertNotIn(5, validate_schedules(schedules, 8))
+        with self.assertRaises(SeasonError):
+            ScheduleEvaluator(self.standings).Evaluate(schedules, 10)
+
+    def test_schedule_array(self):
+        season = Season.FromJSONDirectory(DATA)
+        teams = sorted(Standings.FromJSONDirectory(DATA).keys())
+        schedules, neutral = schedule_array([season], teams)
+        self.assertEqual(schedules.shape, (1, 17, 16, 2))
+        self.assertEqual((schedules[..., 0] >= 0).sum(), sum(len(week) for week in season))
+        self.assertEqual(neutral.sum(), sum(game[0].startswith('*') for week in season for game in week))
+        self.assertEqual(validate_schedules(schedules, len(teams), games=16), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import copy
+import unittest
+
+import numpy
+
+from elo import Record
+from season import Season, SeasonError
+from standings import Standings
+from season_simulator import SeasonSimulator
+from simulator import Simulator
+from compiled_season import CompiledSeason
+from batch_simulator import BatchSimulator
+from data.make_synthetic import synthetic_season, team_names
+
+
+class TestLeagueShape(unittest.TestCase):
+    def test_record(self):
+        self.assertTrue(Record(16, 0, 0).IsUndefeated())
+        with self.assertRaises(ValueError):
+            Record(17, 0, 0)
+        self.assertTrue(Record(17, 0, 0, season_games=17).IsUndefeated())
+        self.assertFalse(Record(16, 0, 0, season_games=17).IsUndefeated())
+
+    def test_long_starting_record(self):
+        schedule, elo = synthetic_season(4, 18, seed=1)
+        data = dict(elo)
+        data['AAA'] = {'elo': elo['AAA'], 'wins': 17}
+        standings = Standings.FromData(data)
+        self.assertIsNone(standings['AAA'].record.season_games)
+        simulation = SeasonSimulator(Season(schedule), standings)
+        self.assertEqual(simulation.standings['AAA'].record.season_games, 18)
+        # The caller's standings are not modified
+        self.assertIsNone(standings['AAA'].record.season_games)
+        self.assertIsNot(simulation.standings['AAA'], standings['AAA'])
+        with self.assertRaises(ValueError):
+            SeasonSimulator(Season(synthetic_season(4, 16)[0]), standings)
+
+    def test_synthetic(self):
+        schedule, elo = synthetic_season(10, 20, seed=1)
+        season = Season(schedule)
+        self.assertEqual(len(season), 20)
+        self.assertEqual(season.teams, team_names(10))
+        self.assertEqual(set(season.GamesPerTeam().values()), {20})
+        standings = Standings.FromData(elo)
+        simulation = SeasonSimulator(season, copy.deepcopy(standings))
+        simulation.SimulateSeason()
+        self.assertEqual(sum(t.wins + t.losses + t.ties for t in simulation.standings.values()), 200)
+        result = BatchSimulator(CompiledSeason(season, standings)).Simulate(10)
+        self.assertTrue(((result.wins + result.losses + result.ties) == 20).all())
+
+    def test_verify(self):
+        schedule, _ = synthetic_season(10, 20)
+        for key, value in [('weeks', 17), ('teams', 32), ('games', 16)]:
+            with self.assertRaises(SeasonError):
+                Season(dict(schedule, **{key: value}))
+        with self.assertRaises(SeasonError):
+            Season(dict(schedule, expected=schedule['expected'][1:]))
+
+
+class TestRatingUncertainty(unittest.TestCase):
+    def setUp(self):
+        schedule, elo = synthetic_season(6, 5, seed=4)
+        self.season = Season(schedule)
+        data = dict(elo)
+        data['AAA'] = {'elo': elo['AAA'], 'wins': 0, 'sd': 80}
+        data['AAB'] = {'elo': 1500, 'ensemble': [1400, 1500, 1600, 1700]}
+        data['AAC'] = {'elo': 1500, 'ensemble': [1700, 1600, 1500, 1400]}
+        self.standings = Standings.FromData(data)
+
+    def test_from_data(self):
+        self.assertEqual(set(self.standings.uncertainty), {'AAA', 'AAB', 'AAC'})
+        self.assertEqual(self.standings['AAB'].elo, 1500)
+        with self.assertRaises(ValueError):
+            Standings.FromData({'A': {'elo': 1500, 'ensemble': [1500]}, 'B': {'elo': 1500, 'ensemble': [1, 2]}})
+        with self.assertRaises(ValueError):
+            Standings.FromData({'A': {'elo': 1500, 'sd': -1}})
+        self.assertEqual(Standings.FromData({'A': 1500}).uncertainty, {})
+
+    def test_sample(self):
+        ratings = self.standings.SampleELO(20000, numpy.random.default_rng(0))
+        teams = sorted(self.standings)
+        self.assertEqual(ratings.shape, (20000, 6))
+        a, b, c = (teams.index(t) for t in ['AAA', 'AAB', 'AAC'])
+        # Ensemble members are drawn jointly
+        self.assertTrue(numpy.all(ratings[:, b] + ratings[:, c] == 3100))
+        self.assertEqual(set(ratings[:, b]), {1400, 1500, 1600, 1700})
+        self.assertAlmostEqual(ratings[:, a].std(), 80, delta=2)
+        fixed = [t for t in range(6) if t not in (a, b, c)]
+        self.assertTrue(numpy.all(ratings[:, fixed] == [self.standings[teams[t]].elo for t in fixed]))
+
+    def test_simulate(self):
+        compiled = CompiledSeason(self.season, self.standings)
+        simulator = BatchSimulator(compiled)
+        start = compiled.SampleELO(1000, numpy.random.default_rng(1))
+        result = simulator.Simulate(1000, numpy.random.default_rng(2), start_elo=start)
+        self.assertTrue(numpy.all(result.elo[0].sum(axis=1) == start.sum(axis=1)))
+        # The default draws the starting ratings from the generator before any game
+        first = simulator.Simulate(50, numpy.random.default_rng(3))
+        rng = numpy.random.default_rng(3)
+        second = simulator.Simulate(50, rng, start_elo=compiled.SampleELO(50, rng))
+        self.assertTrue(numpy.array_equal(first.elo, second.elo))
+        certain = BatchSimulator(CompiledSeason(self.season, Standings.FromData(
+            {t: e.elo for t, e in self.standings.items()}))).Simulate(1000, numpy.random.default_rng(2))
+        b = compiled.index['AAB']
+        self.assertGreater(result.wins[0, :, b].var(), certain.wins[0, :, b].var())
+        Simulator(self.season, self.standings, 5).Simulate()
+
+
+if __name__ == '__main__':
+    unittest.main()
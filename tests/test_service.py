@@ -0,0 +1,66 @@
+import os
+import json
+import asyncio
+import unittest
+import concurrent.futures
+
+from service import Service
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+
+async def request(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    payload = json.dumps(body).encode() if body is not None else b''
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: localhost\r\n'
+                 f'Content-Length: {len(payload)}\r\n\r\n'.encode() + payload)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+
+class TestService(unittest.TestCase):
+    def test_requests(self):
+        asyncio.run(self.run_requests())
+
+    async def run_requests(self):
+        service = Service(ROOT, executor=concurrent.futures.ThreadPoolExecutor(2))
+        port = await service.Start(port=0)
+        try:
+            path = '/odds?directory=data/2016&seasons=2000&seed=7'
+            (status, first), (_, second) = await asyncio.gather(request(port, 'GET', path),
+                                                                request(port, 'GET', path))
+            self.assertEqual(status, 200)
+            self.assertEqual(first, second)
+            self.assertEqual(service.computations, 1, "Concurrent identical requests should be combined")
+            _, third = await request(port, 'GET', path)
+            self.assertEqual(third, first)
+            self.assertEqual(service.computations, 1, "Repeated request should be served from the cache")
+            self.assertAlmostEqual(sum(t['wins'] + 0.5 * t['ties'] for t in first['teams'].values()), 256.0)
+
+            what_if = {'directory': 'data/2016', 'seasons': 2000, 'seed': 7,
+                       'results': [['DEN', 'SD', 27, 19]]}
+            status, answer = await request(port, 'POST', '/whatif', what_if)
+            self.assertEqual(status, 200)
+            self.assertEqual(service.computations, 2)
+            self.assertGreater(answer['teams']['DEN']['wins'], first['teams']['DEN']['wins'])
+
+            # Requests without a seed are neither cached nor combined
+            unseeded = '/odds?directory=data/2016&seasons=500'
+            await asyncio.gather(request(port, 'GET', unseeded), request(port, 'GET', unseeded))
+            await request(port, 'GET', unseeded)
+            self.assertEqual(service.computations, 5)
+            self.assertEqual(len(service.results), 2)
+
+            status, answer = await request(port, 'POST', '/whatif', {'results': [['DEN', 'SD', 1, 0], ['DEN', 'SD', 0, 1]]})
+            self.assertEqual(status, 400)
+            status, _ = await request(port, 'GET', '/odds?directory=../..')
+            self.assertEqual(status, 400)
+        finally:
+            service.Close()
+
+
+if __name__ == '__main__':
+    unittest.main()
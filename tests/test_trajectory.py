@@ -0,0 +1,69 @@
+import os
+import unittest
+
+import numpy
+
+from simulator import Simulator
+from compiled_season import CompiledSeason
+from batch_simulator import BatchSimulator
+from trajectory import TrajectoryCollector
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data')
+
+
+class RecordingObserver:
+    def __init__(self):
+        self.elo = {}
+
+    def ObserveBatch(self, week, elo):
+        self.elo[week] = elo.copy()
+
+
+class TestTrajectoryCollector(unittest.TestCase):
+    def test_quantiles(self):
+        rng = numpy.random.default_rng(3)
+        elo = rng.integers(1200, 1800, size=(1001, 4))
+        collector = TrajectoryCollector(['A', 'B', 'C', 'D'], 1)
+        collector.ObserveBatch(0, elo)
+        quantiles = collector.Quantiles()
+        for t in range(4):
+            expected = numpy.quantile(elo[:, t], TrajectoryCollector.QUANTILES, method='inverted_cdf')
+            self.assertEqual(list(quantiles[t, 0]), list(expected))
+
+    def test_clamped(self):
+        collector = TrajectoryCollector(['A'], 1, low=1400, high=1600)
+        collector.ObserveBatch(0, numpy.array([[1300], [1500], [1700]]))
+        self.assertEqual(collector.clamped, 2)
+        self.assertEqual(list(collector.Quantiles((0.0, 1.0))[0, 0]), [1400, 1600])
+
+    def test_merge(self):
+        compiled = CompiledSeason.FromJSONDirectory(os.path.join(DATA, '2016'))
+        parts = [TrajectoryCollector(compiled.teams, compiled.n_weeks) for _ in range(2)]
+        whole = TrajectoryCollector(compiled.teams, compiled.n_weeks)
+        recorder = RecordingObserver()
+        BatchSimulator(compiled).Simulate(200, numpy.random.default_rng(5), observers=[whole, recorder])
+        for w, elo in recorder.elo.items():
+            parts[0].ObserveBatch(w, elo[:120])
+            parts[1].ObserveBatch(w, elo[120:])
+        parts[0].Merge(parts[1])
+        self.assertTrue(numpy.array_equal(parts[0].counts, whole.counts))
+        self.assertEqual(whole.seasons, compiled.n_weeks * [200])
+        with self.assertRaises(ValueError):
+            whole.Merge(TrajectoryCollector(compiled.teams[:-1], compiled.n_weeks))
+
+    def test_reference_matches_batch(self):
+        # Every 2015 game has been played, so every week is deterministic
+        directory = os.path.join(DATA, '2015')
+        compiled = CompiledSeason.FromJSONDirectory(directory)
+        reference = TrajectoryCollector(compiled.teams, compiled.n_weeks)
+        simulator = Simulator.FromJSONDirectory(directory, 3)
+        simulator.observers = [reference]
+        simulator.Simulate()
+        batch = TrajectoryCollector(compiled.teams, compiled.n_weeks)
+        BatchSimulator(compiled).Simulate(3, numpy.random.default_rng(0), observers=[batch])
+        self.assertTrue(numpy.array_equal(reference.counts, batch.counts))
+        self.assertEqual(reference.seasons, compiled.n_weeks * [3])
+
+
+if __name__ == '__main__':
+    unittest.main()
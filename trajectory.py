@@ -0,0 +1,112 @@
+import os
+import argparse
+from typing import List, Sequence
+
+import numpy
+
+from standings import Standings
+
+
+class TrajectoryCollector:
+    """Collects the distribution of every team's ELO after every week in fixed memory.
+
+    Each (team, week) pair has a histogram of integer ELO values over `[low, high]`, with
+    values outside the range counted in the edge bins.  Because ELO values are integers
+    the histograms are exact quantile sketches: the quantiles they report are the
+    quantiles of all observed values (unless clamped), memory does not depend on the
+    number of seasons, and sketches built by parallel workers merge by addition.
+
+    Args:
+        teams: Team names, in the order used by the array simulators
+        weeks: Number of weeks in the season
+        low (optional): Smallest ELO with its own bin
+        high (optional): Largest ELO with its own bin
+
+    Attributes:
+        counts (numpy.ndarray): Histograms indexed by `[team, week, elo - low]`
+        clamped (int): Number of observations outside `[low, high]`
+
+    """
+    QUANTILES = (0.05, 0.25, 0.50, 0.75, 0.95)
+
+    def __init__(self, teams: Sequence[str], weeks: int, low: int=1000, high: int=2300):
+        self.teams = list(teams)
+        self.index = {team: i for i, team in enumerate(self.teams)}
+        self.weeks = weeks
+        self.low = low
+        self.high = high
+        self.counts = numpy.zeros((len(self.teams), weeks, high - low + 1), dtype=numpy.int64)
+        self.clamped = 0
+
+    def ObserveWeek(self, week: int, standings: Standings):
+        """Adds the ELO of every team after `week` of a single season"""
+        for team in standings.values():
+            elo = team.elo
+            if not self.low <= elo <= self.high:
+                self.clamped += 1
+                elo = min(max(elo, self.low), self.high)
+            self.counts[self.index[team.name], week, elo - self.low] += 1
+
+    def ObserveBatch(self, week: int, elo: numpy.ndarray):
+        """Adds the ELO of every team after `week` of many seasons at once.
+
+        Args:
+            week: Week index
+            elo: ELO values indexed by `[season, team]`, teams ordered as `teams`
+
+        """
+        bins = elo - self.low
+        clipped = numpy.clip(bins, 0, self.high - self.low)
+        self.clamped += int((clipped != bins).sum())
+        n_bins = self.counts.shape[2]
+        offsets = clipped + n_bins * numpy.arange(len(self.teams))
+        self.counts[:, week, :] += numpy.bincount(offsets.ravel(), minlength=len(self.teams) * n_bins).reshape(
+            len(self.teams), n_bins)
+
+    def Merge(self, other: 'TrajectoryCollector'):
+        """Adds the observations of another collector with the same teams, weeks and range"""
+        if (other.teams, other.weeks, other.low, other.high) != (self.teams, self.weeks, self.low, self.high):
+            raise ValueError("Collectors must have the same teams, weeks and ELO range to merge")
+        self.counts += other.counts
+        self.clamped += other.clamped
+
+    def Quantiles(self, quantiles: Sequence[float]=QUANTILES) -> numpy.ndarray:
+        """Quantiles of ELO for every team and week, indexed by `[team, week, quantile]`.
+        The quantile `q` is the smallest ELO whose cumulative frequency is at least `q`.
+
+        """
+        cdf = numpy.cumsum(self.counts, axis=2)
+        total = cdf[:, :, -1:]
+        result = numpy.empty(self.counts.shape[:2] + (len(quantiles),), dtype=numpy.int64)
+        for i, q in enumerate(quantiles):
+            result[:, :, i] = (cdf < q * total).sum(axis=2) + self.low
+        return result
+
+    def PrintFanChart(self, team: str, quantiles: Sequence[float]=QUANTILES):
+        """Prints the quantiles of a team's ELO after every week"""
+        values = self.Quantiles(quantiles)[self.index[team]]
+        print(f'{team:<4}' + ''.join(f'{int(100 * q):>6}%' for q in quantiles))
+        for week, row in enumerate(values):
+            print(f'{week + 1:>4}' + ''.join(f'{v:>7d}' for v in row))
+
+    @property
+    def seasons(self) -> List[int]:
+        """Number of observations in each week"""
+        return list(self.counts[0].sum(axis=1))
+
+
+if __name__ == '__main__':
+    from compiled_season import CompiledSeason
+    from batch_simulator import BatchSimulator
+
+    parser = argparse.ArgumentParser(description='Print week by week ELO fan charts')
+    parser.add_argument('teams', nargs='*')
+    parser.add_argument('--directory', default=os.path.join('data', '2016'))
+    parser.add_argument('--seasons', type=int, default=10000)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+    compiled = CompiledSeason.FromJSONDirectory(args.directory)
+    collector = TrajectoryCollector(compiled.teams, compiled.n_weeks)
+    BatchSimulator(compiled).Simulate(args.seasons, numpy.random.default_rng(args.seed), observers=[collector])
+    for name in args.teams or compiled.teams:
+        collector.PrintFanChart(name)